@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 from pathlib import Path
+import json
+import os
 import pandas as pd
-from typing import Dict, List
-from dataclasses import dataclass
+from typing import Dict, List, Optional
+from dataclasses import dataclass, field
 import requests
 from urllib.parse import urlparse
 import re
@@ -32,6 +34,11 @@ EXCEL_PATH = (
 PHOTOS_DIR = BASE_DIR / "downloaded_photos"
 PHOTOS_DIR.mkdir(exist_ok=True)
 
+# Manifiesto de descargas (ETag / Last-Modified / tamaño por URL) dentro de PHOTOS_DIR
+DOWNLOAD_MANIFEST_NAME = ".descargas_manifest.json"
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+MANIFEST_SAVE_EVERY = 25  # guardar el manifiesto cada N descargas completadas
+
 
 # --------------------------------------------------------------------
 # FUNCIONES
@@ -43,6 +50,10 @@ class FotoExtractorExcel:
     initial_sheet: str = "CENTRO"
     last_sheet: str = "CERRAMIENTOS"
     max_workers: int = 10  # Número de hilos concurrentes
+    photos_dir: Path = PHOTOS_DIR
+    incremental: bool = True  # Manifiesto + peticiones condicionales + reanudación con Range
+    revalidar: bool = True    # Si False, los ficheros válidos del manifiesto se saltan sin red
+    _manifest: Dict[str, dict] = field(default_factory=dict, init=False, repr=False)
 
     def __post_init__(self):
         # Session reutilizable con connection pooling
@@ -59,6 +70,52 @@ class FotoExtractorExcel:
         ))
         # Lock para escritura thread-safe
         self._print_lock = threading.Lock()
+        self._manifest_lock = threading.Lock()
+        # Serializa tmp + replace: varios hilos de descarga pueden disparar el guardado a la vez
+        self._manifest_save_lock = threading.Lock()
+        self._manifest_pending = 0
+        self.photos_dir = Path(self.photos_dir)
+        self._manifest_path = self.photos_dir / DOWNLOAD_MANIFEST_NAME
+        if self.incremental:
+            self._manifest = self._load_manifest(self._manifest_path)
+
+    # ------------------- Manifiesto de descargas -------------------
+
+    @staticmethod
+    def _load_manifest(path: Path) -> Dict[str, dict]:
+        if not path.exists():
+            return {}
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except Exception as e:
+            print(f"   ! Manifiesto de descargas ilegible, se ignora: {e}")
+            return {}
+
+    def save_manifest(self) -> None:
+        """Guarda el manifiesto de forma atómica (tmp + replace)."""
+        if not self.incremental:
+            return
+        with self._manifest_save_lock:
+            with self._manifest_lock:
+                data = json.dumps(self._manifest, ensure_ascii=False, separators=(",", ":"))
+                self._manifest_pending = 0
+            self.photos_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self._manifest_path.with_suffix(".tmp")
+            tmp.write_text(data, encoding="utf-8")
+            os.replace(tmp, self._manifest_path)
+
+    def _manifest_update(self, url: str, entry: dict) -> None:
+        with self._manifest_lock:
+            self._manifest[url] = entry
+            self._manifest_pending += 1
+            save = self._manifest_pending >= MANIFEST_SAVE_EVERY
+        if save:
+            # La foto ya está en disco: un fallo al guardar el manifiesto no invalida la descarga
+            try:
+                self.save_manifest()
+            except OSError as e:
+                with self._print_lock:
+                    print(f"   ! No se pudo guardar el manifiesto de descargas: {e}")
 
     # ------------------- Cargar datos de Excel -------------------
     
@@ -149,7 +206,7 @@ class FotoExtractorExcel:
             clean_id_name = re.sub(r'[<>:"|?*\\]', '_', clean_id_name)  # Reemplazar caracteres no válidos en Windows
             
             # Crear un directorio para cada ID y nombre único
-            dir_path = PHOTOS_DIR / clean_id_name / "Referencias"
+            dir_path = self.photos_dir / clean_id_name / "Referencias"
             dir_path.mkdir(parents=True, exist_ok=True)
             
             for sheet_name in dataframes:
@@ -280,6 +337,88 @@ class FotoExtractorExcel:
         
         return f"{elemento_id_clean}_F{foto_num}.{extension}"
 
+    @staticmethod
+    def _validators(entry: Optional[dict]) -> dict:
+        return {k: entry[k] for k in ("etag", "last_modified") if entry and entry.get(k)}
+
+    def _fetch_to_file(self, url: str, file_path: Path) -> str:
+        """
+        Descarga 'url' en 'file_path' en streaming a través de '<nombre>.part'.
+
+        - Si el fichero existe y coincide con el manifiesto: petición condicional
+          (If-None-Match / If-Modified-Since); con 304 no se descarga nada.
+        - Si hay un '.part' de una descarga anterior con validadores: Range + If-Range.
+
+        Returns:
+            "sin_cambios", "descargada" o "reanudada"
+        """
+        part_path = file_path.with_name(file_path.name + ".part")
+        entry = self._manifest.get(url) if self.incremental else None
+        validators = self._validators(entry)
+        # Sin compresión de transporte: Content-Length y los offsets de Range cuentan los
+        # mismos bytes que se escriben en disco
+        headers = {"Accept-Encoding": "identity"}
+        offset = 0
+
+        if entry and file_path.exists() and entry.get("path") == file_path.name \
+                and entry.get("size") == file_path.stat().st_size:
+            if not self.revalidar:
+                return "sin_cambios"
+            if "etag" in validators:
+                headers["If-None-Match"] = validators["etag"]
+            if "last_modified" in validators:
+                headers["If-Modified-Since"] = validators["last_modified"]
+        elif self.incremental and part_path.exists() and validators:
+            offset = part_path.stat().st_size
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+                headers["If-Range"] = validators.get("etag") or validators["last_modified"]
+
+        with self.session.get(url, timeout=15, stream=True, headers=headers) as response:
+            if response.status_code == 304:
+                return "sin_cambios"
+            if response.status_code == 416:
+                # El .part ya no encaja con el recurso: empezar de cero
+                part_path.unlink(missing_ok=True)
+                return self._fetch_to_file(url, file_path)
+            response.raise_for_status()
+
+            # Si el servidor comprime igualmente, iter_content entrega bytes descomprimidos:
+            # no se puede comparar con Content-Length ni continuar un .part por offset
+            codificada = response.headers.get("Content-Encoding", "identity").strip().lower() not in ("", "identity")
+            if codificada and response.status_code == 206:
+                part_path.unlink(missing_ok=True)
+                response.close()
+                return self._fetch_to_file(url, file_path)
+
+            resumed = response.status_code == 206 and offset > 0
+            new_entry = {
+                "path": file_path.name,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+            if self.incremental:
+                # Validadores disponibles desde ya para reanudar si se corta la descarga
+                self._manifest_update(url, dict(new_entry, size=None))
+
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(part_path, "ab" if resumed else "wb") as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if chunk:
+                        f.write(chunk)
+
+            expected = None if codificada else response.headers.get("Content-Length")
+            size = part_path.stat().st_size
+            if expected is not None and size != int(expected) + (offset if resumed else 0):
+                raise requests.exceptions.ContentDecodingError(
+                    f"descarga incompleta ({size} bytes, esperados {int(expected) + (offset if resumed else 0)})"
+                )
+
+        os.replace(part_path, file_path)
+        if self.incremental:
+            self._manifest_update(url, dict(new_entry, size=size))
+        return "reanudada" if resumed else "descargada"
+
     def _download_photo_from_url(
         self, url: str, center_id: str, sheet_name: str, row_index: int, column_name: str, df: pd.DataFrame, matching_rows: pd.DataFrame
     ) -> str:
@@ -299,10 +438,6 @@ class FotoExtractorExcel:
             str: Ruta del archivo descargado o mensaje de error
         """
         try:
-            # Usar session reutilizable
-            response = self.session.get(url, timeout=15)
-            response.raise_for_status()
-
             # Extraer el nombre del archivo con el nuevo formato
             filename = self._extract_filename_from_url(url, sheet_name, row_index, column_name, df)
 
@@ -312,17 +447,21 @@ class FotoExtractorExcel:
             clean_center_id = re.sub(r'[<>:"|?*\\]', '_', clean_center_id)
 
             # Usar directorio ya creado por _create_directories
-            center_sheet_dir = PHOTOS_DIR / clean_center_id / "Referencias" / sheet_name
+            center_sheet_dir = self.photos_dir / clean_center_id / "Referencias" / sheet_name
 
             # Crear ruta completa del archivo
             file_path = center_sheet_dir / filename
 
-            # Guardar el archivo
-            with open(file_path, "wb") as f:
-                f.write(response.content)
+            # Descargar en streaming (condicional / reanudable)
+            estado = self._fetch_to_file(url, file_path)
 
             with self._print_lock:
-                print(f"   ✓ Descargada: {filename}")
+                if estado == "sin_cambios":
+                    print(f"   = Sin cambios: {filename}")
+                elif estado == "reanudada":
+                    print(f"   ✓ Reanudada: {filename}")
+                else:
+                    print(f"   ✓ Descargada: {filename}")
             return str(file_path)
 
         except requests.exceptions.RequestException as e:
@@ -477,25 +616,29 @@ class FotoExtractorExcel:
                 processing_tasks.append((center_id, sheet_name, df))
 
         # Procesar múltiples centros/hojas simultáneamente
-        with ThreadPoolExecutor(max_workers=min(len(processing_tasks), 20)) as executor:
-            future_to_task = {
-                executor.submit(
-                    self._download_photos_for_center_in_sheet,
-                    task[0], task[1], task[2]
-                ): task for task in processing_tasks
-            }
+        try:
+            with ThreadPoolExecutor(max_workers=min(len(processing_tasks), 20)) as executor:
+                future_to_task = {
+                    executor.submit(
+                        self._download_photos_for_center_in_sheet,
+                        task[0], task[1], task[2]
+                    ): task for task in processing_tasks
+                }
 
-            for future in as_completed(future_to_task):
-                center_id, sheet_name, _ = future_to_task[future]
-                try:
-                    results = future.result()
-                    if results:
-                        if center_id not in all_results:
-                            all_results[center_id] = {}
-                        all_results[center_id][sheet_name] = results
-                except Exception as exc:
-                    with self._print_lock:
-                        print(f"Error procesando centro {center_id}, hoja {sheet_name}: {exc}")
+                for future in as_completed(future_to_task):
+                    center_id, sheet_name, _ = future_to_task[future]
+                    try:
+                        results = future.result()
+                        if results:
+                            if center_id not in all_results:
+                                all_results[center_id] = {}
+                            all_results[center_id][sheet_name] = results
+                    except Exception as exc:
+                        with self._print_lock:
+                            print(f"Error procesando centro {center_id}, hoja {sheet_name}: {exc}")
+        finally:
+            # Aunque se interrumpa, guardar validadores para reanudar en la siguiente ejecución
+            self.save_manifest()
 
         print("\nDescarga completada")
         return all_results
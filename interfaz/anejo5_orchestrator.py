@@ -12,6 +12,10 @@ import sys
 import argparse
 import subprocess
 import shutil
+import asyncio
+import queue
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 
@@ -70,6 +74,146 @@ def copy_separated_jsons_to_base(json_dir: str):
             else:
                 print(f"[Anejo 5] ⚠️  {json_file} no encontrado en {centro_dir.name}")
 
+def _pdf_settings(total_files: int) -> tuple[int, int]:
+    """(concurrency, merge_workers) para html2pdf según el tamaño del lote."""
+    if total_files > 3000:
+        print(f"[Anejo 5] Dataset grande detectado ({total_files} archivos) - usando configuración conservadora")
+        return 4, 2  # Muy conservador para datasets grandes
+    if total_files > 1000:
+        print(f"[Anejo 5] Dataset mediano detectado ({total_files} archivos) - usando configuración moderada")
+        return 6, 3  # Moderado
+    print(f"[Anejo 5] Dataset pequeño detectado ({total_files} archivos) - usando configuración normal")
+    return 8, 4  # Normal para datasets pequeños
+
+def _excel_files(excel_dir: str) -> list[Path]:
+    excel_path = Path(excel_dir)
+    if excel_path.is_dir():
+        return sorted([f for f in excel_path.iterdir() if f.suffix.lower() == '.xlsx' and not f.name.startswith('~$')])
+    return [excel_path]
+
+def _count_entities(ctx: list) -> int:
+    """Aproximación del nº de páginas HTML: centro + edificios + elementos de cada edificio."""
+    total = 0
+    for c in ctx:
+        total += 1
+        for e in c.get("edif", []):
+            total += 1 + sum(len(v) for v in e.values() if isinstance(v, list) and v and isinstance(v[0], dict))
+    return total
+
+def run_pipeline_in_process(args, dirs: dict) -> int:
+    """
+    Modo en proceso: importa los tres scripts como librería y encadena cada centro
+    extracción -> render HTML -> PDF en cuanto sus datos están listos. Los PDFs de un
+    centro se generan en un hilo aparte mientras se extrae/renderiza el siguiente; ese
+    hilo mantiene un mismo event loop y un mismo Chromium para todos los centros.
+    """
+    sys.path.insert(0, str(Path(__file__).parent))
+    import extraer_datos_word as edw
+    import render_a3
+    import html2pdf_a3_fast as h2p
+
+    excel_files = _excel_files(args.excel_dir)
+    if not excel_files:
+        print(f"[ERROR] No se encontraron archivos .xlsx en {args.excel_dir}")
+        return 1
+
+    json_root, html_root, pdf_root = Path(dirs['json']), Path(dirs['html']), Path(dirs['pdf'])
+    fotos_root = Path(args.photos_dir)
+    edw._set_photo_index_store(None if args.sin_indice_fotos else edw.default_photo_index_path(fotos_root))
+    render_a3.configure(json_root, html_root, Path(args.html_templates_dir),
+                        exclude_without_photos=args.exclude_without_photos, modo_assets="enlace")
+
+    # Leer y construir contextos de todos los Excel antes de arrancar el pipeline
+    trabajos = []
+    for excel_file in excel_files:
+        print(f"[Anejo 5] Procesando Excel: {excel_file.name}")
+        dfs = edw._read_all_sheets(excel_file)
+        ctx = edw.build_context_grouped(dfs)
+        if args.center:
+            ctx = [c for c in ctx if c.get("centro", {}).get("id") == args.center]
+        trabajos.append((excel_file, ctx))
+    if args.center and not any(ctx for _, ctx in trabajos):
+        print(f"[ERROR] No se encontró el centro {args.center}")
+        return 1
+
+    concurrency, merge_workers = _pdf_settings(sum(_count_entities(ctx) for _, ctx in trabajos))
+    if args.shards_pdf > 1:
+        # Los shards lanzarían N procesos con su Chromium por cada centro; aquí el hilo PDF
+        # mantiene un único navegador para toda la ejecución
+        print(f"[WARN] --shards-pdf {args.shards_pdf} se ignora en modo en-proceso (un navegador para todos los centros)")
+    pdf_args = h2p.parse_args(['--data', str(html_root), '--out', str(pdf_root),
+                               '--concurrency', str(concurrency),
+                               '--merge-workers', str(merge_workers),
+                               '--wait', '900',
+                               '--shards', '1',
+                               '--caratulas-dir', args.caratulas_dir, '--port', '8800'])
+    httpd = h2p.start_http_server(html_root, pdf_args.port)
+    base_url = f"http://127.0.0.1:{pdf_args.port}"
+
+    pendientes = queue.Queue()
+    resultados = {"ok": 0, "fallos": []}
+
+    async def pdf_loop():
+        # Un solo event loop y un solo Chromium para todos los centros: se lanza con el
+        # primer centro que tenga páginas y se cierra al vaciar la cola
+        loop = asyncio.get_running_loop()
+        navegador = h2p.NavegadorPersistente(pdf_args)
+        try:
+            while True:
+                item = await loop.run_in_executor(None, pendientes.get)
+                if item is None:
+                    return
+                cid, center_html = item
+                t0 = time.time()
+                try:
+                    # Almacén de fotos común a todos los centros (una copia por contenido)
+                    h2p.fix_all_htmls(center_html, store_root=html_root)
+                    htmls = h2p.find_htmls(center_html)
+                    if not htmls:
+                        print(f"[Anejo 5] ({cid}) Sin HTML que convertir")
+                        continue
+                    rendered = await h2p.render_htmls_to_pdfs(htmls, html_root, pdf_root, pdf_args,
+                                                              base_url=base_url, navegador=navegador)
+                    h2p.crear_anejo_final_por_centro(pdf_args, pdf_root, {c for c, _, _ in rendered}, rendered)
+                    resultados["ok"] += 1
+                    print(f"[Anejo 5] ({cid}) PDF completado en {time.time() - t0:.1f}s")
+                except Exception as e:
+                    resultados["fallos"].append(cid)
+                    print(f"[ERROR] ({cid}) Fallo en la etapa PDF: {e}")
+                finally:
+                    sys.stdout.flush()
+        finally:
+            await navegador.cerrar()
+
+    def pdf_worker():
+        asyncio.run(pdf_loop())
+
+    hilo_pdf = threading.Thread(target=pdf_worker, name="anejo5-pdf", daemon=True)
+    hilo_pdf.start()
+
+    def on_center(c):
+        # El contexto pasa directamente al render: sin escribir ni releer los JSON separados
+        cid = c["centro"].get("id") or "CENTRO"
+        render_a3.render_contexto_centro(c)
+        pendientes.put((cid, render_a3.outdir_for_centro(cid)))
+        sys.stdout.flush()
+
+    try:
+        for excel_file, ctx in trabajos:
+            print(f"[Anejo 5] Vinculando fotos y renderizando centros de {excel_file.name}")
+            edw.add_photos_to_context(ctx, edw._read_consul(excel_file), fotos_root,
+                                      edw.FUZZY_THRESHOLD_DEFAULT, False, json_root,
+                                      False, edw.MAX_SEQUENTIAL_PHOTOS, False,
+                                      on_center=on_center, workers=args.workers_fotos)
+    finally:
+        pendientes.put(None)
+        hilo_pdf.join()
+        httpd.shutdown()
+        render_a3.log_unresolved_placeholders()
+
+    print(f"[Anejo 5] Pipeline en proceso: {resultados['ok']} centros con PDF, {len(resultados['fallos'])} con errores")
+    return 3 if resultados["fallos"] else 0
+
 def main():
     parser = argparse.ArgumentParser(description="Orquestador automático para Anejo 5")
     parser.add_argument("--excel-dir", required=True)
@@ -79,6 +223,17 @@ def main():
     parser.add_argument("--center", default=None)
     parser.add_argument("--output-dir", default=None, help="Carpeta de salida para los anexos finales")
     parser.add_argument("--exclude-without-photos", action="store_true", help="Excluir elementos sin fotos del Anejo 5")
+    parser.add_argument("--workers-fotos", type=int, default=1,
+                        help="Procesos para vincular fotos por centro en paralelo (1 = en serie)")
+    parser.add_argument("--shards-pdf", type=int, default=1,
+                        help="Navegadores Chromium en procesos separados para HTML→PDF (1 = uno solo). "
+                             "Solo en modo 'subprocesos': en 'en-proceso' se ignora y se usa un navegador persistente")
+    parser.add_argument("--sin-indice-fotos", action="store_true",
+                        help="No usar el índice persistente de fotos (recorre siempre todo el árbol de fotos)")
+    parser.add_argument("--json-compacto", action="store_true",
+                        help="JSON intermedios sin indentar en modo subprocesos (más rápidos de escribir y leer)")
+    parser.add_argument("--modo", choices=["subprocesos", "en-proceso"], default="subprocesos",
+                        help="'subprocesos': tres scripts secuenciales; 'en-proceso': pipeline centro a centro en un solo proceso")
     args = parser.parse_args()
     print(f"DEBUG ORCHESTRATOR: args recibidos: {vars(args)}")
     print(f"DEBUG ORCHESTRATOR: exclude_without_photos = {args.exclude_without_photos}")
@@ -92,6 +247,16 @@ def main():
     dirs = create_temp_dirs()
     print(f"[Anejo 5] Carpeta temporal creada: {dirs['base']}")
 
+    if args.modo == "en-proceso":
+        rc = run_pipeline_in_process(args, dirs)
+        print(f"[Anejo 5] Proceso completado. PDFs en: {dirs['pdf']}")
+        sys.stdout.flush()
+        if args.output_dir:
+            copy_files_to_output(dirs['pdf'], args.output_dir)
+        if rc:
+            sys.exit(rc)
+        return
+
     # 1. extraer_datos_word.py - Manejar carpeta o archivo
     excel_path = Path(args.excel_dir)
     if excel_path.is_dir():
@@ -112,6 +277,12 @@ def main():
                     '--jsons-separados']  # Generar JSONs separados para render_a3.py
             if args.center:
                 cmd1 += ['--centro', args.center]
+            if args.workers_fotos > 1:
+                cmd1 += ['--workers-fotos', str(args.workers_fotos)]
+            if args.json_compacto:
+                cmd1 += ['--json-compacto']
+            if args.sin_indice_fotos:
+                cmd1 += ['--sin-indice-fotos']
             
             print(f"[Anejo 5] Ejecutando: {' '.join(cmd1)}")
             print(f"[Anejo 5] Extracción de datos en tiempo real...")
@@ -194,6 +365,12 @@ def main():
                 '--jsons-separados']  # Generar JSONs separados para render_a3.py
         if args.center:
             cmd1 += ['--centro', args.center]
+        if args.workers_fotos > 1:
+            cmd1 += ['--workers-fotos', str(args.workers_fotos)]
+        if args.json_compacto:
+            cmd1 += ['--json-compacto']
+        if args.sin_indice_fotos:
+            cmd1 += ['--sin-indice-fotos']
         print(f"[Anejo 5] Ejecutando: {' '.join(cmd1)}")
         print(f"[Anejo 5] Extracción de datos en tiempo real...")
         sys.stdout.flush()
@@ -261,7 +438,8 @@ def main():
     cmd2 = [sys.executable, '-u', str(render_a3_script),
             '--data', dirs['json'],
             '--out', dirs['html'],
-            '--tpl', args.html_templates_dir]
+            '--tpl', args.html_templates_dir,
+            '--assets', 'enlace']  # SVG de placeholder enlazados, no copiados en cada carpeta
     
     # Add photo filtering parameter if specified
     if args.exclude_without_photos:
@@ -328,19 +506,7 @@ def main():
     # 3. html2pdf_a3_fast.py - configuración más conservadora para datasets grandes
     # Ajustar concurrencia basada en el número de archivos
     total_files = sum(len(list(Path(dirs['html']).rglob('*.html'))) for _ in [1])  # Contar archivos
-    
-    if total_files > 3000:
-        concurrency = 4  # Muy conservador para datasets grandes
-        merge_workers = 2
-        print(f"[Anejo 5] Dataset grande detectado ({total_files} archivos) - usando configuración conservadora")
-    elif total_files > 1000:
-        concurrency = 6  # Moderado
-        merge_workers = 3
-        print(f"[Anejo 5] Dataset mediano detectado ({total_files} archivos) - usando configuración moderada")
-    else:
-        concurrency = 8  # Normal para datasets pequeños
-        merge_workers = 4
-        print(f"[Anejo 5] Dataset pequeño detectado ({total_files} archivos) - usando configuración normal")
+    concurrency, merge_workers = _pdf_settings(total_files)
     
     cmd3 = [sys.executable, '-u', str(html2pdf_script),
             '--data', dirs['html'],
@@ -348,6 +514,7 @@ def main():
             '--concurrency', str(concurrency),
             '--merge-workers', str(merge_workers),
             '--wait', '900',  # Más tiempo de espera para archivos complejos
+            '--shards', str(args.shards_pdf),
             '--caratulas-dir', args.caratulas_dir, '--port', '8800']
     print(f"[Anejo 5] Ejecutando con concurrency={concurrency}, merge-workers={merge_workers}: {' '.join(cmd3)}")
     print(f"[Anejo 5] Conversión HTML→PDF en tiempo real...")
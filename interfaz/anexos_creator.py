@@ -25,13 +25,16 @@ import shutil
 import json
 import os
 import argparse
+import hashlib
 import logging
 import queue
 import re
 import subprocess
 import sys
+import threading
 import time
 import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
 from io import BytesIO
@@ -174,11 +177,14 @@ class RunConfig:
     center: Optional[str] = None
     centers: Optional[str] = None
     exclude_without_photos: bool = False  # Photo filtering for Anejo 5
+    excel_cache_dir: Optional[Path] = None  # Instantáneas Parquet de los Excel (opcional)
 
     # --- MOVE-TO-NAS ---
     local_out_root: Optional[Path] = None
     nas_centers_dir: Optional[Path] = None
     dry_run: bool = False
+    nas_workers: int = 4
+    verificar_destino: bool = False  # Re-hashear en el NAS los archivos que se dan por iguales
 
 
 
@@ -995,6 +1001,157 @@ class DefaultCertificateRepository:
 # ---------------- Excel Repository ----------------
 
 
+class WorkbookCache:
+    """
+    Caché de libros Excel ya parseados, compartida por todos los generadores del proceso.
+
+    Cada hoja se lee y limpia una sola vez por fichero (clave: ruta + tamaño + mtime);
+    los anexos 2, 3 y 4 reciben copias superficiales de los mismos DataFrames, que deben
+    tratarse como de solo lectura. Opcionalmente guarda una instantánea columnar
+    (Parquet, requiere pyarrow) en ``snapshot_dir/<sha1 del Excel>/`` para que las
+    siguientes ejecuciones sobre el mismo fichero no vuelvan a pasar por openpyxl.
+    """
+
+    SNAPSHOT_FORMAT_VERSION = 1
+
+    def __init__(self, snapshot_dir: Optional[Path] = None) -> None:
+        self.snapshot_dir = snapshot_dir
+        self._entries: Dict[Tuple[str, int, int], Dict[str, object]] = {}
+
+    def set_snapshot_dir(self, snapshot_dir: Optional[Path]) -> None:
+        self.snapshot_dir = snapshot_dir
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    @staticmethod
+    def _file_key(excel_path: Path) -> Tuple[str, int, int]:
+        st = excel_path.stat()
+        return (str(excel_path.resolve()), st.st_size, st.st_mtime_ns)
+
+    @staticmethod
+    def _file_hash(excel_path: Path) -> str:
+        h = hashlib.sha1()
+        with open(excel_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    @staticmethod
+    def _parquet_available() -> bool:
+        try:
+            import pyarrow  # noqa: F401  # type: ignore
+            return True
+        except ImportError:
+            return False
+
+    def _snapshot_path(self, entry: Dict[str, object], excel_path: Path) -> Optional[Path]:
+        if self.snapshot_dir is None or not self._parquet_available():
+            return None
+        if "sha1" not in entry:
+            entry["sha1"] = self._file_hash(excel_path)
+        return self.snapshot_dir / f"{entry['sha1']}_v{self.SNAPSHOT_FORMAT_VERSION}"
+
+    @staticmethod
+    def _snapshot_file(snap: Path, sheet: str) -> Path:
+        return snap / f"{clean_name(sheet)}.parquet"
+
+    def _entry(self, excel_path: Path) -> Dict[str, object]:
+        key = self._file_key(excel_path)
+        entry = self._entries.get(key)
+        if entry is None:
+            # Fichero nuevo o modificado: descartar versiones anteriores de la misma ruta
+            for old in [k for k in self._entries if k[0] == key[0]]:
+                del self._entries[old]
+            entry = {"sheet_names": None, "frames": {}}
+            self._entries[key] = entry
+        return entry
+
+    def _load_from_snapshot(
+        self, entry: Dict[str, object], excel_path: Path, sheets: List[str]
+    ) -> None:
+        snap = self._snapshot_path(entry, excel_path)
+        if snap is None or not snap.is_dir():
+            return
+        frames: Dict[str, pd.DataFrame] = entry["frames"]  # type: ignore[assignment]
+        try:
+            if entry["sheet_names"] is None:
+                entry["sheet_names"] = json.loads(
+                    (snap / "sheet_names.json").read_text(encoding="utf-8")
+                )
+            for sheet in sheets:
+                f = self._snapshot_file(snap, sheet)
+                if sheet not in frames and f.exists():
+                    frames[sheet] = pd.read_parquet(f)
+                    logger.info(f"-> Hoja {sheet} cargada desde instantánea")
+        except Exception as e:
+            logger.warning(f"[WARN] Instantánea de {excel_path.name} no utilizable: {e}")
+
+    def _save_snapshot(
+        self, entry: Dict[str, object], excel_path: Path, sheets: List[str]
+    ) -> None:
+        snap = self._snapshot_path(entry, excel_path)
+        if snap is None:
+            return
+        frames: Dict[str, pd.DataFrame] = entry["frames"]  # type: ignore[assignment]
+        try:
+            snap.mkdir(parents=True, exist_ok=True)
+            (snap / "sheet_names.json").write_text(
+                json.dumps(entry["sheet_names"], ensure_ascii=False), encoding="utf-8"
+            )
+            for sheet in sheets:
+                tmp = self._snapshot_file(snap, sheet).with_suffix(".tmp")
+                frames[sheet].to_parquet(tmp, index=False)
+                os.replace(tmp, self._snapshot_file(snap, sheet))
+        except Exception as e:
+            logger.warning(f"[WARN] No se pudo guardar la instantánea de {excel_path.name}: {e}")
+
+    def get_sheets(
+        self,
+        excel_path: Path,
+        sheets: Sequence[str],
+        loader,
+        prefetch: Sequence[str] = (),
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Devuelve las hojas pedidas ya limpias. ``loader(xls, sheet)`` se invoca solo para
+        las hojas que aún no están en memoria ni en la instantánea, abriendo el Excel una vez.
+        Si hay que abrirlo, se aprovecha para cargar también las hojas de ``prefetch`` que
+        existan en el libro, de modo que las siguientes peticiones no lo vuelvan a abrir.
+        """
+        entry = self._entry(excel_path)
+        frames: Dict[str, pd.DataFrame] = entry["frames"]  # type: ignore[assignment]
+        pending = [s for s in sheets if s not in frames]
+        if pending:
+            self._load_from_snapshot(entry, excel_path, list(dict.fromkeys([*pending, *prefetch])))
+            pending = [s for s in sheets if s not in frames]
+
+        if entry["sheet_names"] is None or pending:
+            with pd.ExcelFile(excel_path) as xls:
+                entry["sheet_names"] = list(xls.sheet_names)
+                missing = [s for s in sheets if s not in xls.sheet_names]
+                if missing:
+                    raise ValueError(f"Hojas faltantes en el Excel: {', '.join(missing)}")
+                if pending:
+                    pending += [s for s in prefetch
+                                if s in xls.sheet_names and s not in frames and s not in pending]
+                for sheet in pending:
+                    frames[sheet] = loader(xls, sheet)
+            if pending:
+                self._save_snapshot(entry, excel_path, pending)
+        else:
+            missing = [s for s in sheets if s not in entry["sheet_names"]]  # type: ignore[operator]
+            if missing:
+                raise ValueError(f"Hojas faltantes en el Excel: {', '.join(missing)}")
+
+        # Copias superficiales: los generadores pueden añadir/quitar columnas sin tocar la caché
+        return {s: frames[s].copy(deep=False) for s in sheets}
+
+
+# Una única caché por proceso: todos los anexos y Excels de la ejecución la comparten
+WORKBOOK_CACHE = WorkbookCache()
+
+
 class DefaultExcelRepository:
     """
     Implementa la lectura y limpieza de las hojas usadas por los diferentes anexos.
@@ -1045,22 +1202,26 @@ class DefaultExcelRepository:
             except Exception:
                 pass
 
+    def __init__(self, cache: Optional[WorkbookCache] = None) -> None:
+        self.cache = cache if cache is not None else WORKBOOK_CACHE
+
+    def _parse_sheet(self, xls: pd.ExcelFile, sheet: str) -> pd.DataFrame:
+        logger.info(f"-> Procesando hoja: {sheet}")
+        df = pd.read_excel(xls, sheet, header=0, dtype=str)
+        df = self._delete_trash_rows(df).fillna("")
+        self._round_numeric(df)
+        return df
+
     def _load_sheets(
         self, excel_path: Path, sheets_map: Dict[str, str]
     ) -> Dict[str, pd.DataFrame]:
-        """Método genérico para cargar hojas específicas."""
-        with pd.ExcelFile(excel_path) as xls:
-            missing = [s for s in sheets_map if s not in xls.sheet_names]
-            if missing:
-                raise ValueError(f"Hojas faltantes en el Excel: {', '.join(missing)}")
-            data: Dict[str, pd.DataFrame] = {}
-            for sheet in sheets_map:
-                logger.info(f"-> Procesando hoja: {sheet}")
-                df = pd.read_excel(xls, sheet, header=0, dtype=str)
-                df = self._delete_trash_rows(df).fillna("")
-                self._round_numeric(df)
-                data[sheet] = df
-        return data
+        """
+        Método genérico para cargar hojas específicas (vía caché de libros). La primera
+        lectura del Excel deja en caché todas las hojas de SHEETS_MAP: los anexos 2, 3 y 4
+        abren el libro una sola vez.
+        """
+        return self.cache.get_sheets(excel_path, list(sheets_map), self._parse_sheet,
+                                     prefetch=list(self.SHEETS_MAP))
 
     def load_sheets_for_anexo2(self, excel_path: Path) -> Dict[str, pd.DataFrame]:
         """Carga solo la hoja 'Conta' para el Anexo 2."""
@@ -2415,6 +2576,10 @@ class Anexo7Generator:
 # Orquestador / Aplicación
 # =====================================================================================
 
+HASH_CHUNK_SIZE = 1 << 20  # lectura por bloques de 1 MiB al calcular checksums
+NAS_SYNC_MANIFEST = ".sync_anejos.json"  # hashes de lo copiado a cada carpeta ANEJOS
+
+
 class MoveToNASService:
     """
     Mueve archivos DOCX/PDF desde una carpeta local organizada por centros (Cxxxx)
@@ -2430,12 +2595,20 @@ class MoveToNASService:
         targets: Optional[set[str]] = None,
         dry_run: bool = False,
         anexo1_files: Optional[list[tuple[Path, str]]] = None,  # (src, nombre_destino)
+        workers: int = 4,
+        verificar_destino: bool = False,
     ) -> None:
         self.local_root = local_root
         self.nas_centers_dir = nas_centers_dir
         self.targets = targets
         self.dry_run = dry_run
         self.anexo1_files = anexo1_files or []
+        self.workers = workers
+        self.verificar_destino = verificar_destino
+        self._nas_dirs: Optional[List[Tuple[str, Path]]] = None
+        self._registros: Dict[Path, dict] = {}
+        self._registros_pendientes: set[Path] = set()
+        self._lock = threading.Lock()
 
     @staticmethod
     def _is_center_dir(p: Path) -> bool:
@@ -2483,48 +2656,153 @@ class MoveToNASService:
             
         return files
 
-    def _find_nas_dest_for_center(self, center_id: str) -> Optional[Path]:
-        center_id = center_id.upper()
-        
-        # Buscar primero en el nivel superior
+    def _nas_center_dirs(self) -> List[Tuple[str, Path]]:
+        """
+        Mapa (nombre en mayúsculas, carpeta) del NAS, construido una sola vez:
+        primero el nivel superior y después un nivel más profundo (mismo orden de búsqueda).
+        """
+        if self._nas_dirs is not None:
+            return self._nas_dirs
+        top: List[Tuple[str, Path]] = []
+        deep: List[Tuple[str, Path]] = []
         for d in self.nas_centers_dir.iterdir():
             if not d.is_dir():
                 continue
-            if center_id in d.name.upper():
-                return d / "ANEJOS"
-        
-        # Si no encuentra en nivel superior, buscar en subdirectorios (un nivel más profundo)
-        for parent_dir in self.nas_centers_dir.iterdir():
-            if not parent_dir.is_dir():
-                continue
+            top.append((d.name.upper(), d))
             try:
-                for sub_dir in parent_dir.iterdir():
-                    if not sub_dir.is_dir():
-                        continue
-                    if center_id in sub_dir.name.upper():
-                        return sub_dir / "ANEJOS"
+                deep.extend((sub.name.upper(), sub) for sub in d.iterdir() if sub.is_dir())
             except (PermissionError, OSError):
                 continue
-                
+        self._nas_dirs = top + deep
+        logger.info(f"Mapa de carpetas NAS: {len(top)} de primer nivel, {len(deep)} subcarpetas")
+        return self._nas_dirs
+
+    def _find_nas_dest_for_center(self, center_id: str) -> Optional[Path]:
+        center_id = center_id.upper()
+        for name, d in self._nas_center_dirs():
+            if center_id in name:
+                return d / "ANEJOS"
         return None
 
     @staticmethod
-    def _copy_if_needed(src: Path, dst: Path, dry_run: bool) -> bool:
+    def _file_hash(path: Path) -> str:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    # --- Registro de copias verificadas (NAS_SYNC_MANIFEST en cada carpeta ANEJOS) ---
+    # {nombre: {"sha256", "size", "mtime_ns"}}: el hash verificado del archivo en el NAS y su
+    # estado tras copiarlo. Mientras el destino conserve ese tamaño y mtime, se compara contra
+    # el registro sin volver a leer el archivo por la red (salvo con verificar_destino, que
+    # detecta también corrupciones que no cambian tamaño ni mtime).
+
+    def _registro(self, dest_dir: Path) -> dict:
+        with self._lock:
+            reg = self._registros.get(dest_dir)
+            if reg is None:
+                try:
+                    reg = json.loads((dest_dir / NAS_SYNC_MANIFEST).read_text(encoding="utf-8"))
+                except (OSError, ValueError):
+                    reg = {}
+                self._registros[dest_dir] = reg
+            return reg
+
+    def _registrar(self, dst: Path, digest: str) -> None:
+        st = dst.stat()
+        reg = self._registro(dst.parent)
+        with self._lock:
+            reg[dst.name] = {"sha256": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+            self._registros_pendientes.add(dst.parent)
+
+    def _guardar_registros(self) -> None:
+        for dest_dir in sorted(self._registros_pendientes):
+            path = dest_dir / NAS_SYNC_MANIFEST
+            tmp = path.with_name(path.name + ".partial")
+            try:
+                tmp.write_text(json.dumps(self._registros[dest_dir], indent=2), encoding="utf-8")
+                os.replace(tmp, path)
+            except OSError as e:
+                logger.warning(f"No se pudo guardar {path}: {e}")
+        self._registros_pendientes.clear()
+
+    def _dst_digest(self, dst: Path) -> Optional[str]:
+        """
+        Hash del destino: el registrado si sigue vigente (mismo tamaño y mtime); si no, o con
+        verificar_destino, se lee el archivo y se registra.
+        """
+        try:
+            st = dst.stat()
+        except OSError:
+            return None
+        entry = self._registro(dst.parent).get(dst.name)
+        if (not self.verificar_destino and entry and entry.get("size") == st.st_size
+                and entry.get("mtime_ns") == st.st_mtime_ns):
+            return entry.get("sha256")
+        digest = self._file_hash(dst)
+        self._registrar(dst, digest)
+        return digest
+
+    def _same_content(self, src: Path, dst: Path) -> bool:
+        try:
+            if dst.stat().st_size != src.stat().st_size:
+                return False
+        except OSError:
+            return False
+        return self._file_hash(src) == self._dst_digest(dst)
+
+    def _copy_verified(self, src: Path, dst: Path) -> None:
+        """
+        Copia a <dst>.partial calculando el hash del origen por el camino, relee el .partial
+        una vez para comprobar que su SHA-256 coincide, renombra y registra ese hash.
+        """
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dst.with_name(dst.name + ".partial")
+        h_src = hashlib.sha256()
+        escritos = 0
+        with open(src, "rb") as fi, open(tmp, "wb") as fo:
+            for chunk in iter(lambda: fi.read(HASH_CHUNK_SIZE), b""):
+                h_src.update(chunk)
+                fo.write(chunk)
+                escritos += len(chunk)
+            fo.flush()
+            os.fsync(fo.fileno())
+        shutil.copystat(src, tmp)
+        if (tmp.stat().st_size != escritos or src.stat().st_size != escritos
+                or self._file_hash(tmp) != h_src.hexdigest()):
+            tmp.unlink(missing_ok=True)
+            raise IOError(f"checksum distinto tras copiar {src.name}")
+        os.replace(tmp, dst)
+        self._registrar(dst, h_src.hexdigest())
+
+    def _copy_if_needed(self, src: Path, dst: Path, dry_run: bool) -> bool:
         """
-        Copia si no existe o si difiere por tamaño. Devuelve True si se copia (o se copiaría).
+        Copia si no existe o si el contenido difiere (hash SHA-256). Devuelve True si se
+        copia (o se copiaría).
         """
         if not src.exists():
             return False
-        if dst.exists():
-            try:
-                if dst.stat().st_size == src.stat().st_size:
-                    return False  # ya está igual
-            except Exception:
-                pass
+        if dst.exists() and self._same_content(src, dst):
+            return False  # ya está igual
         if dry_run:
             return True
-        dst.parent.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(src, dst)
+        self._copy_verified(src, dst)
+        return True
+
+    def _move_verified(self, src: Path, dst: Path) -> bool:
+        """Mueve src -> dst: copia verificada (o contenido ya idéntico) y borrado del origen."""
+        if self.dry_run:
+            logger.info(f"   [SIMULAR] mover {src}  ->  {dst}")
+            return False
+        if dst.exists() and self._same_content(src, dst):
+            src.unlink()
+            comprobado = "checksum del destino OK" if self.verificar_destino else "checksum registrado OK"
+            logger.info(f"   = {src.name} ya estaba en destino ({comprobado})")
+            return True
+        self._copy_verified(src, dst)
+        src.unlink()
+        logger.info(f"   ✓ {src.name} -> {dst.name}")
         return True
 
     def execute(self) -> int:
@@ -2537,8 +2815,9 @@ class MoveToNASService:
             return 2
 
         logger.info(f"Centros locales detectados: {', '.join(c.name for c in centers)}")
-        moved = 0
         missing: List[str] = []
+        copies: List[Tuple[str, Path, Path]] = []   # Anejo 1
+        moves: List[Tuple[str, Path, Path]] = []    # anexos generados
 
         for cdir in centers:
             cid = cdir.name.upper()
@@ -2550,39 +2829,46 @@ class MoveToNASService:
                 missing.append(cid)
                 continue
 
-            dest.mkdir(parents=True, exist_ok=True)
+            if not self.dry_run:
+                dest.mkdir(parents=True, exist_ok=True)
             logger.info(f"- {cid}: destino = {dest}")
 
             # 1) Copiar siempre Anejo 1 si tenemos las plantillas localizadas
-            for src, dest_name in self.anexo1_files:
-                try:
-                    target = dest / dest_name
-                    if self._copy_if_needed(src, target, self.dry_run):
-                        logger.info(f"   {'[SIMULAR] ' if self.dry_run else ''}Anejo 1 -> {target.name}")
-                except Exception as e:
-                    logger.error(f"   ! Error copiando Anejo 1 ({src.name}): {e}")
+            copies.extend((cid, src, dest / dest_name) for src, dest_name in self.anexo1_files)
 
             # 2) Mover anexos DOCX/PDF generados localmente para este centro
             if not files:
                 logger.info("   (sin DOCX/PDF locales para mover)")
-                continue
+            moves.extend((cid, src, dest / src.name) for src in files)
 
-            for src in files:
-                dst = dest / src.name
-                if self.dry_run:
-                    logger.info(f"   [SIMULAR] mover {src}  ->  {dst}")
-                    continue
-                try:
-                    if dst.exists():
-                        try:
-                            dst.unlink()
-                        except Exception:
-                            pass
-                    shutil.move(str(src), str(dst))
-                    moved += 1
-                    logger.info(f"   ✓ {src.name} -> {dst.name}")
-                except Exception as e:
-                    logger.error(f"   ! Error moviendo {src.name}: {e}")
+        def copy_job(job: Tuple[str, Path, Path]) -> bool:
+            cid, src, target = job
+            try:
+                if self._copy_if_needed(src, target, self.dry_run):
+                    logger.info(f"   {'[SIMULAR] ' if self.dry_run else ''}{cid}: Anejo 1 -> {target.name}")
+                return True
+            except Exception as e:
+                logger.error(f"   ! {cid}: error copiando Anejo 1 ({src.name}): {e}")
+                return False
+
+        def move_job(job: Tuple[str, Path, Path]) -> bool:
+            cid, src, dst = job
+            try:
+                return self._move_verified(src, dst)
+            except Exception as e:
+                logger.error(f"   ! {cid}: error moviendo {src.name}: {e}")
+                return False
+
+        t0 = time.time()
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+                list(pool.map(copy_job, copies))
+                moved = sum(pool.map(move_job, moves))
+        finally:
+            if not self.dry_run:
+                self._guardar_registros()
+        logger.info(f"Sincronización NAS: {len(copies) + len(moves)} archivos en {time.time() - t0:.1f}s "
+                    f"({self.workers} hilos)")
 
         if self.dry_run:
             logger.info("\n[SIMULACIÓN COMPLETADA] No se ha movido ningún archivo.")
@@ -2664,7 +2950,8 @@ def run_application(config: RunConfig) -> int:
     templates = DefaultTemplateProvider(config.word_dir)
     word = DefaultWordExporter()
     pdf = DefaultPdfInspector()
-    excel = DefaultExcelRepository()
+    WORKBOOK_CACHE.set_snapshot_dir(config.excel_cache_dir)
+    excel = DefaultExcelRepository(WORKBOOK_CACHE)
     out = DefaultOutputPathBuilder()
     factory = AnexoFactory(
         templates, word, pdf, excel, out, config.cee_dir, config.plans_dir, config
@@ -2841,6 +3128,8 @@ def run_move_to_nas(config: RunConfig) -> int:
         targets=targets,
         dry_run=config.dry_run,
         anexo1_files=anexo1_files,
+        workers=config.nas_workers,
+        verificar_destino=config.verificar_destino,
     )
     return svc.execute()
 
@@ -2871,11 +3160,15 @@ def parse_args(argv: Optional[Sequence[str]] = None) -> RunConfig:
     parser.add_argument("--center", help="Un centro: Cxxxx")
     parser.add_argument("--centers", help="Expresión de centros: C0001-C0010, C0012")
     parser.add_argument("--exclude-without-photos", action="store_true", help="Excluir elementos sin fotos del Anejo 5")
+    parser.add_argument("--excel-cache-dir", help="Carpeta para instantáneas Parquet de los Excel ya leídos (opcional, requiere pyarrow)")
 
     # --- MOVE-TO-NAS ---
     parser.add_argument("--local-out-root", help="Raíz local con subcarpetas Cxxxx (o Cxxxx/anexos)")
     parser.add_argument("--nas-centers-dir", help="Carpeta del NAS con 01_Cxxxx_* / 02_Cxxxx_*")
     parser.add_argument("--dry-run", action="store_true", help="Simula (no mueve)")
+    parser.add_argument("--nas-workers", type=int, default=4, help="Copias simultáneas hacia el NAS (default 4)")
+    parser.add_argument("--verificar-destino", action="store_true",
+                        help="Re-hashea en el NAS los archivos que el registro da por iguales (lento; detecta corrupción sin cambio de tamaño)")
 
     ns = parser.parse_args(argv)
 
@@ -2898,10 +3191,13 @@ def parse_args(argv: Optional[Sequence[str]] = None) -> RunConfig:
         center=ns.center,
         centers=ns.centers,
         exclude_without_photos=bool(getattr(ns, 'exclude_without_photos', False)),
+        excel_cache_dir=_p(ns.excel_cache_dir),
         # move-to-nas
         local_out_root=_p(ns.local_out_root),
         nas_centers_dir=_p(ns.nas_centers_dir),
         dry_run=bool(ns.dry_run),
+        nas_workers=ns.nas_workers,
+        verificar_destino=bool(ns.verificar_destino),
     )
 
     if cfg.action == "generate":
@@ -58,9 +58,10 @@ Ejemplo línea de comandos completo:
 
 from __future__ import annotations
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
-import argparse, json, re, unicodedata, difflib, math, os, sys
+from typing import Dict, List, NamedTuple, Tuple, Optional
+import argparse, json, re, unicodedata, difflib, math, os, sys, io, contextlib, multiprocessing
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
 import openpyxl  # noqa: F401
@@ -798,20 +799,88 @@ def _clean(v):
     s = str(v).strip()
     return NORMALIZE_EMPTY_TO if s == "" or s.lower() == "nan" else s
 
-def _read_sheet(xls: pd.ExcelFile, names: List[str]) -> Optional[pd.DataFrame]:
+# Caracteres que str.strip() considera espacio (incluye \x1c-\x1f, que Unicode no)
+_WHITESPACE_PY = "".join(ch for ch in map(chr, range(0x3000 + 1)) if ch.isspace())
+
+def _clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aplica _clean a todas las celdas de una sola vez (mismo resultado que celda a celda).
+    Con pyarrow se hace en una pasada vectorizada sobre la hoja completa; sin él, se
+    usa _clean celda a celda como antes.
+    """
+    if df.empty:
+        return df
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError:
+        for c in df.columns:
+            df[c] = df[c].apply(_clean)
+        return df
+
+    # to_numpy(object) conserva Timestamp/float/int tal cual → str() igual que en _clean
+    flat = df.to_numpy(dtype=object).ravel()
+    nulos = pd.isna(flat)
+    try:
+        arr = pa.array(flat, type=pa.string(), from_pandas=True)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        # celdas no-texto (números, fechas…): convertir con str() como hace _clean
+        arr = pa.array(pd.Series(flat).where(~nulos, "").astype(str), type=pa.string())
+    txt = pc.utf8_trim(arr, characters=_WHITESPACE_PY)
+    vacio = pc.or_(pc.equal(txt, ""), pc.equal(pc.utf8_lower(txt), "nan"))
+    vacio = pc.or_(pc.fill_null(vacio, True), pa.array(nulos))
+    out = pc.if_else(vacio, NORMALIZE_EMPTY_TO, txt).to_numpy(zero_copy_only=False)
+    return pd.DataFrame(out.reshape(df.shape), index=df.index, columns=df.columns)
+
+def _read_sheet(xls: pd.ExcelFile, names: List[str], usecols=None) -> Optional[pd.DataFrame]:
     for nm in xls.sheet_names:
         for cand in names:
             if nm.strip().lower() == cand.strip().lower():
-                df = xls.parse(nm, dtype=str, engine="openpyxl").fillna("")
+                t0 = time.perf_counter()
+                df = xls.parse(nm, dtype=str, engine="openpyxl", usecols=usecols).fillna("")
                 df.columns = [str(c).strip() for c in df.columns]
-                for c in df.columns:
-                    df[c] = df[c].apply(_clean)
+                df = _clean_frame(df)
+                SHEET_PARSE_TIMES[nm] = time.perf_counter() - t0
                 return df
     return None
 
+# Libro leído una sola vez y compartido por _read_all_sheets y _read_consul
+SHEET_PARSE_TIMES: Dict[str, float] = {}
+_WORKBOOK_CACHE: Dict[tuple, Tuple[Dict[str, Optional[pd.DataFrame]], Optional[pd.DataFrame]]] = {}
+_WORKBOOK_CACHE_MAX = 4
+
+def _read_workbook(xlsx: Path) -> Tuple[Dict[str, Optional[pd.DataFrame]], Optional[pd.DataFrame]]:
+    """
+    Abre el Excel una sola vez y lee las hojas de datos (SHEETS) y la hoja Consul
+    (solo las columnas que usa _consul_index_from_sections). Se cachea por
+    (ruta, tamaño, mtime) para que _read_all_sheets y _read_consul no lo reabran.
+    """
+    xlsx = Path(xlsx)
+    st = xlsx.stat()
+    key = (str(xlsx.resolve()), st.st_size, st.st_mtime_ns)
+    if key in _WORKBOOK_CACHE:
+        return _WORKBOOK_CACHE[key]
+
+    SHEET_PARSE_TIMES.clear()
+    t0 = time.perf_counter()
+    with pd.ExcelFile(xlsx, engine="openpyxl") as xls:
+        t_open = time.perf_counter() - t0
+        dfs = {k: _read_sheet(xls, v) for k, v in SHEETS.items() if k != "CONSUL"}
+        df_consul = _read_sheet(xls, ["consul"], usecols=_consul_usecol)
+        dfs["CONSUL"] = df_consul if df_consul is not None else _read_sheet(xls, SHEETS["CONSUL"])
+
+    print(f"[INFO] Excel abierto en {t_open:.2f}s; hojas leídas en {time.perf_counter() - t0 - t_open:.2f}s")
+    for nm, seg in sorted(SHEET_PARSE_TIMES.items(), key=lambda kv: -kv[1]):
+        print(f"   · {nm}: {seg:.2f}s")
+
+    if len(_WORKBOOK_CACHE) >= _WORKBOOK_CACHE_MAX:
+        _WORKBOOK_CACHE.pop(next(iter(_WORKBOOK_CACHE)))
+    _WORKBOOK_CACHE[key] = (dfs, df_consul)
+    return dfs, df_consul
+
 def _read_all_sheets(xlsx: Path) -> Dict[str, pd.DataFrame]:
-    xls = pd.ExcelFile(xlsx, engine="openpyxl")
-    return {k: _read_sheet(xls, v) for k, v in SHEETS.items()}
+    dfs, _ = _read_workbook(xlsx)
+    return {k: (df.copy(deep=False) if df is not None else None) for k, df in dfs.items()}
 
 def _rename_row(sr: pd.Series, mapping: Dict[str, str]) -> Dict[str, str]:
     return {k: _clean(sr.get(col)) for k, col in mapping.items()}
@@ -823,13 +892,179 @@ def _safe_name(s: str) -> str:
 # Optimizaciones y cachés
 # --------------------------
 from functools import lru_cache
-from collections import defaultdict
+from collections import Counter, defaultdict
+import sqlite3
+import hashlib
 import time
 
 # Cache para normalización de slugs
 _slug_cache = {}
 # Cache para índices de archivos por carpeta
 _file_index_cache = {}
+# Cache en proceso del listado de ficheros por carpeta raíz: {ruta_abs: [(Path, realpath), ...]}
+_tree_listing_cache = {}
+
+# Índice persistente de fotos (SQLite en la caché del usuario, uno por árbol de fotos).
+# None = desactivado. No se guarda dentro de --fotos-root: crear y borrar el journal de
+# SQLite allí cambiaría el mtime de la raíz (que se re-escanearía en cada ejecución) y
+# escribiría en lo que suele ser una carpeta compartida del NAS.
+PHOTO_INDEX_DB_NAME = ".indice_fotos.sqlite"
+PHOTO_INDEX_CACHE_DIR = Path(os.environ.get("LOCALAPPDATA") or Path.home() / ".cache") / "anexos_indice_fotos"
+_photo_index_store_path: Optional[Path] = None
+
+def default_photo_index_path(fotos_root: Path) -> Path:
+    """Ruta por defecto del índice de un árbol de fotos: caché del usuario + hash de la raíz."""
+    clave = hashlib.sha1(os.path.normcase(os.path.abspath(str(fotos_root))).encode("utf-8")).hexdigest()[:16]
+    return PHOTO_INDEX_CACHE_DIR / f"{Path(PHOTO_INDEX_DB_NAME).stem}_{clave}.sqlite"
+
+def _set_photo_index_store(db_path: Optional[Path]) -> None:
+    """Configura (o desactiva con None) el fichero SQLite del índice persistente."""
+    global _photo_index_store_path
+    _photo_index_store_path = Path(db_path) if db_path else None
+    _tree_listing_cache.clear()
+    _file_index_cache.clear()
+    _fuzzy_index_cache.clear()
+    _photo_lookup_cache.clear()
+
+class _PhotoIndexStore:
+    """
+    Almacén SQLite con el listado de cada carpeta del árbol de fotos.
+    Por carpeta guarda su mtime (ns), los ficheros [nombre, realpath] y las subcarpetas,
+    de modo que una carpeta cuyo mtime no ha cambiado no se vuelve a listar.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS dirs ("
+            " path TEXT PRIMARY KEY,"
+            " mtime_ns INTEGER NOT NULL,"
+            " files TEXT NOT NULL,"
+            " subdirs TEXT NOT NULL)"
+        )
+
+    def get(self, dir_path: str) -> Optional[tuple]:
+        row = self.conn.execute(
+            "SELECT mtime_ns, files, subdirs FROM dirs WHERE path = ?", (dir_path,)
+        ).fetchone()
+        if not row:
+            return None
+        return row[0], json.loads(row[1]), json.loads(row[2])
+
+    def put(self, dir_path: str, mtime_ns: int, files: list, subdirs: list) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO dirs (path, mtime_ns, files, subdirs) VALUES (?, ?, ?, ?)",
+            (dir_path, mtime_ns, json.dumps(files, ensure_ascii=False), json.dumps(subdirs, ensure_ascii=False)),
+        )
+
+    def forget_tree(self, dir_path: str) -> None:
+        """Elimina una carpeta desaparecida y todo su subárbol."""
+        prefix = dir_path.rstrip("\\/") + os.sep
+        self.conn.execute(
+            "DELETE FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?",
+            (dir_path, len(prefix), prefix),
+        )
+
+    def close(self) -> None:
+        try:
+            self.conn.commit()
+        finally:
+            self.conn.close()
+
+def _open_photo_index_store() -> Optional[_PhotoIndexStore]:
+    if not _photo_index_store_path:
+        return None
+    try:
+        return _PhotoIndexStore(_photo_index_store_path)
+    except (sqlite3.Error, OSError) as e:
+        print(f"[WARN] Índice persistente no disponible ({_photo_index_store_path}): {e}")
+        return None
+
+def _list_tree_files(root: Path) -> List[Tuple[Path, str]]:
+    """
+    Lista todos los ficheros bajo 'root' como [(Path, realpath), ...] en el mismo orden
+    que root.rglob("*") (preorden: ficheros de la carpeta y luego cada subcarpeta).
+    Si hay índice persistente, solo se vuelven a listar las carpetas cuyo mtime cambió.
+    """
+    cache_key = os.path.abspath(str(root))
+    if cache_key in _tree_listing_cache:
+        return _tree_listing_cache[cache_key]
+
+    store = _open_photo_index_store()
+    out: List[Tuple[Path, str]] = []
+    stats = {"reutilizadas": 0, "escaneadas": 0}
+
+    def sin_indice(e: sqlite3.Error):
+        # BD de solo lectura (creada por otro usuario en el recurso compartido) o bloqueada por
+        # otro proceso: se avisa una vez y se sigue listando el árbol sin índice
+        nonlocal store
+        print(f"[WARN] Índice persistente no escribible ({_photo_index_store_path}): {e}; se continúa sin él")
+        with contextlib.suppress(sqlite3.Error):
+            store.conn.close()
+        store = None
+
+    def visit(dir_path: Path):
+        key = os.path.abspath(str(dir_path))
+        try:
+            mtime_ns = os.stat(key).st_mtime_ns
+        except OSError:
+            return
+
+        cached = None
+        if store:
+            try:
+                cached = store.get(key)
+            except sqlite3.Error as e:
+                sin_indice(e)
+        if cached and cached[0] == mtime_ns:
+            files, subdirs = cached[1], cached[2]
+            stats["reutilizadas"] += 1
+        else:
+            files, subdirs = [], []
+            try:
+                with os.scandir(key) as it:
+                    entries = list(it)
+            except PermissionError:
+                entries = []
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.is_file():
+                        files.append([entry.name, os.path.realpath(entry.path)])
+                except OSError:
+                    continue
+            stats["escaneadas"] += 1
+            if store:
+                try:
+                    if cached:
+                        for gone in set(cached[2]) - set(subdirs):
+                            store.forget_tree(os.path.join(key, gone))
+                    store.put(key, mtime_ns, files, subdirs)
+                except sqlite3.Error as e:
+                    sin_indice(e)
+
+        for name, realpath in files:
+            out.append((dir_path / name, realpath))
+        for name in subdirs:
+            visit(dir_path / name)
+
+    try:
+        visit(root)
+    finally:
+        if store:
+            try:
+                store.close()
+            except sqlite3.Error as e:
+                print(f"[WARN] No se pudo guardar el índice persistente: {e}")
+
+    if store:
+        print(f"[INFO] Índice persistente: {stats['reutilizadas']} carpetas sin cambios, "
+              f"{stats['escaneadas']} re-escaneadas")
+    _tree_listing_cache[cache_key] = out
+    return out
 
 @lru_cache(maxsize=10000)
 def _norm_slug_cached(s: str) -> str:
@@ -869,10 +1104,10 @@ def _build_optimized_photo_index(root: Path) -> tuple[dict, dict, dict]:
     normalized_index = defaultdict(list)  # {slug_normalizado: [Path, ...]}
     path_to_info = {}  # {Path: {"stem": str, "normalized": str}}
     
-    # Una sola pasada por todos los archivos
+    # Una sola pasada por todos los archivos (listado reutilizable desde el índice persistente)
     foto_count = 0
-    for p in root.rglob("*"):
-        if p.is_file() and p.suffix.lower() in ALLOWED_EXTS:
+    for p, realpath in _list_tree_files(root):
+        if p.suffix.lower() in ALLOWED_EXTS:
             stem = p.stem
             normalized = _norm_slug_cached(stem)
             
@@ -888,7 +1123,8 @@ def _build_optimized_photo_index(root: Path) -> tuple[dict, dict, dict]:
             path_to_info[p] = {
                 "stem": stem,
                 "normalized": normalized,
-                "realpath": os.path.realpath(str(p))
+                "realpath": realpath,
+                "clase": _clasificar_foto(stem, str(p).upper()),
             }
             
             foto_count += 1
@@ -951,8 +1187,8 @@ def _list_files_index(root: Path) -> Dict[str, Path]:
         return {}
     
     file_index = {}
-    for path in root.rglob("*"):
-        if path.is_file() and path.suffix.lower() in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.gif']:
+    for path, _ in _list_tree_files(root):
+        if path.suffix.lower() in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.gif']:
             stem = path.stem
             file_index[stem] = path
     
@@ -966,8 +1202,12 @@ def _list_files_index_legacy(root: Path) -> Dict[str, Path]:
 # Búsqueda optimizada de fotos
 # --------------------------
 def _resolve_name_to_path_optimized(name_from_excel: str, exact_index: dict, 
-                                  normalized_index: dict, fuzzy_threshold: float) -> Optional[Path]:
-    """Versión optimizada de resolución de nombres a rutas."""
+                                  normalized_index: dict, fuzzy_threshold: float,
+                                  fuzzy_memo: Optional[dict] = None) -> Optional[Path]:
+    """
+    Versión optimizada de resolución de nombres a rutas.
+    'fuzzy_memo' (opcional) guarda el resultado del fuzzy por (slug normalizado, umbral).
+    """
     if not name_from_excel:
         return None
     
@@ -1003,19 +1243,158 @@ def _resolve_name_to_path_optimized(name_from_excel: str, exact_index: dict,
     
     # 3. Fuzzy matching solo si es necesario
     if fuzzy_threshold < 1.0 and normalized_index:
-        best_score = 0.0
-        best_path = None
-        
-        for norm_key, paths in normalized_index.items():
-            score = difflib.SequenceMatcher(None, normalized_target, norm_key).ratio()
-            if score > best_score and score >= fuzzy_threshold:
-                best_score = score
-                best_path = paths[0]
-        
-        return best_path
+        if fuzzy_memo is None:
+            return _fuzzy_best_path(normalized_target, normalized_index, fuzzy_threshold)
+        key = (normalized_target, fuzzy_threshold)
+        if key not in fuzzy_memo:
+            fuzzy_memo[key] = _fuzzy_best_path(normalized_target, normalized_index, fuzzy_threshold)
+        return fuzzy_memo[key]
     
     return None
 
+def _fuzzy_best_path(normalized_target: str, normalized_index: dict, fuzzy_threshold: float) -> Optional[Path]:
+    """Clave con mayor SequenceMatcher.ratio() >= umbral (la primera del índice si hay empate)."""
+    if fuzzy_threshold <= 0:
+        return _fuzzy_best_path_scan(normalized_target, normalized_index, fuzzy_threshold)
+    return _get_fuzzy_index(normalized_index).best(normalized_target, fuzzy_threshold)
+
+def _fuzzy_best_path_scan(normalized_target: str, normalized_index: dict, fuzzy_threshold: float) -> Optional[Path]:
+    """Recorrido completo del índice (referencia del motor acotado)."""
+    best_score = 0.0
+    best_path = None
+    
+    for norm_key, paths in normalized_index.items():
+        score = difflib.SequenceMatcher(None, normalized_target, norm_key).ratio()
+        if score > best_score and score >= fuzzy_threshold:
+            best_score = score
+            best_path = paths[0]
+    
+    return best_path
+
+class _FuzzyIndex:
+    """
+    Motor fuzzy acotado sobre las claves de normalized_index (construido una vez por índice).
+    Descarta candidatos con cotas que nunca eliminan una clave con ratio >= umbral:
+      - ventana de longitudes: ratio <= 2·min(la, lb) / (la + lb)
+      - trigramas: ratio >= t implica distancia de edición k <= (la + lb)·(1 - t), y por el
+        lema de q-gramas ambas claves comparten >= max(la, lb) - 2 - 3k trigramas
+      - real_quick_ratio / quick_ratio frente al umbral y al mejor ratio encontrado
+    Los candidatos del mismo centro (C\\d+) y con más trigramas compartidos se evalúan antes
+    para subir pronto el mejor ratio; el resultado es el mismo que el recorrido completo.
+    """
+
+    def __init__(self, normalized_index: dict):
+        self.normalized_index = normalized_index
+        self.keys: List[str] = list(normalized_index.keys())
+        self.by_len: Dict[int, List[int]] = defaultdict(list)
+        self.grams: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.centros: List[str] = []
+        for i, k in enumerate(self.keys):
+            self.by_len[len(k)].append(i)
+            for g, n in Counter(_ngram_list(k)).items():
+                self.grams[g].append((i, n))
+            m = _RE_CENTRO_EN_RUTA.search(k)
+            self.centros.append(m.group(0) if m else "")
+        self.stats = {"consultas": 0, "candidatos": 0, "ratios": 0}
+
+    def best(self, target: str, threshold: float) -> Optional[Path]:
+        la = len(target)
+        self.stats["consultas"] += 1
+        if la == 0:
+            return None
+
+        # Trigramas compartidos (con multiplicidad) por clave
+        shared: Dict[int, int] = defaultdict(int)
+        for g, n in Counter(_ngram_list(target)).items():
+            for i, m in self.grams.get(g, ()):
+                shared[i] += min(n, m)
+
+        m_centro = _RE_CENTRO_EN_RUTA.search(target)
+        centro = m_centro.group(0) if m_centro else ""
+        cands = []
+        for lb, idxs in self.by_len.items():
+            if 2 * min(la, lb) < threshold * (la + lb) - 1e-9:
+                continue
+            k_max = math.floor((la + lb) * (1 - threshold) + 1e-9)
+            required = max(la, lb) - 2 - 3 * k_max
+            for i in idxs:
+                if required > 0 and shared.get(i, 0) < required:
+                    continue
+                cands.append(i)
+        self.stats["candidatos"] += len(cands)
+        cands.sort(key=lambda i: (self.centros[i] != centro or not centro, -shared.get(i, 0), i))
+
+        best_score, best_i = 0.0, None
+        for i in cands:
+            sm = difflib.SequenceMatcher(None, target, self.keys[i])
+            for bound in (sm.real_quick_ratio, sm.quick_ratio):
+                ub = bound()
+                if ub < threshold or ub < best_score or (ub == best_score and i > best_i):
+                    break
+            else:
+                self.stats["ratios"] += 1
+                score = sm.ratio()
+                if score >= threshold and (score > best_score or (score == best_score and i < best_i)):
+                    best_score, best_i = score, i
+        return self.normalized_index[self.keys[best_i]][0] if best_i is not None else None
+
+def _ngram_list(s: str) -> List[str]:
+    return [s[i:i + _NGRAM] for i in range(len(s) - _NGRAM + 1)]
+
+# Un motor fuzzy por índice: {id(normalized_index): (normalized_index, _FuzzyIndex)}
+_fuzzy_index_cache = {}
+
+def _get_fuzzy_index(normalized_index: dict) -> _FuzzyIndex:
+    cached = _fuzzy_index_cache.get(id(normalized_index))
+    if cached and cached[0] is normalized_index:
+        return cached[1]
+    engine = _FuzzyIndex(normalized_index)
+    _fuzzy_index_cache[id(normalized_index)] = (normalized_index, engine)
+    return engine
+
+class _CacheResolucion:
+    """
+    Memo por ejecución de _resolve_name_to_path_optimized para las fotos declaradas en Consul.
+    Por índice de fotos guarda aciertos y fallos por (stem, umbral) y, aparte, el resultado
+    del fuzzy por (slug normalizado, umbral), que es la parte cara.
+    """
+
+    def __init__(self):
+        self._por_indice: Dict[int, tuple] = {}
+        self.consultas = 0
+        self.aciertos = 0
+        self.fuzzy_calculados = 0
+
+    def _memos(self, normalized_index: dict) -> tuple:
+        entry = self._por_indice.get(id(normalized_index))
+        if entry is None or entry[0] is not normalized_index:
+            entry = (normalized_index, {}, {})
+            self._por_indice[id(normalized_index)] = entry
+        return entry[1], entry[2]
+
+    def resolve(self, name_from_excel: str, exact_index: dict, normalized_index: dict,
+                fuzzy_threshold: float) -> Optional[Path]:
+        nombres, fuzzy = self._memos(normalized_index)
+        key = (Path(name_from_excel).stem if name_from_excel else "", fuzzy_threshold)
+        self.consultas += 1
+        if key in nombres:
+            self.aciertos += 1
+            return nombres[key]
+        antes = len(fuzzy)
+        p = _resolve_name_to_path_optimized(name_from_excel, exact_index, normalized_index,
+                                            fuzzy_threshold, fuzzy_memo=fuzzy)
+        self.fuzzy_calculados += len(fuzzy) - antes
+        nombres[key] = p
+        return p
+
+    def contadores(self) -> Tuple[int, int, int]:
+        return self.consultas, self.aciertos, self.fuzzy_calculados
+
+def _resumen_cache_resolucion(consultas: int, aciertos: int, fuzzy_calculados: int) -> str:
+    tasa = (aciertos / consultas * 100) if consultas else 0.0
+    return (f"{aciertos}/{consultas} aciertos de caché ({tasa:.1f}%), "
+            f"{fuzzy_calculados} búsquedas fuzzy calculadas")
+
 def _buscar_fotos_secuenciales_optimized(foto_base: str, normalized_index: dict, 
                                         max_photos: int = MAX_SEQUENTIAL_PHOTOS) -> List[Path]:
     """Versión optimizada de búsqueda secuencial."""
@@ -1055,25 +1434,326 @@ def _buscar_fotos_secuenciales_optimized(foto_base: str, normalized_index: dict,
     
     return rutas_extra
 
+# --------------------------
+# Motor de búsqueda por prefijos / n-gramas
+# --------------------------
+_NGRAM = 3
+_RE_CENTRO_EN_RUTA = re.compile(r'C\d+')
+_RE_STEM_CENTRO = re.compile(r'^C\d+', re.IGNORECASE)
+# Carpeta de centro en una ruta: un componente que empieza por C+dígitos (C0012_COLEGIO)
+_RE_CENTRO_CARPETA = re.compile(r'(?:^|[\\/])(C\d+)')
+_EQUIPO_TIPOS = {"CLIMA", "EQHORIZ", "ELEVA", "OTROSEQ", "ILUM", "ENVOL", "SISTCC"}
+
+# Patrones MÁS ESPECÍFICOS para acometidas - solo estas fotos
+_ACOM_PATTERNS = [re.compile(p, re.IGNORECASE) for p in [
+    r'.*acom.*',           # Contiene "acom"
+    r'.*acometida.*',      # Contiene "acometida"
+    r'.*bateria.*',        # Contiene "bateria"
+    r'.*ct\b.*',           # Contiene "ct" (centro transformación) como palabra completa
+    r'.*centro.*transf.*', # Centro de transformación
+    r'.*cdro.*ppal.*',     # Cuadro principal
+    r'.*cdro.*secund.*',   # Cuadro secundario
+    r'.*cuadro.*principal.*', # Cuadro principal
+    r'.*cuadro.*secundario.*', # Cuadro secundario
+    r'.*cgbt.*',           # Centro general de baja tensión
+    r'.*suministro.*',     # Suministro eléctrico
+    r'.*contador.*',       # Contador eléctrico
+    r'.*medida.*',         # Medida eléctrica
+]]
+# Verificación adicional: NO debe contener patrones de otros equipos
+_ACOM_EXCLUDED = [re.compile(p, re.IGNORECASE) for p in [
+    r'.*clima.*', r'.*calef.*', r'.*ilum.*', r'.*lamp.*',
+    r'.*ascens.*', r'.*elevador.*', r'.*bomba.*(?!.*contador)',
+    r'.*ventil.*', r'.*radiador.*', r'.*termo.*'
+]]
+
+# --------------------------
+# Registro de patrones de entidad (compilado una vez; cada foto se clasifica al indexar)
+# --------------------------
+# Patrones de nombre esperados por tipo de entidad (filtrado de fotos adicionales, PASO 3)
+PATRON_MAPEO_TIPOS = {
+    "ACOM": ["CDRO", "CUADRO", "ELECT", "ACOM"],  # Acompañantes/Cuadros eléctricos
+    "EQHORIZ": ["QH", "BOMB", "B00", "BOMBA", "EQUIPO"],  # Equipos horizontales/Bombas
+    "SISTCC": ["QG", "CALEF", "BOMB", "SIST", "SISTEMA", "B00"],  # Sistemas calefacción
+    "CLIMA": ["QE", "QI", "CLIMA", "CLIM", "AC", "HVAC"],  # Equipos climatización
+    "ILUM": ["I00", "ILUM", "LUZ", "LAMP", "LED"],  # Iluminación
+    "ENVOL": ["CR", "ENVOL", "CERR", "FACH", "VENT"],  # Envolventes/Cerramientos
+    "ELEVA": ["QV", "ELEV", "ASCEN", "MONTAC"],  # Elevadores
+    "OTROSEQ": ["OTROS", "EQUIP", "MAQUIN"],  # Otros equipos
+    "DEPENDENCIA": ["D00", "DEP", "SALA", "AULA"],  # Dependencias
+    "EDIFICIO": ["E00", "EDIF", "BLOQ", "NAVE"],  # Edificios
+    "CENTRO": ["C00", "CENT", "FC"]  # Centros
+}
+_FOTO_PREFIJOS = ["FOTO_", "IMG_", "IMAGE_"]
+_EQUIPOS_GENERALES = ["BOMBA", "BOMB", "EQUIP", "MAQUIN", "MOTOR", "PANEL"]
+_CUADROS_ELECTRICOS = ["CDRO", "CUADRO", "ELECT", "PANEL", "ARMARIO"]
+
+# Tipo de la foto según el último código de su ID (C0007E001D0001QE001 → QE001 → CLIMA)
+_TIPOS_POR_CODIGO = [(re.compile(rx), tipo) for rx, tipo in [
+    (r'^C\d+$',      "CENTRO"),
+    (r'^E\d+$',      "EDIFICIO"),
+    (r'^D\d+$',      "DEPENDENCIA"),
+    (r'^CR\d+$',     "ENVOL"),
+    (r'^Q[EI]\d+$',  "CLIMA"),
+    (r'^QH\d+$',     "EQHORIZ"),
+    (r'^QG\d+$',     "SISTCC"),
+    (r'^QV\d+$',     "ELEVA"),
+    (r'^I\d+$',      "ILUM"),
+    (r'^(Q[A-Z]|B)\d+$', "OTROSEQ"),
+]]
+_RE_SEGMENTO_ID = re.compile(r'CR\d+|[A-Z]{1,2}\d+')
+_RE_CODIGO_EQUIPO = re.compile(r'^([A-Z]{1,2})\d+')
+_RE_ID_CENTRO_FOTO = re.compile(r'^C0*\d+$')
+_RE_NUMEROS = re.compile(r'\d+')
+_RE_SECUENCIA_FOTO = re.compile(r'_F[A-Z]*(\d+)')
+
+class _ClaseFoto(NamedTuple):
+    """Clasificación de una foto calculada una sola vez al construir el índice."""
+    centro: str               # código de centro (del ID o de la ruta), "" si no hay
+    tipo: str                 # tipo de entidad según el último código del ID, "" si no se reconoce
+    id: str                   # parte de ID (antes del primer '_', sin prefijos FOTO_/IMG_)
+    secuencia: Optional[int]  # número de foto (_F0001 → 1)
+    limpio: str               # nombre en mayúsculas sin prefijo FOTO_/IMG_/IMAGE_
+    prefijo: str              # letras de un código de equipo (QH0001 → QH), "" si no aplica
+    numeros: Tuple[str, ...]  # números presentes en la parte de ID
+    tipos_patron: frozenset   # tipos de PATRON_MAPEO_TIPOS cuyos patrones aparecen en el nombre
+    es_bomba: bool
+    es_centro: bool
+    generica: bool            # contiene un término de equipo general (MÉTODO 6)
+    cuadro: bool              # contiene un término de cuadro eléctrico (MÉTODO 7)
+
+def _clasificar_foto(stem: str, ruta_upper: str = "") -> _ClaseFoto:
+    limpio = stem.upper()
+    for prefix in _FOTO_PREFIJOS:
+        if limpio.startswith(prefix):
+            limpio = limpio[len(prefix):]
+            break
+    id_parte = limpio.split('_')[0]
+
+    segmentos = _RE_SEGMENTO_ID.findall(id_parte)
+    tipo = ""
+    if segmentos:
+        tipo = next((t for rx, t in _TIPOS_POR_CODIGO if rx.match(segmentos[-1])), "")
+    if segmentos and _RE_ID_CENTRO_FOTO.match(segmentos[0]):
+        centro = segmentos[0]
+    else:
+        m = _RE_CENTRO_CARPETA.search(ruta_upper)
+        centro = m.group(1) if m else ""
+    m = _RE_SECUENCIA_FOTO.search(limpio)
+    m_eq = _RE_CODIGO_EQUIPO.match(id_parte)
+
+    return _ClaseFoto(
+        centro=centro,
+        tipo=tipo,
+        id=id_parte,
+        secuencia=int(m.group(1)) if m else None,
+        limpio=limpio,
+        prefijo=m_eq.group(1) if m_eq else "",
+        numeros=tuple(_RE_NUMEROS.findall(id_parte)),
+        tipos_patron=frozenset(t for t, patrones in PATRON_MAPEO_TIPOS.items()
+                               if any(pt in limpio for pt in patrones)),
+        es_bomba=id_parte.startswith('B00') or id_parte.startswith('BOMB'),
+        es_centro=bool(_RE_ID_CENTRO_FOTO.match(id_parte)),
+        generica=any(g in limpio for g in _EQUIPOS_GENERALES),
+        cuadro=any(c in limpio for c in _CUADROS_ELECTRICOS),
+    )
+
+def _clase_foto(path_to_info: dict, foto_path: str, foto_name: str) -> _ClaseFoto:
+    info = path_to_info.get(Path(foto_path))
+    clase = info.get("clase") if info else None
+    return clase if clase is not None else _clasificar_foto(foto_name)
+
+def _incluir_foto_adicional(clase: _ClaseFoto, tipo: str, ident_upper: str, numeros_entidad: List[str]) -> bool:
+    """Filtrado inteligente de una foto adicional (no declarada en el Excel) para una entidad."""
+    # MÉTODO 1: Matching exacto tradicional
+    if clase.id in ident_upper:
+        return True
+    # MÉTODO 2: Matching por patrones de tipo de entidad
+    if tipo in clase.tipos_patron:
+        return True
+    # MÉTODO 3: Matching específico para equipos con numeración (QH0001, QE001, etc.)
+    if clase.prefijo and clase.prefijo in ident_upper:
+        return True
+    # Para bombas/equipos con código B (B001, B002, etc.)
+    if clase.es_bomba and tipo in ("EQHORIZ", "SISTCC", "ACOM"):
+        return True
+    # MÉTODO 4: EXCEPCIÓN ESPECIAL para fotos de centro
+    if tipo == "CENTRO" and clase.es_centro:
+        return True
+    # MÉTODO 5: Matching por número de dependencia/edificio
+    if tipo in ("DEPENDENCIA", "EDIFICIO") and any(num in numeros_entidad for num in clase.numeros):
+        return True
+    # MÉTODO 6: Matching por proximidad para equipos relacionados
+    if tipo in ("EQHORIZ", "SISTCC", "CLIMA") and clase.generica:
+        return True
+    # MÉTODO 7: Matching especial para cuadros eléctricos en ACOM
+    if tipo == "ACOM" and clase.cuadro:
+        return True
+    return False
+
+# Patrones de elementos sin usar para _discover_missing_elements
+_PATRONES_DESCUBRIMIENTO = [(re.compile(rx, re.IGNORECASE), category, tipo) for rx, category, tipo in [
+    (r'(QE)(\d+)', 'sistemas_cc', 'SISTCC'),
+    (r'(QI)(\d+)', 'iluminacion', 'ILUM'),
+    (r'(QH)(\d+)', 'equipos_horiz', 'EQHORIZ'),
+    (r'(QG)(\d+)', 'sistemas_cc', 'SISTCC'),
+    (r'(CR)(\d+)', 'envolventes', 'ENVOL'),
+    (r'(I)(\d+)', 'iluminacion', 'ILUM'),
+    (r'(E)(\d+)', 'otros_equipos', 'OTROSEQ'),
+    (r'(B)(\d+)', 'otros_equipos', 'OTROSEQ')
+]]
+
+def _ngrams(s: str) -> set:
+    return {s[i:i + _NGRAM] for i in range(len(s) - _NGRAM + 1)}
+
+class _PhotoLookup:
+    """
+    Estructura de búsqueda construida UNA vez por índice de fotos (carpeta raíz).
+    Sustituye los recorridos lineales de normalized_index por entidad:
+      - by_first_token: parte de ID de la foto (stem antes del primer '_') → rutas
+      - by_center:      código de centro (C\\d+ y sus prefijos) presente en la ruta → rutas
+      - ngrams de stem y de clave normalizada para búsquedas por subcadena
+    Todas las listas conservan el orden de iteración de normalized_index, de modo que
+    los resultados son idénticos a los de los recorridos lineales.
+    """
+
+    def __init__(self, normalized_index: dict, path_to_info: dict):
+        self.ordered: List[Path] = []
+        self.order: Dict[Path, int] = {}
+        self.stem_upper: Dict[Path, str] = {}
+        self.path_upper: Dict[Path, str] = {}
+        self.first_token: Dict[Path, str] = {}
+        self.centro_stem: set = set()
+        self.acom: set = set()
+        self.by_first_token: Dict[str, List[Path]] = defaultdict(list)
+        self.by_center: Dict[str, List[Path]] = defaultdict(list)
+        self.stem_ngrams: Dict[str, set] = defaultdict(set)
+        self.keys: List[str] = list(normalized_index.keys())
+        self.key_order: Dict[str, int] = {k: i for i, k in enumerate(self.keys)}
+        self.key_ngrams: Dict[str, set] = defaultdict(set)
+
+        for k in self.keys:
+            for g in _ngrams(k):
+                self.key_ngrams[g].add(k)
+
+        for paths in normalized_index.values():
+            for p in paths:
+                if p in self.order:
+                    continue
+                self.order[p] = len(self.ordered)
+                self.ordered.append(p)
+
+                stem = path_to_info[p]["stem"]
+                su = stem.upper()
+                pu = str(p).upper()
+                self.stem_upper[p] = su
+                self.path_upper[p] = pu
+                token = su.split('_')[0]
+                self.first_token[p] = token
+                self.by_first_token[token].append(p)
+                for g in _ngrams(su):
+                    self.stem_ngrams[g].add(p)
+
+                if _RE_STEM_CENTRO.match(stem):
+                    self.centro_stem.add(p)
+                stem_lower = stem.lower()
+                if any(rx.search(stem_lower) for rx in _ACOM_PATTERNS) and \
+                        not any(rx.search(stem_lower) for rx in _ACOM_EXCLUDED):
+                    self.acom.add(p)
+
+                codes = set()
+                for m in _RE_CENTRO_EN_RUTA.finditer(pu):
+                    code = m.group(0)
+                    for n in range(2, len(code) + 1):
+                        codes.add(code[:n])
+                for code in codes:
+                    self.by_center[code].append(p)
+
+    def _sorted(self, paths) -> List[Path]:
+        return sorted(paths, key=self.order.__getitem__)
+
+    def paths_in_center(self, centro_codigo: str) -> List[Path]:
+        """Rutas cuyo path (en mayúsculas) contiene el código de centro."""
+        if re.fullmatch(r'C\d+', centro_codigo):
+            return self.by_center.get(centro_codigo, [])
+        return [p for p in self.ordered if centro_codigo in self.path_upper[p]]
+
+    def first_token_in(self, ident_upper: str) -> List[Path]:
+        """Rutas cuya parte de ID (antes del primer '_') es subcadena de ident_upper."""
+        subs = {ident_upper[i:j] for i in range(len(ident_upper) + 1)
+                for j in range(i, len(ident_upper) + 1)}
+        found = []
+        for s in subs:
+            found.extend(self.by_first_token.get(s, ()))
+        return self._sorted(found)
+
+    def stem_contains(self, needle: str) -> List[Path]:
+        """Rutas cuyo stem en mayúsculas contiene 'needle'."""
+        if len(needle) < _NGRAM:
+            return [p for p in self.ordered if needle in self.stem_upper[p]]
+        cands = None
+        for g in _ngrams(needle):
+            post = self.stem_ngrams.get(g)
+            if not post:
+                return []
+            cands = set(post) if cands is None else cands & post
+        return self._sorted(p for p in cands if needle in self.stem_upper[p])
+
+    def keys_containing(self, needle: str) -> set:
+        """Claves normalizadas que contienen 'needle'."""
+        if len(needle) < _NGRAM:
+            return {k for k in self.keys if needle in k}
+        cands = None
+        for g in _ngrams(needle):
+            post = self.key_ngrams.get(g)
+            if not post:
+                return set()
+            cands = set(post) if cands is None else cands & post
+        return {k for k in cands if needle in k}
+
+# Un motor por índice: {id(normalized_index): (normalized_index, _PhotoLookup)}
+_photo_lookup_cache = {}
+
+def _get_photo_lookup(normalized_index: dict, path_to_info: dict) -> _PhotoLookup:
+    cached = _photo_lookup_cache.get(id(normalized_index))
+    if cached and cached[0] is normalized_index:
+        return cached[1]
+    lookup = _PhotoLookup(normalized_index, path_to_info)
+    _photo_lookup_cache[id(normalized_index)] = (normalized_index, lookup)
+    return lookup
+
 def _buscar_fotos_por_id_optimized(ident: str, normalized_index: dict, path_to_info: dict) -> List[Path]:
     """Versión optimizada de búsqueda por ID."""
     fotos_encontradas = []
     ident_norm = _norm_slug_cached(ident)
     leaf_id_norm = _norm_slug_cached(_leaf_id(ident))
-    
+    lookup = _get_photo_lookup(normalized_index, path_to_info)
+
     seen_realpaths = set()
-    
-    # Búsqueda directa en índice normalizado
-    for norm_key, paths in normalized_index.items():
-        if ident_norm in norm_key or leaf_id_norm in norm_key:
-            for p in paths:
-                realpath = path_to_info[p]["realpath"]
-                if realpath not in seen_realpaths:
-                    seen_realpaths.add(realpath)
-                    fotos_encontradas.append(p)
-    
+
+    # Búsqueda por n-gramas en las claves del índice normalizado
+    keys = lookup.keys_containing(ident_norm) | lookup.keys_containing(leaf_id_norm)
+    for norm_key in sorted(keys, key=lookup.key_order.__getitem__):
+        for p in normalized_index[norm_key]:
+            realpath = path_to_info[p]["realpath"]
+            if realpath not in seen_realpaths:
+                seen_realpaths.add(realpath)
+                fotos_encontradas.append(p)
+
     return fotos_encontradas
 
+def _take_unique(candidates: List[Path], path_to_info: dict, max_photos: int) -> List[Path]:
+    """Primeros max_photos candidatos sin repetir realpath (en orden)."""
+    out, seen_realpaths = [], set()
+    for p in candidates:
+        if len(out) >= max_photos:
+            break
+        realpath = path_to_info[p]["realpath"]
+        if realpath not in seen_realpaths:
+            seen_realpaths.add(realpath)
+            out.append(p)
+    return out
+
 def _fallback_candidates_optimized(ident: str, exact_index: dict, normalized_index: dict, 
                                  path_to_info: dict, max_photos: int = 6, tipo: str = "") -> List[Path]:
     """
@@ -1082,283 +1762,57 @@ def _fallback_candidates_optimized(ident: str, exact_index: dict, normalized_ind
     - EDIFICIO: solo fotos con E en el nombre (sin D ni Q)
     - DEPENDENCIA: solo fotos con D y el ID específico
     - EQUIPOS: solo fotos del ID específico del equipo
+    Los candidatos salen del motor _PhotoLookup (sin recorrer todo el índice por entidad).
     """
-    
-    # Lógica especial para centros: capturar fotos que empiecen con C
+    lookup = _get_photo_lookup(normalized_index, path_to_info)
+    ident_upper = ident.upper()
+    centro_match = re.match(r'(C\d+)', ident_upper)
+
+    # Lógica especial para centros: capturar fotos que empiecen con C (como C001_FC0001.jpg)
+    # y que estén en la carpeta del centro correcto
     if tipo == "CENTRO":
-        fotos_centro = []
-        seen_realpaths = set()
-        
-        # Extraer el código de centro del ID
-        centro_match = re.match(r'(C\d+)', ident.upper())
-        centro_codigo = centro_match.group(1) if centro_match else ident.upper()
-        
-        # Buscar todas las fotos que empiecen con C (como C001_FC0001.jpg)
-        for norm_key, paths in normalized_index.items():
-            for p in paths:
-                stem = path_to_info[p]["stem"]
-                # Si el nombre del archivo empieza con C seguido de números
-                if re.match(r'^C\d+', stem, re.IGNORECASE):
-                    # NUEVA VERIFICACIÓN: la foto debe estar en la carpeta del centro correcto
-                    foto_path_str = str(p).upper()
-                    if centro_codigo in foto_path_str:
-                        realpath = path_to_info[p]["realpath"]
-                        if realpath not in seen_realpaths:
-                            seen_realpaths.add(realpath)
-                            fotos_centro.append(p)
-                            if len(fotos_centro) >= max_photos:
-                                break
-            if len(fotos_centro) >= max_photos:
-                break
-        
+        centro_codigo = centro_match.group(1) if centro_match else ident_upper
+        cands = [p for p in lookup.paths_in_center(centro_codigo) if p in lookup.centro_stem]
+        fotos_centro = _take_unique(cands, path_to_info, max_photos)
         if fotos_centro:
             return fotos_centro
-    
-    # Lógica especial para ACOM: solo buscar fotos específicas de acometida
+
+    # Lógica especial para ACOM: solo fotos que coincidan con patrones de acometida
     if tipo == "ACOM":
-        fotos_acom = []
-        seen_realpaths = set()
-        
-        # Extraer el código de centro del ID
-        centro_match = re.match(r'(C\d+)', ident.upper())
-        centro_codigo = centro_match.group(1) if centro_match else ""
-        
-        # Patrones MÁS ESPECÍFICOS para acometidas - solo estas fotos
-        acom_patterns = [
-            r'.*acom.*',           # Contiene "acom"
-            r'.*acometida.*',      # Contiene "acometida"
-            r'.*bateria.*',        # Contiene "bateria"  
-            r'.*ct\b.*',           # Contiene "ct" (centro transformación) como palabra completa
-            r'.*centro.*transf.*', # Centro de transformación
-            r'.*cdro.*ppal.*',     # Cuadro principal
-            r'.*cdro.*secund.*',   # Cuadro secundario
-            r'.*cuadro.*principal.*', # Cuadro principal
-            r'.*cuadro.*secundario.*', # Cuadro secundario
-            r'.*cgbt.*',           # Centro general de baja tensión
-            r'.*suministro.*',     # Suministro eléctrico
-            r'.*contador.*',       # Contador eléctrico
-            r'.*medida.*',         # Medida eléctrica
-        ]
-        
-        # FILTRADO ESTRICTO: solo fotos que coincidan EXACTAMENTE con patrones de acometida
-        for norm_key, paths in normalized_index.items():
-            for p in paths:
-                stem_lower = path_to_info[p]["stem"].lower()
-                
-                # Verificar que coincide con al menos un patrón específico de acometida
-                coincide_acom = any(re.search(pattern, stem_lower, re.IGNORECASE) for pattern in acom_patterns)
-                
-                if coincide_acom:
-                    # Verificación adicional: NO debe contener patrones de otros equipos
-                    patrones_excluidos = [
-                        r'.*clima.*', r'.*calef.*', r'.*ilum.*', r'.*lamp.*',
-                        r'.*ascens.*', r'.*elevador.*', r'.*bomba.*(?!.*contador)', 
-                        r'.*ventil.*', r'.*radiador.*', r'.*termo.*'
-                    ]
-                    
-                    # Si NO coincide con patrones excluidos, es válida
-                    if not any(re.search(excl_pattern, stem_lower, re.IGNORECASE) for excl_pattern in patrones_excluidos):
-                        # NUEVA VERIFICACIÓN: la foto debe estar en la carpeta del centro correcto
-                        if centro_codigo:
-                            foto_path_str = str(p).upper()
-                            if centro_codigo in foto_path_str:
-                                realpath = path_to_info[p]["realpath"]
-                                if realpath not in seen_realpaths:
-                                    seen_realpaths.add(realpath)
-                                    fotos_acom.append(p)
-                                    if len(fotos_acom) >= max_photos:
-                                        break
-                        else:
-                            # Si no se puede extraer el centro, aplicar lógica original
-                            realpath = path_to_info[p]["realpath"]
-                            if realpath not in seen_realpaths:
-                                seen_realpaths.add(realpath)
-                                fotos_acom.append(p)
-                                if len(fotos_acom) >= max_photos:
-                                    break
-            if len(fotos_acom) >= max_photos:
-                break
-        
-        return fotos_acom  # Siempre devolver las fotos encontradas, aunque sean pocas
-    
+        if centro_match:
+            cands = [p for p in lookup.paths_in_center(centro_match.group(1)) if p in lookup.acom]
+        else:
+            # Si no se puede extraer el centro, aplicar lógica original
+            cands = [p for p in lookup.ordered if p in lookup.acom]
+        return _take_unique(cands, path_to_info, max_photos)  # Siempre devolver las fotos encontradas
+
     # FILTRADO ESTRICTO SEGÚN TIPO DE ENTIDAD
-    ident_upper = ident.upper()
-    fotos_filtradas = []
-    seen_realpaths = set()
-    
-    for norm_key, paths in normalized_index.items():
-        if len(fotos_filtradas) >= max_photos:
-            break
-            
-        for p in paths:
-            if len(fotos_filtradas) >= max_photos:
-                break
-                
-            stem = path_to_info[p]["stem"]
-            stem_upper = stem.upper()
-            
-            # FILTRADO ESTRICTO POR TIPO
-            es_valida = False
-            
+    if tipo in ("EDIFICIO", "DEPENDENCIA") or tipo in _EQUIPO_TIPOS:
+        # Solo fotos cuyo nombre esté contenido en el ID de la entidad
+        # Ejemplo: foto "QE001_FQE0001" -> parte "QE001" debe estar en ID "C0007E001D0001QE001"
+        # y la foto debe estar en la carpeta del centro correcto
+        if not centro_match:
+            return []
+        centro_codigo = centro_match.group(1)
+        cands = []
+        for p in lookup.first_token_in(ident_upper):
+            su = lookup.stem_upper[p]
             if tipo == "EDIFICIO":
-                # EDIFICIOS: solo fotos cuyo nombre esté contenido en el ID de la entidad
-                if ('E' in stem_upper and 'D' not in stem_upper and 'Q' not in stem_upper):
-                    # Extraer la parte del nombre de la foto (ej: E001_FE0001 -> E001)
-                    foto_parts = stem_upper.split('_')
-                    foto_id_part = foto_parts[0] if foto_parts else stem_upper
-                    
-                    # Verificar que la parte del nombre de foto está contenida en el ID de la entidad
-                    # Ejemplo: foto "E001_FE0001" -> parte "E001" debe estar en ID "C0007E001"
-                    if foto_id_part in ident_upper:
-                        # NUEVA VERIFICACIÓN: la foto debe estar en la carpeta del centro correcto
-                        centro_match = re.match(r'(C\d+)', ident_upper)
-                        if centro_match:
-                            centro_codigo = centro_match.group(1)
-                            # Verificar que la ruta de la foto contiene el centro correcto
-                            foto_path_str = str(p).upper()
-                            if centro_codigo in foto_path_str:
-                                es_valida = True
-            
+                es_valida = 'E' in su and 'D' not in su and 'Q' not in su
             elif tipo == "DEPENDENCIA":
-                # DEPENDENCIAS: solo fotos cuyo nombre esté contenido en el ID de la entidad
-                if 'D' in stem_upper:
-                    # Extraer la parte del nombre de la foto (ej: D0006_FD0001 -> D0006)
-                    foto_parts = stem_upper.split('_')
-                    foto_id_part = foto_parts[0] if foto_parts else stem_upper
-                    
-                    # Verificar que la parte del nombre de foto está contenida en el ID de la entidad
-                    # Ejemplo: foto "D0001_FD0001" -> parte "D0001" debe estar en ID "C0007E001D0001"
-                    if foto_id_part in ident_upper:
-                        # Verificar que NO tiene Q (no es un equipo)
-                        if 'Q' not in stem_upper:
-                            # NUEVA VERIFICACIÓN: la foto debe estar en la carpeta del centro correcto
-                            centro_match = re.match(r'(C\d+)', ident_upper)
-                            if centro_match:
-                                centro_codigo = centro_match.group(1)
-                                # Verificar que la ruta de la foto contiene el centro correcto
-                                foto_path_str = str(p).upper()
-                                if centro_codigo in foto_path_str:
-                                    es_valida = True
-            
-            elif tipo in ["CLIMA", "EQHORIZ", "ELEVA", "OTROSEQ", "ILUM", "ENVOL", "SISTCC"]:
-                # EQUIPOS: solo fotos cuyo nombre esté contenido en el ID de la entidad
-                if 'Q' in stem_upper:
-                    # Extraer la parte del nombre de la foto (ej: QE001_FQE0001 -> QE001)
-                    foto_parts = stem_upper.split('_')
-                    foto_id_part = foto_parts[0] if foto_parts else stem_upper
-                    
-                    # Verificar que la parte del nombre de foto está contenida en el ID de la entidad
-                    # Ejemplo: foto "QE001_FQE0001" -> parte "QE001" debe estar en ID "C0007E001D0001QE001"
-                    if foto_id_part in ident_upper:
-                        # NUEVA VERIFICACIÓN: la foto debe estar en la carpeta del centro correcto
-                        # Extraer el código de centro del ID (ej: C0007E001D0007QI007 -> C0007)
-                        centro_match = re.match(r'(C\d+)', ident_upper)
-                        if centro_match:
-                            centro_codigo = centro_match.group(1)
-                            # Verificar que la ruta de la foto contiene el centro correcto
-                            foto_path_str = str(p).upper()
-                            if centro_codigo in foto_path_str:
-                                es_valida = True
-            
+                es_valida = 'D' in su and 'Q' not in su
             else:
-                # OTROS: lógica por defecto
-                if ident_upper in stem_upper:
-                    # NUEVA VERIFICACIÓN: la foto debe estar en la carpeta del centro correcto
-                    centro_match = re.match(r'(C\d+)', ident_upper)
-                    if centro_match:
-                        centro_codigo = centro_match.group(1)
-                        # Verificar que la ruta de la foto contiene el centro correcto
-                        foto_path_str = str(p).upper()
-                        if centro_codigo in foto_path_str:
-                            es_valida = True
-                    else:
-                        # Si no se puede extraer el centro, aplicar lógica original
-                        es_valida = True
-            
-            # Si la foto es válida, agregarla
-            if es_valida:
-                realpath = path_to_info[p]["realpath"]
-                if realpath not in seen_realpaths:
-                    seen_realpaths.add(realpath)
-                    fotos_filtradas.append(p)
-    
-    return fotos_filtradas[:max_photos]
-    
-    for p in todas_fotos:
-        realpath = path_to_info[p]["realpath"]
-        if realpath not in seen_realpaths:
-            seen_realpaths.add(realpath)
-            fotos_unicas.append(p)
-            if len(fotos_unicas) >= max_photos:
-                break
-    
-    # Si aún necesitamos más fotos, buscar por prefijo MÁS ESPECÍFICO
-    if len(fotos_unicas) < max_photos:
-        leaf_norm = _norm_slug_cached(_leaf_id(ident))
-        
-        for norm_key, paths in normalized_index.items():
-            if len(fotos_unicas) >= max_photos:
-                break
-            
-            # CAMBIO: Buscar más específicamente - no solo que empiece con el prefijo
-            # sino que sea más específico para evitar matches incorrectos
-            if norm_key.startswith(leaf_norm):
-                # Verificación adicional MÁS ESTRICTA: el ID debe ser exacto o muy similar
-                for p in paths:
-                    if len(fotos_unicas) >= max_photos:
-                        break
-                    
-                    stem = path_to_info[p]["stem"]
-                    ident_upper = ident.upper()
-                    stem_upper = stem.upper()
-                    
-                    # NUEVA LÓGICA MÁS ESTRICTA POR TIPO DE ENTIDAD:
-                    # Buscar por la parte relevante del ID en lugar del ID completo
-                    # EDIFICIO C0007E001 -> buscar E001
-                    # DEPENDENCIA C0007E001D0001 -> buscar D0001  
-                    # EQUIPO C0007E001D0001QE001 -> buscar QE001
-                    
-                    # Determinar tipo de entidad basado en el ID
-                    is_edificio = 'E' in ident_upper and 'D' not in ident_upper and 'Q' not in ident_upper
-                    is_dependencia = 'D' in ident_upper and 'Q' not in ident_upper  
-                    is_equipo = 'Q' in ident_upper
-                    
-                    valid_match = False
-                    search_id = ident_upper  # Por defecto usar el ID completo
-                    
-                    if is_edificio:
-                        # EDIFICIOS: verificar que la parte del nombre de foto está en el ID
-                        foto_parts = stem_upper.split('_')
-                        foto_id_part = foto_parts[0] if foto_parts else stem_upper
-                        if foto_id_part in ident_upper and 'D' not in stem_upper and 'Q' not in stem_upper:
-                            valid_match = True
-                            
-                    elif is_dependencia:
-                        # DEPENDENCIAS: verificar que la parte del nombre de foto está en el ID
-                        foto_parts = stem_upper.split('_')
-                        foto_id_part = foto_parts[0] if foto_parts else stem_upper
-                        if foto_id_part in ident_upper and 'Q' not in stem_upper:
-                            valid_match = True
-                            
-                    elif is_equipo:
-                        # EQUIPOS: verificar que la parte del nombre de foto está en el ID
-                        foto_parts = stem_upper.split('_')
-                        foto_id_part = foto_parts[0] if foto_parts else stem_upper
-                        if foto_id_part in ident_upper:
-                            valid_match = True
-                            
-                    else:
-                        # OTROS: Lógica por defecto (usar ID completo)
-                        if ident_upper in stem_upper:
-                            valid_match = True
-                    
-                    if valid_match:
-                        realpath = path_to_info[p]["realpath"]
-                        if realpath not in seen_realpaths:
-                            seen_realpaths.add(realpath)
-                            fotos_unicas.append(p)
-    
-    return fotos_unicas[:max_photos]
+                es_valida = 'Q' in su
+            if es_valida and centro_codigo in lookup.path_upper[p]:
+                cands.append(p)
+    else:
+        # OTROS: lógica por defecto (el ID completo dentro del nombre)
+        cands = lookup.stem_contains(ident_upper)
+        if centro_match:
+            centro_codigo = centro_match.group(1)
+            cands = [p for p in cands if centro_codigo in lookup.path_upper[p]]
+
+    return _take_unique(cands, path_to_info, max_photos)
 
 def _leaf_id(ident: str) -> str:
     s = str(ident or "").upper().strip()
@@ -1480,16 +1934,16 @@ def _split_multi(val) -> List[str]:
             seen.add(stem); out.append(stem)
     return out
 
+_CONSUL_COLS = {sec for sec, _, _ in _CONSUL_SPEC} | {id_col for _, id_col, _ in _CONSUL_SPEC}
+
+def _consul_usecol(col) -> bool:
+    """Columnas de Consul que necesita _consul_index_from_sections: cabeceras de bloque, IDs y FOTO_*."""
+    nombre = str(col).strip()
+    return nombre in _CONSUL_COLS or nombre.upper().startswith("FOTO_")
+
 def _read_consul(xlsx: Path) -> Optional[pd.DataFrame]:
-    xls = pd.ExcelFile(xlsx, engine="openpyxl")
-    nm = next((n for n in xls.sheet_names if n.strip().lower() == "consul"), None)
-    if not nm:
-        return None
-    df = xls.parse(nm, dtype=str).fillna("")
-    df.columns = df.columns.str.strip()
-    for c in df.columns:
-        df[c] = df[c].apply(_clean)
-    return df
+    _, df_consul = _read_workbook(xlsx)
+    return df_consul.copy(deep=False) if df_consul is not None else None
 
 def _consul_index_from_sections(df_consul: pd.DataFrame) -> Dict[str, Dict[str, List[str]]]:
     """
@@ -1770,6 +2224,82 @@ def build_context(dfs: Dict[str, pd.DataFrame]) -> List[Dict]:
         out.append({"centro": centro, "edif": edificios})
     return out
 
+# Secciones por edificio: (clave en contexto, hoja, mapeo) en el orden del JSON
+_EDIF_SECTIONS = [
+    ("dependencias",  "DEPEN",   MAP_DEPEN),
+    ("acom",          "ACOM",    MAP_ACOM),
+    ("envolventes",   "ENVOL",   MAP_ENVOL),
+    ("sistemas_cc",   "SISTCC",  MAP_SISTCC),
+    ("equipos_clima", "CLIMA",   MAP_CLIMA),
+    ("equipos_horiz", "EQHORIZ", MAP_EQH),
+    ("elevadores",    "ELEVA",   MAP_ELEVA),
+    ("otros_equipos", "OTROSEQ", MAP_OTRO),
+    ("iluminacion",   "ILUM",    MAP_ILUM),
+]
+
+class _SheetGroups:
+    """
+    Filas de una hoja agrupadas en UNA pasada por ID CENTRO y por (ID CENTRO, ID EDIFICIO).
+    Reproduce el filtrado de build_context.sub(): si la hoja no tiene ID CENTRO no devuelve
+    nada, y si no tiene ID EDIFICIO el filtro por edificio se ignora.
+    """
+
+    def __init__(self, df: Optional[pd.DataFrame]):
+        self.by_centro: Dict[str, List[dict]] = defaultdict(list)
+        self.by_edificio: Dict[Tuple[str, str], List[dict]] = defaultdict(list)
+        self.has_edificio = df is not None and "ID EDIFICIO" in df.columns
+        if df is None or df.empty or "ID CENTRO" not in df.columns:
+            return
+        for rec in df.to_dict("records"):
+            cid = rec["ID CENTRO"]
+            self.by_centro[cid].append(rec)
+            if self.has_edificio:
+                self.by_edificio[(cid, rec["ID EDIFICIO"])].append(rec)
+
+    def rows(self, center_id: str, edificio_id: Optional[str] = None) -> List[dict]:
+        if edificio_id is None or not self.has_edificio:
+            return self.by_centro.get(center_id, [])
+        return self.by_edificio.get((center_id, edificio_id), [])
+
+def build_context_grouped(dfs: Dict[str, pd.DataFrame]) -> List[Dict]:
+    """
+    Igual que build_context (mismo JSON, byte a byte) pero agrupando cada hoja una sola vez
+    en diccionarios de filas por (ID CENTRO, ID EDIFICIO), en lugar de re-filtrar las nueve
+    hojas por cada centro y edificio.
+    """
+    out: List[Dict] = []
+    d_cent = dfs["CENT"]
+    if d_cent is None or d_cent.empty:
+        raise RuntimeError("No se encontró la hoja CENT/CENTRO.")
+
+    groups = {key: _SheetGroups(dfs.get(key)) for key in ["EDIF"] + [sh for _, sh, _ in _EDIF_SECTIONS]}
+
+    for row_c in d_cent.to_dict("records"):
+        cid = str(row_c.get("ID CENTRO")).strip()
+        centro = _rename_row(row_c, MAP_CENTRO)
+
+        edificios = []
+        for row_e in groups["EDIF"].rows(cid):
+            eid = str(row_e.get("ID EDIFICIO")).strip()
+            edif = _rename_row(row_e, MAP_EDIF)
+
+            secciones = {
+                key: [_rename_row(r, mapping) for r in groups[sheet].rows(cid, eid)]
+                for key, sheet, mapping in _EDIF_SECTIONS
+            }
+
+            # especial: ACOM necesita id_edificio y un id único
+            acom = secciones["acom"]
+            for i, it in enumerate(acom):
+                it["id_edificio"] = eid
+                it["id"] = f"{eid}_ACOM_{i+1:02d}" if len(acom) > 1 else f"{eid}_ACOM"
+
+            edif.update(secciones)
+            edificios.append(edif)
+
+        out.append({"centro": centro, "edif": edificios})
+    return out
+
 # --------------------------
 # Fotos (Consul + disco)
 # --------------------------
@@ -1823,365 +2353,396 @@ def _declared_from_consul(consul_map: dict, tipo: str, ident: str, cid: str) ->
             return bucket[k]
     return []
 
-def add_photos_to_context(ctx_all: List[Dict], df_consul: Optional[pd.DataFrame],
-                          fotos_root: Path, fuzzy_threshold: float,
-                          tester_on: bool, outdir: Path, buscar_secuenciales: bool = True,
-                          max_secuenciales: int = MAX_SEQUENTIAL_PHOTOS, 
-                          incluir_uris: bool = True) -> Tuple[List[Dict], Dict[str, List[str]]]:
-
-    consul_map = _consul_index_from_sections(df_consul) if df_consul is not None else {}
-    faltantes: Dict[str, List[str]] = {}
-
-    def inject(entity: dict, tipo: str, cid: str, photo_indices: tuple, tester: Optional[dict]):
-        ident = str(entity.get(PHOTO_ID_FIELD[tipo], "")).strip()
-        if not ident:
-            entity.update({
-                "fotos_nombres": [],
-                "fotos_paths": [],
-                "fotos_por_filas": [],
-                "fotos": [],
-                "fotos_count": 0
-            })
-            return
-
-        exact_index, normalized_index, path_to_info = photo_indices
-        declared = _declared_from_consul(consul_map, tipo, ident, cid)
-        fotos_list = []
-
-        # PASO 1: Buscar fotos declaradas en Excel
-        if declared:
-            for s in declared:
-                try:
-                    p = _resolve_name_to_path_optimized(s, exact_index, normalized_index, fuzzy_threshold)
-                    if p:
-                        stem = path_to_info[p]["stem"]
-                        fotos_list.append({"path": str(p), "name": stem, "id": stem})
-                        _tester_mark_used(tester, str(p))
-                        
-                        # Buscar fotos secuenciales (solo si está habilitado)
-                        if buscar_secuenciales:
-                            try:
-                                secuenciales = _buscar_fotos_secuenciales_optimized(stem, normalized_index, max_secuenciales)
-                                if secuenciales:
-                                    _tester_log_sequential(tester, tipo, ident, len(secuenciales))
-                                for p_seq in secuenciales:
-                                    stem_seq = path_to_info[p_seq]["stem"]
-                                    fotos_list.append({"path": str(p_seq), "name": stem_seq, "id": stem_seq})
-                                    _tester_mark_used(tester, str(p_seq))
-                            except Exception as e:
-                                _tester_log_error(tester, f"{tipo}:{ident}:sequential", e)
-                    else:
-                        _tester_log_missing(tester, tipo, ident, s)
-                        faltantes.setdefault(f"{tipo}:{ident}", []).append(s)
-                except Exception as e:
-                    _tester_log_error(tester, f"{tipo}:{ident}:{s}", e)
+def _inject_fotos_entidad(entity: dict, tipo: str, cid: str, photo_indices: tuple, tester: Optional[dict],
+                          opts: "_OpcionesInyeccion", faltantes: Dict[str, List[str]]):
+    """Vincula las fotos de una entidad (PASO 1 declaradas, PASO 2 adicionales, PASO 3 filtrado)."""
+    consul_map, fuzzy_threshold = opts.consul_map, opts.fuzzy_threshold
+    buscar_secuenciales, max_secuenciales = opts.buscar_secuenciales, opts.max_secuenciales
+    incluir_uris = opts.incluir_uris
+    ident = str(entity.get(PHOTO_ID_FIELD[tipo], "")).strip()
+    if not ident:
+        entity.update({
+            "fotos_nombres": [],
+            "fotos_paths": [],
+            "fotos_por_filas": [],
+            "fotos": [],
+            "fotos_count": 0
+        })
+        return
 
-        # PASO 2: SIEMPRE buscar fotos adicionales en la carpeta Referencias (incluso si ya hay fotos del Excel)
-        try:
-            # Obtener fotos adicionales usando el método fallback
-            cands_adicionales = _fallback_candidates_optimized(ident, exact_index, normalized_index, path_to_info, max_photos=12, tipo=tipo)
-            
-            # Crear set de rutas ya incluidas para evitar duplicados
-            rutas_existentes = {foto["path"] for foto in fotos_list}
-            
-            # Añadir fotos adicionales que no estén ya incluidas
-            fotos_adicionales_count = 0
-            for p in cands_adicionales:
-                if str(p) not in rutas_existentes:
+    exact_index, normalized_index, path_to_info = photo_indices
+    declared = _declared_from_consul(consul_map, tipo, ident, cid)
+    fotos_list = []
+
+    # PASO 1: Buscar fotos declaradas en Excel
+    if declared:
+        for s in declared:
+            try:
+                p = opts.cache.resolve(s, exact_index, normalized_index, fuzzy_threshold)
+                if p:
                     stem = path_to_info[p]["stem"]
                     fotos_list.append({"path": str(p), "name": stem, "id": stem})
                     _tester_mark_used(tester, str(p))
-                    fotos_adicionales_count += 1
-            
-            if fotos_adicionales_count > 0:
-                _tester_log_fallback(tester, tipo, ident, fotos_adicionales_count, extra_note=f"({fotos_adicionales_count} adicionales)")
-        except Exception as e:
-            _tester_log_error(tester, f"{tipo}:{ident}:adicionales", e)
-
-        # PASO 3: Aplicar filtrado inteligente SOLO a fotos adicionales (no del Excel)
-        fotos_excel_paths = set()
-        if declared:
-            # Marcar fotos que vienen del Excel para no filtrarlas
-            for s in declared:
-                p = _resolve_name_to_path_optimized(s, exact_index, normalized_index, fuzzy_threshold)
-                if p:
-                    fotos_excel_paths.add(str(p))
-        
-        fotos_list_filtradas = []
-        for foto in fotos_list:
-            foto_path = foto["path"]
-            foto_name = foto["name"]
-            
-            # Si la foto viene del Excel, SIEMPRE incluirla (no filtrar)
-            if foto_path in fotos_excel_paths:
-                fotos_list_filtradas.append(foto)
-                continue
-            
-            # Para fotos adicionales encontradas por fallback, aplicar filtrado inteligente
-            foto_clean = foto_name.upper()
-            
-            # Remover prefijos comunes de fotos
-            prefixes_to_remove = ["FOTO_", "IMG_", "IMAGE_"]
-            for prefix in prefixes_to_remove:
-                if foto_clean.startswith(prefix):
-                    foto_clean = foto_clean[len(prefix):]
-                    break
-            
-            # MAPEO INTELIGENTE POR TIPOS DE ENTIDAD
-            PATRON_MAPEO_TIPOS = {
-                "ACOM": ["CDRO", "CUADRO", "ELECT", "ACOM"],  # Acompañantes/Cuadros eléctricos
-                "EQHORIZ": ["QH", "BOMB", "B00", "BOMBA", "EQUIPO"],  # Equipos horizontales/Bombas
-                "SISTCC": ["QG", "CALEF", "BOMB", "SIST", "SISTEMA", "B00"],  # Sistemas calefacción
-                "CLIMA": ["QE", "QI", "CLIMA", "CLIM", "AC", "HVAC"],  # Equipos climatización
-                "ILUM": ["I00", "ILUM", "LUZ", "LAMP", "LED"],  # Iluminación
-                "ENVOL": ["CR", "ENVOL", "CERR", "FACH", "VENT"],  # Envolventes/Cerramientos
-                "ELEVA": ["QV", "ELEV", "ASCEN", "MONTAC"],  # Elevadores
-                "OTROSEQ": ["OTROS", "EQUIP", "MAQUIN"],  # Otros equipos
-                "DEPENDENCIA": ["D00", "DEP", "SALA", "AULA"],  # Dependencias
-                "EDIFICIO": ["E00", "EDIF", "BLOQ", "NAVE"],  # Edificios
-                "CENTRO": ["C00", "CENT", "FC"]  # Centros
-            }
-            
-            # Extraer la primera parte del nombre de foto (antes del primer _)
-            foto_parts = foto_clean.split('_')
-            foto_id_part = foto_parts[0] if foto_parts else foto_clean
-            
-            # MÉTODO 1: Matching exacto tradicional
-            incluir_foto = False
-            if foto_id_part in ident.upper():
-                incluir_foto = True
-            
-            # MÉTODO 2: Matching por patrones de tipo de entidad
-            if not incluir_foto and tipo in PATRON_MAPEO_TIPOS:
-                patrones_tipo = PATRON_MAPEO_TIPOS[tipo]
-                for patron in patrones_tipo:
-                    if foto_clean.startswith(patron) or patron in foto_clean:
-                        incluir_foto = True
-                        break
-            
-            # MÉTODO 3: Matching específico para equipos con numeración
-            if not incluir_foto:
-                # Para equipos con códigos numéricos (QH0001, QE001, etc.)
-                if re.match(r'^[A-Z]{1,2}\d+', foto_id_part):
-                    # Extraer prefijo de letras (QH, QE, etc.)
-                    letra_match = re.match(r'^([A-Z]{1,2})', foto_id_part)
-                    if letra_match:
-                        prefijo_foto = letra_match.group(1)
-                        if prefijo_foto in ident.upper():
-                            incluir_foto = True
-                
-                # Para bombas/equipos con código B (B001, B002, etc.)
-                if foto_id_part.startswith('B00') or foto_id_part.startswith('BOMB'):
-                    if tipo in ["EQHORIZ", "SISTCC", "ACOM"]:
-                        incluir_foto = True
-            
-            # MÉTODO 4: EXCEPCIÓN ESPECIAL para fotos de centro
-            if tipo == "CENTRO" and re.match(r'^C0*\d+$', foto_id_part):
-                incluir_foto = True
-            
-            # MÉTODO 5: Matching por número de dependencia/edificio
-            if not incluir_foto and tipo in ["DEPENDENCIA", "EDIFICIO"]:
-                # Extraer números del ID de entidad
-                numeros_entidad = re.findall(r'\d+', ident)
-                numeros_foto = re.findall(r'\d+', foto_id_part)
-                
-                # Si algún número coincide, incluir
-                if any(num in numeros_entidad for num in numeros_foto):
-                    incluir_foto = True
-            
-            # MÉTODO 6: Matching por proximidad para equipos relacionados
-            if not incluir_foto and tipo in ["EQHORIZ", "SISTCC", "CLIMA"]:
-                # Para fotos de equipos generales que podrían aplicar a cualquier equipo del tipo
-                equipos_generales = ["BOMBA", "BOMB", "EQUIP", "MAQUIN", "MOTOR", "PANEL"]
-                if any(general in foto_clean for general in equipos_generales):
-                    incluir_foto = True
-            
-            # MÉTODO 7: Matching especial para cuadros eléctricos en ACOM
-            if not incluir_foto and tipo == "ACOM":
-                cuadros_electricos = ["CDRO", "CUADRO", "ELECT", "PANEL", "ARMARIO"]
-                if any(cuadro in foto_clean for cuadro in cuadros_electricos):
-                    incluir_foto = True
-            
-            if incluir_foto:
-                fotos_list_filtradas.append(foto)
-            else:
-                # Log para debug - foto filtrada por restricción universal
-                if tester:
-                    razon_filtrado = f"ID parte '{foto_id_part}' no encontrado en entidad '{ident}' (foto adicional)"
-                    if tipo in PATRON_MAPEO_TIPOS:
-                        patrones_esperados = ", ".join(PATRON_MAPEO_TIPOS[tipo])
-                        razon_filtrado += f" | Patrones esperados para {tipo}: [{patrones_esperados}]"
                     
-                    tester.setdefault("fotos_filtradas_universal", []).append({
-                        "entidad_tipo": tipo,
-                        "entidad_id": ident,
-                        "foto_name": foto_name,
-                        "foto_id_part": foto_id_part,
-                        "razon": razon_filtrado
-                    })
+                    # Buscar fotos secuenciales (solo si está habilitado)
+                    if buscar_secuenciales:
+                        try:
+                            secuenciales = _buscar_fotos_secuenciales_optimized(stem, normalized_index, max_secuenciales)
+                            if secuenciales:
+                                _tester_log_sequential(tester, tipo, ident, len(secuenciales))
+                            for p_seq in secuenciales:
+                                stem_seq = path_to_info[p_seq]["stem"]
+                                fotos_list.append({"path": str(p_seq), "name": stem_seq, "id": stem_seq})
+                                _tester_mark_used(tester, str(p_seq))
+                        except Exception as e:
+                            _tester_log_error(tester, f"{tipo}:{ident}:sequential", e)
+                else:
+                    _tester_log_missing(tester, tipo, ident, s)
+                    faltantes.setdefault(f"{tipo}:{ident}", []).append(s)
+            except Exception as e:
+                _tester_log_error(tester, f"{tipo}:{ident}:{s}", e)
+
+    # PASO 2: SIEMPRE buscar fotos adicionales en la carpeta Referencias (incluso si ya hay fotos del Excel)
+    try:
+        # Obtener fotos adicionales usando el método fallback
+        cands_adicionales = _fallback_candidates_optimized(ident, exact_index, normalized_index, path_to_info, max_photos=12, tipo=tipo)
         
-        fotos_list = fotos_list_filtradas
+        # Crear set de rutas ya incluidas para evitar duplicados
+        rutas_existentes = {foto["path"] for foto in fotos_list}
         
-        # Deduplicación optimizada usando realpath del índice
-        seen_realpaths = set()
-        fotos_list_unique = []
-        for foto in fotos_list:
-            path_obj = Path(foto["path"])
-            if path_obj in path_to_info:
-                realpath = path_to_info[path_obj]["realpath"]
-            else:
-                realpath = os.path.realpath(foto["path"])
-            
-            if realpath not in seen_realpaths:
-                seen_realpaths.add(realpath)
-                fotos_list_unique.append(foto)
+        # Añadir fotos adicionales que no estén ya incluidas
+        fotos_adicionales_count = 0
+        for p in cands_adicionales:
+            if str(p) not in rutas_existentes:
+                stem = path_to_info[p]["stem"]
+                fotos_list.append({"path": str(p), "name": stem, "id": stem})
+                _tester_mark_used(tester, str(p))
+                fotos_adicionales_count += 1
+        
+        if fotos_adicionales_count > 0:
+            _tester_log_fallback(tester, tipo, ident, fotos_adicionales_count, extra_note=f"({fotos_adicionales_count} adicionales)")
+    except Exception as e:
+        _tester_log_error(tester, f"{tipo}:{ident}:adicionales", e)
+
+    # PASO 3: Aplicar filtrado inteligente SOLO a fotos adicionales (no del Excel)
+    fotos_excel_paths = set()
+    if declared:
+        # Marcar fotos que vienen del Excel para no filtrarlas
+        for s in declared:
+            p = opts.cache.resolve(s, exact_index, normalized_index, fuzzy_threshold)
+            if p:
+                fotos_excel_paths.add(str(p))
+    
+    fotos_list_filtradas = []
+    ident_upper = ident.upper()
+    numeros_entidad = _RE_NUMEROS.findall(ident)
+    for foto in fotos_list:
+        foto_path = foto["path"]
+        foto_name = foto["name"]
         
-        # Convertir a formato compatible con Word
-        paths_list = [Path(foto["path"]) for foto in fotos_list_unique]
+        # Si la foto viene del Excel, SIEMPRE incluirla (no filtrar)
+        if foto_path in fotos_excel_paths:
+            fotos_list_filtradas.append(foto)
+            continue
         
-        # Generar la estructura de fotos compatible con el script original
-        fotos_nombres = [foto["name"] for foto in fotos_list_unique]
-        fotos_paths = [foto["path"] for foto in fotos_list_unique]
-        fotos_por_filas = _filas_fotos(paths_list, incluir_uris=incluir_uris)
+        # Para fotos adicionales encontradas por fallback, aplicar filtrado inteligente
+        # (la foto ya viene clasificada desde el índice)
+        clase = _clase_foto(path_to_info, foto_path, foto_name)
+        if _incluir_foto_adicional(clase, tipo, ident_upper, numeros_entidad):
+            fotos_list_filtradas.append(foto)
+        else:
+            # Log para debug - foto filtrada por restricción universal
+            if tester:
+                razon_filtrado = f"ID parte '{clase.id}' no encontrado en entidad '{ident}' (foto adicional)"
+                if tipo in PATRON_MAPEO_TIPOS:
+                    patrones_esperados = ", ".join(PATRON_MAPEO_TIPOS[tipo])
+                    razon_filtrado += f" | Patrones esperados para {tipo}: [{patrones_esperados}]"
+                
+                tester.setdefault("fotos_filtradas_universal", []).append({
+                    "entidad_tipo": tipo,
+                    "entidad_id": ident,
+                    "foto_name": foto_name,
+                    "foto_id_part": clase.id,
+                    "razon": razon_filtrado
+                })
+    
+    fotos_list = fotos_list_filtradas
+    
+    # Deduplicación optimizada usando realpath del índice
+    seen_realpaths = set()
+    fotos_list_unique = []
+    for foto in fotos_list:
+        path_obj = Path(foto["path"])
+        if path_obj in path_to_info:
+            realpath = path_to_info[path_obj]["realpath"]
+        else:
+            realpath = os.path.realpath(foto["path"])
         
-        if not fotos_list_unique:
-            _tester_log_zero(tester, tipo, ident)
+        if realpath not in seen_realpaths:
+            seen_realpaths.add(realpath)
+            fotos_list_unique.append(foto)
+    
+    # Convertir a formato compatible con Word
+    paths_list = [Path(foto["path"]) for foto in fotos_list_unique]
+    
+    # Generar la estructura de fotos compatible con el script original
+    fotos_nombres = [foto["name"] for foto in fotos_list_unique]
+    fotos_paths = [foto["path"] for foto in fotos_list_unique]
+    fotos_por_filas = _filas_fotos(paths_list, incluir_uris=incluir_uris)
+    
+    if not fotos_list_unique:
+        _tester_log_zero(tester, tipo, ident)
+
+    # Actualizar con formato compatible
+    entity.update({
+        "fotos_nombres": fotos_nombres,
+        "fotos_paths": fotos_paths,
+        "fotos_por_filas": fotos_por_filas,
+        "fotos": fotos_list_unique,  # Mantener formato actual también
+        "fotos_count": len(fotos_list_unique),
+    })
+    
+    # Log informativo para debugging
+    fotos_excel_count = len([p for p in fotos_paths if p in fotos_excel_paths]) if declared else 0
+    fotos_adicionales_count = len(fotos_list_unique) - fotos_excel_count
+    if len(fotos_list_unique) > 0:
+        debug_msg = f"[FOTOS] {tipo}:{ident} -> Total: {len(fotos_list_unique)}"
+        if fotos_excel_count > 0:
+            debug_msg += f", Excel: {fotos_excel_count}"
+        if fotos_adicionales_count > 0:
+            debug_msg += f", Adicionales: {fotos_adicionales_count}"
+        print(debug_msg)
+
+class _OpcionesInyeccion(NamedTuple):
+    """Parámetros de add_photos_to_context que necesita cada centro (picklable para los workers)."""
+    consul_map: dict
+    fuzzy_threshold: float
+    buscar_secuenciales: bool
+    max_secuenciales: int
+    incluir_uris: bool
+    tester_on: bool
+    cache: _CacheResolucion  # resolución de fotos declaradas (por ejecución; en paralelo, una por centro)
+
+def _carpeta_referencias_centro(fotos_root: Path, cid: str) -> Optional[Path]:
+    """Localiza la carpeta de fotos del centro con búsqueda inteligente."""
+    center_dir = None
+    if fotos_root and fotos_root.exists():
+        # Método 1: Búsqueda exacta
+        cand1 = fotos_root / cid
+        if cand1.exists():
+            center_dir = cand1
+        else:
+            # Método 2: Búsqueda por nombre que contenga el ID
+            hits = [p for p in fotos_root.iterdir() 
+                   if p.is_dir() and cid.upper() in p.name.upper()]
+            if hits:
+                center_dir = hits[0]
+            else:
+                # Método 3: Usar carpeta raíz como fallback
+                center_dir = fotos_root
+                print(f"[WARN] No se encontro carpeta especifica para {cid}, usando carpeta raiz")
+
+    ref_dir = None
+    for sub in ["Referencias/Fotografías referenciadas", "Referencias",
+                "FOTOGRAFÍAS", "FOTOGRAFIAS", "Fotos", "IMÁGENES", "IMAGENES"]:
+        p = center_dir / sub if center_dir else None
+        if p and p.exists():
+            ref_dir = p; break
+    return ref_dir or center_dir or fotos_root
+
+def _inyectar_centro(c: dict, cid: str, ref_dir: Optional[Path], opts: _OpcionesInyeccion) -> dict:
+    """
+    Vincula las fotos de todas las entidades de un centro. Solo lee el índice de fotos
+    compartido y escribe en el subárbol del propio centro, por lo que puede ejecutarse
+    en un worker. Devuelve el centro actualizado, sus faltantes y el tester.
+    """
+    faltantes: Dict[str, List[str]] = {}
+    cache_antes = opts.cache.contadores()
+
+    # Construir índices optimizados para búsqueda de fotos
+    photo_indices = _build_optimized_photo_index(ref_dir)
+    fotos_index = _list_files_index(ref_dir)  # Mantener para compatibilidad con tester
+    tester = _tester_init(cid, fotos_index) if opts.tester_on else None
+
+    # NUEVO: Inicializar tracking de cobertura por centro
+    centro_stats = {
+        "centro_id": cid,
+        "carpeta_referencias": str(ref_dir),
+        "total_fotos_carpeta": len(fotos_index),
+        "fotos_usadas": set(),
+        "fotos_por_entidad": {}
+    }
 
-        # Actualizar con formato compatible
-        entity.update({
-            "fotos_nombres": fotos_nombres,
-            "fotos_paths": fotos_paths,
-            "fotos_por_filas": fotos_por_filas,
-            "fotos": fotos_list_unique,  # Mantener formato actual también
-            "fotos_count": len(fotos_list_unique),
-        })
+    # Función wrapper para inject que trackea estadísticas
+    def inject_with_stats(entity: dict, tipo: str, cid: str, photo_indices: tuple, tester: Optional[dict]):
+        fotos_antes = len(centro_stats["fotos_usadas"])
+        _inject_fotos_entidad(entity, tipo, cid, photo_indices, tester, opts, faltantes)
         
-        # Log informativo para debugging
-        fotos_excel_count = len([p for p in fotos_paths if p in fotos_excel_paths]) if declared else 0
-        fotos_adicionales_count = len(fotos_list_unique) - fotos_excel_count
-        if len(fotos_list_unique) > 0:
-            debug_msg = f"[FOTOS] {tipo}:{ident} -> Total: {len(fotos_list_unique)}"
-            if fotos_excel_count > 0:
-                debug_msg += f", Excel: {fotos_excel_count}"
-            if fotos_adicionales_count > 0:
-                debug_msg += f", Adicionales: {fotos_adicionales_count}"
-            print(debug_msg)
-
-    for c in ctx_all:
-        cid = c["centro"]["id"]
+        # Obtener fotos de esta entidad
+        entity_id = str(entity.get(PHOTO_ID_FIELD[tipo], "")).strip()
+        fotos_entidad = entity.get("fotos_paths", [])
         
-        # Filtrar centros con IDs vacíos o inválidos
-        if not cid or cid.strip() in ["", "–", "-", "nan", "NaN", "None"]:
-            print(f"⚠️  Omitiendo centro con ID inválido: '{cid}'")
-            continue
-            
-        cid = cid.strip()
-        print(f"[CENTRO] Procesando centro: {cid}")
-
-        # localizar carpeta del centro con búsqueda inteligente
-        center_dir = None
-        if fotos_root and fotos_root.exists():
-            # Método 1: Búsqueda exacta
-            cand1 = fotos_root / cid
-            if cand1.exists():
-                center_dir = cand1
-            else:
-                # Método 2: Búsqueda por nombre que contenga el ID
-                hits = [p for p in fotos_root.iterdir() 
-                       if p.is_dir() and cid.upper() in p.name.upper()]
-                if hits:
-                    center_dir = hits[0]
-                else:
-                    # Método 3: Usar carpeta raíz como fallback
-                    center_dir = fotos_root
-                    print(f"[WARN] No se encontro carpeta especifica para {cid}, usando carpeta raiz")
-
-        ref_dir = None
-        for sub in ["Referencias/Fotografías referenciadas", "Referencias",
-                    "FOTOGRAFÍAS", "FOTOGRAFIAS", "Fotos", "IMÁGENES", "IMAGENES"]:
-            p = center_dir / sub if center_dir else None
-            if p and p.exists():
-                ref_dir = p; break
-        ref_dir = ref_dir or center_dir or fotos_root
-
-        # Construir índices optimizados para búsqueda de fotos
-        photo_indices = _build_optimized_photo_index(ref_dir)
-        fotos_index = _list_files_index(ref_dir)  # Mantener para compatibilidad con tester
-        tester = _tester_init(cid, fotos_index) if tester_on else None
-
-        # NUEVO: Inicializar tracking de cobertura por centro
-        centro_stats = {
-            "centro_id": cid,
-            "carpeta_referencias": str(ref_dir),
-            "total_fotos_carpeta": len(fotos_index),
-            "fotos_usadas": set(),
-            "fotos_por_entidad": {}
+        # Trackear fotos usadas
+        for foto_path in fotos_entidad:
+            # Convertir a stem (nombre sin extensión) para comparar con el índice
+            foto_stem = Path(foto_path).stem
+            if foto_stem in fotos_index:
+                centro_stats["fotos_usadas"].add(foto_stem)
+        
+        # Estadísticas por entidad
+        fotos_despues = len(centro_stats["fotos_usadas"])
+        centro_stats["fotos_por_entidad"][f"{tipo}:{entity_id}"] = {
+            "fotos_count": len(fotos_entidad),
+            "fotos_nuevas_usadas": fotos_despues - fotos_antes
         }
 
-        # Función wrapper para inject que trackea estadísticas
-        def inject_with_stats(entity: dict, tipo: str, cid: str, photo_indices: tuple, tester: Optional[dict]):
-            fotos_antes = len(centro_stats["fotos_usadas"])
-            inject(entity, tipo, cid, photo_indices, tester)
-            
-            # Obtener fotos de esta entidad
-            entity_id = str(entity.get(PHOTO_ID_FIELD[tipo], "")).strip()
-            fotos_entidad = entity.get("fotos_paths", [])
-            
-            # Trackear fotos usadas
-            for foto_path in fotos_entidad:
-                # Convertir a stem (nombre sin extensión) para comparar con el índice
-                foto_stem = Path(foto_path).stem
-                if foto_stem in fotos_index:
-                    centro_stats["fotos_usadas"].add(foto_stem)
-            
-            # Estadísticas por entidad
-            fotos_despues = len(centro_stats["fotos_usadas"])
-            centro_stats["fotos_por_entidad"][f"{tipo}:{entity_id}"] = {
-                "fotos_count": len(fotos_entidad),
-                "fotos_nuevas_usadas": fotos_despues - fotos_antes
-            }
+    inject_with_stats(c["centro"], "CENTRO", cid, photo_indices, tester)
+    for e in c["edif"]:
+        inject_with_stats(e, "EDIFICIO", cid, photo_indices, tester)
+        for d in e.get("dependencias", []): inject_with_stats(d, "DEPENDENCIA", cid, photo_indices, tester)
+        for it in e.get("acom", []):        inject_with_stats(it, "ACOM",        cid, photo_indices, tester)
+        for it in e.get("envolventes", []): inject_with_stats(it, "ENVOL",       cid, photo_indices, tester)
+        for it in e.get("sistemas_cc", []): inject_with_stats(it, "SISTCC",      cid, photo_indices, tester)
+        for it in e.get("equipos_clima", []):inject_with_stats(it,"CLIMA",       cid, photo_indices, tester)
+        for it in e.get("equipos_horiz", []):inject_with_stats(it,"EQHORIZ",     cid, photo_indices, tester)
+        for it in e.get("elevadores", []):  inject_with_stats(it, "ELEVA",       cid, photo_indices, tester)
+        for it in e.get("otros_equipos", []):inject_with_stats(it,"OTROSEQ",     cid, photo_indices, tester)
+        for it in e.get("iluminacion", []): inject_with_stats(it, "ILUM",        cid, photo_indices, tester)
+
+    # REPORTE DE COBERTURA POR CENTRO
+    fotos_usadas = len(centro_stats["fotos_usadas"])
+    total_fotos = centro_stats["total_fotos_carpeta"]
+    porcentaje = (fotos_usadas / total_fotos * 100) if total_fotos > 0 else 0
+    
+    print(f"\n{'='*80}")
+    print(f"📊 ESTADÍSTICAS DE COBERTURA - CENTRO {cid}")
+    print(f"{'='*80}")
+    print(f"📁 Carpeta Referencias: {Path(centro_stats['carpeta_referencias']).name}")
+    print(f"📷 Total fotos en carpeta: {total_fotos}")
+    print(f"✅ Fotos incluidas en JSON: {fotos_usadas}")
+    print(f"📈 PORCENTAJE DE COBERTURA: {porcentaje:.1f}%")
+    print(f"🚫 Fotos no usadas: {total_fotos - fotos_usadas}")
+    cache_centro = [d - a for d, a in zip(opts.cache.contadores(), cache_antes)]
+    if cache_centro[0]:
+        print(f"♻️  Resolución de fotos declaradas: {_resumen_cache_resolucion(*cache_centro)}")
+    print(f"{'='*80}")
+    
+    # Detalle por tipo de entidad
+    entidades_con_fotos = [(k, v) for k, v in centro_stats["fotos_por_entidad"].items() if v["fotos_count"] > 0]
+    if entidades_con_fotos:
+        print("📋 DETALLE POR ENTIDAD:")
+        for entidad_id, stats in entidades_con_fotos:
+            print(f"   {entidad_id}: {stats['fotos_count']} fotos")
+    print(f"{'='*80}\n")
+
+    return {"centro": c, "faltantes": faltantes, "tester": tester, "cache": cache_centro}
 
-        inject_with_stats(c["centro"], "CENTRO", cid, photo_indices, tester)
-        for e in c["edif"]:
-            inject_with_stats(e, "EDIFICIO", cid, photo_indices, tester)
-            for d in e.get("dependencias", []): inject_with_stats(d, "DEPENDENCIA", cid, photo_indices, tester)
-            for it in e.get("acom", []):        inject_with_stats(it, "ACOM",        cid, photo_indices, tester)
-            for it in e.get("envolventes", []): inject_with_stats(it, "ENVOL",       cid, photo_indices, tester)
-            for it in e.get("sistemas_cc", []): inject_with_stats(it, "SISTCC",      cid, photo_indices, tester)
-            for it in e.get("equipos_clima", []):inject_with_stats(it,"CLIMA",       cid, photo_indices, tester)
-            for it in e.get("equipos_horiz", []):inject_with_stats(it,"EQHORIZ",     cid, photo_indices, tester)
-            for it in e.get("elevadores", []):  inject_with_stats(it, "ELEVA",       cid, photo_indices, tester)
-            for it in e.get("otros_equipos", []):inject_with_stats(it,"OTROSEQ",     cid, photo_indices, tester)
-            for it in e.get("iluminacion", []): inject_with_stats(it, "ILUM",        cid, photo_indices, tester)
-
-        # REPORTE DE COBERTURA POR CENTRO
-        fotos_usadas = len(centro_stats["fotos_usadas"])
-        total_fotos = centro_stats["total_fotos_carpeta"]
-        porcentaje = (fotos_usadas / total_fotos * 100) if total_fotos > 0 else 0
-        
-        print(f"\n{'='*80}")
-        print(f"📊 ESTADÍSTICAS DE COBERTURA - CENTRO {cid}")
-        print(f"{'='*80}")
-        print(f"📁 Carpeta Referencias: {Path(centro_stats['carpeta_referencias']).name}")
-        print(f"📷 Total fotos en carpeta: {total_fotos}")
-        print(f"✅ Fotos incluidas en JSON: {fotos_usadas}")
-        print(f"📈 PORCENTAJE DE COBERTURA: {porcentaje:.1f}%")
-        print(f"🚫 Fotos no usadas: {total_fotos - fotos_usadas}")
-        print(f"{'='*80}")
-        
-        # Detalle por tipo de entidad
-        entidades_con_fotos = [(k, v) for k, v in centro_stats["fotos_por_entidad"].items() if v["fotos_count"] > 0]
-        if entidades_con_fotos:
-            print("📋 DETALLE POR ENTIDAD:")
-            for entidad_id, stats in entidades_con_fotos:
-                print(f"   {entidad_id}: {stats['fotos_count']} fotos")
-        print(f"{'='*80}\n")
+# --------------------------
+# Inyección en paralelo (un proceso por centro, índice de fotos de solo lectura)
+# --------------------------
+# Los workers se arrancan con spawn, nunca con fork: en el modo en proceso del orquestador
+# esta función corre con los hilos del PDF (asyncio + Playwright) y del servidor HTTP vivos,
+# y un fork podría heredar locks tomados por esos hilos y bloquear al hijo.
+INYECCION_START_METHOD = "spawn"
+
+def _init_worker_inyeccion(store_path: Optional[Path]) -> None:
+    # El worker arranca limpio: abre el mismo índice SQLite de fotos que el proceso principal
+    if _photo_index_store_path != store_path:
+        _set_photo_index_store(store_path)
+
+def _inyectar_centro_worker(c: dict, cid: str, ref_dir: Optional[Path], opts: _OpcionesInyeccion) -> dict:
+    """Ejecuta _inyectar_centro capturando su salida para imprimirla en orden en el proceso principal."""
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        res = _inyectar_centro(c, cid, ref_dir, opts)
+    res["log"] = buf.getvalue()
+    return res
+
+def _print_resumen_cache(cache_total: List[int]) -> None:
+    if cache_total[0]:
+        print(f"[INFO] Caché de resolución de fotos declaradas: {_resumen_cache_resolucion(*cache_total)}")
+
+def _centro_valido(c: dict) -> Optional[str]:
+    cid = c["centro"]["id"]
+    # Filtrar centros con IDs vacíos o inválidos
+    if not cid or cid.strip() in ["", "–", "-", "nan", "NaN", "None"]:
+        print(f"⚠️  Omitiendo centro con ID inválido: '{cid}'")
+        return None
+    return cid.strip()
+
+def add_photos_to_context(ctx_all: List[Dict], df_consul: Optional[pd.DataFrame],
+                          fotos_root: Path, fuzzy_threshold: float,
+                          tester_on: bool, outdir: Path, buscar_secuenciales: bool = True,
+                          max_secuenciales: int = MAX_SEQUENTIAL_PHOTOS, 
+                          incluir_uris: bool = True,
+                          on_center=None, workers: int = 1) -> Tuple[List[Dict], Dict[str, List[str]]]:
+    """
+    Vincula fotos a cada centro de ctx_all. Si se indica 'on_center', se invoca con el
+    contexto de cada centro en cuanto termina (permite encadenar render/PDF centro a centro).
+    Con workers > 1 los centros se procesan en paralelo en un pool de procesos; los
+    resultados se aplican en el orden de ctx_all, así que la salida es la misma que en serie.
+    """
+
+    consul_map = _consul_index_from_sections(df_consul) if df_consul is not None else {}
+    opts = _OpcionesInyeccion(consul_map, fuzzy_threshold, buscar_secuenciales,
+                              max_secuenciales, incluir_uris, tester_on, _CacheResolucion())
+    faltantes: Dict[str, List[str]] = {}
+    cache_total = [0, 0, 0]
+
+    def finalizar(c: dict, cid: str, ref_dir: Optional[Path], res: dict):
+        if res["centro"] is not c:
+            # Resultado de un worker: volcar el centro actualizado sobre el objeto original
+            c.clear()
+            c.update(res["centro"])
+        for k, v in res["faltantes"].items():
+            faltantes.setdefault(k, []).extend(v)
+        cache_total[:] = [t + d for t, d in zip(cache_total, res["cache"])]
 
         if tester_on:
+            tester = res["tester"]
             _tester_write_txt(tester, outdir)
             # Después de procesar elementos definidos, buscar elementos adicionales en disco
-            _discover_missing_elements(c, cid, photo_indices, tester, outdir)
+            _discover_missing_elements(c, cid, _build_optimized_photo_index(ref_dir), tester, outdir)
+
+        if on_center is not None:
+            on_center(c)
 
+    if workers <= 1:
+        for c in ctx_all:
+            cid = _centro_valido(c)
+            if not cid:
+                continue
+            print(f"[CENTRO] Procesando centro: {cid}")
+            ref_dir = _carpeta_referencias_centro(fotos_root, cid)
+            finalizar(c, cid, ref_dir, _inyectar_centro(c, cid, ref_dir, opts))
+        _print_resumen_cache(cache_total)
+        return ctx_all, faltantes
+
+    # Índices construidos antes de lanzar los workers: quedan en el índice SQLite (si está
+    # configurado) para que los workers no vuelvan a recorrer las carpetas
+    trabajos = []
+    for c in ctx_all:
+        cid = _centro_valido(c)
+        if not cid:
+            continue
+        print(f"[CENTRO] Preparando centro: {cid}")
+        ref_dir = _carpeta_referencias_centro(fotos_root, cid)
+        _, normalized_index, path_to_info = _build_optimized_photo_index(ref_dir)
+        _get_photo_lookup(normalized_index, path_to_info)
+        trabajos.append((c, cid, ref_dir))
+
+    print(f"[INFO] Vinculando fotos de {len(trabajos)} centros con {workers} procesos...")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker_inyeccion,
+                             initargs=(_photo_index_store_path,),
+                             mp_context=multiprocessing.get_context(INYECCION_START_METHOD)) as pool:
+        futures = [pool.submit(_inyectar_centro_worker, c, cid, ref_dir, opts) for c, cid, ref_dir in trabajos]
+        for (c, cid, ref_dir), fut in zip(trabajos, futures):
+            res = fut.result()
+            print(f"[CENTRO] Procesando centro: {cid}")
+            print(res["log"], end="")
+            finalizar(c, cid, ref_dir, res)
+
+    _print_resumen_cache(cache_total)
     return ctx_all, faltantes
 
 def _discover_missing_elements(center_data: dict, center_id: str, photo_indices: tuple, tester: dict, outdir: str):
@@ -2203,19 +2764,8 @@ def _discover_missing_elements(center_data: dict, center_id: str, photo_indices:
         stem = info["stem"]
         
         # Buscar patrones QE, QI, QH, etc. en fotos no utilizadas
-        patterns = [
-            (r'(QE)(\d+)', 'sistemas_cc', 'SISTCC'),
-            (r'(QI)(\d+)', 'iluminacion', 'ILUM'), 
-            (r'(QH)(\d+)', 'equipos_horiz', 'EQHORIZ'),
-            (r'(QG)(\d+)', 'sistemas_cc', 'SISTCC'),
-            (r'(CR)(\d+)', 'envolventes', 'ENVOL'),
-            (r'(I)(\d+)', 'iluminacion', 'ILUM'),
-            (r'(E)(\d+)', 'otros_equipos', 'OTROSEQ'),
-            (r'(B)(\d+)', 'otros_equipos', 'OTROSEQ')
-        ]
-        
-        for pattern_regex, category, tipo in patterns:
-            match = re.search(pattern_regex, stem, re.IGNORECASE)
+        for pattern_rx, category, tipo in _PATRONES_DESCUBRIMIENTO:
+            match = pattern_rx.search(stem)
             if match:
                 element_type = match.group(1).upper()
                 element_num = match.group(2)
@@ -2286,102 +2836,197 @@ def _discover_missing_elements(center_data: dict, center_id: str, photo_indices:
     else:
         tester["discovered"] = []
 
-def _generar_jsons_por_tipo(contexto_centro: dict, carpeta_centro: Path) -> None:
+# --------------------------
+# Escritura de JSON por fragmentos
+# --------------------------
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Secciones de equipos/elementos dentro de cada edificio (un JSON por tipo)
+_SECCIONES_EDIFICIO = {
+    "dependencias": "dependencias.json",
+    "acom": "acom.json",
+    "envolventes": "envol.json",
+    "sistemas_cc": "cc.json",
+    "equipos_clima": "clima.json",
+    "equipos_horiz": "eqhoriz.json",
+    "elevadores": "eleva.json",
+    "iluminacion": "ilum.json",
+    "otros_equipos": "otroseq.json",
+}
+
+class _EscritorJson:
+    """
+    Serializa cada subárbol de entidad (centro, edificio, elemento) una sola vez y reutiliza
+    el texto en todos los ficheros que lo contienen (completo, por tipo, por centro, combinado).
+    Formato 'indentado': mismos bytes que json.dumps(..., indent=2); los fragmentos se guardan
+    a profundidad 0 y se re-indentan al incrustarlos (las cadenas JSON no tienen saltos de línea).
+    Formato 'compacto': sin espacios ni saltos; usa orjson para las hojas si está instalado.
+    Los objetos no deben modificarse mientras viva el escritor (memo por id()).
+    """
+
+    def __init__(self, compacto: bool = False):
+        self.compacto = compacto
+        self._pares: Dict[int, Tuple[object, List[Tuple[str, str]]]] = {}
+        self._textos: Dict[int, Tuple[object, str]] = {}
+
+    def valor(self, v) -> str:
+        """Texto JSON de un valor hoja a profundidad 0."""
+        if self.compacto:
+            if orjson is not None:
+                try:
+                    return orjson.dumps(v).decode("utf-8")
+                except TypeError:
+                    pass
+            return json.dumps(v, ensure_ascii=False, separators=(",", ":"))
+        return json.dumps(v, ensure_ascii=False, indent=2)
+
+    def objeto(self, pares: List[Tuple[str, str]], depth: int = 0) -> str:
+        if not pares:
+            return "{}"
+        if self.compacto:
+            return "{" + ",".join(f"{k}:{v}" for k, v in pares) + "}"
+        ind = "\n" + "  " * (depth + 1)
+        return "{" + ",".join(f"{ind}{k}: {self._reindentar(v, depth + 1)}" for k, v in pares) + "\n" + "  " * depth + "}"
+
+    def lista(self, textos: List[str], depth: int = 0) -> str:
+        if not textos:
+            return "[]"
+        if self.compacto:
+            return "[" + ",".join(textos) + "]"
+        ind = "\n" + "  " * (depth + 1)
+        return "[" + ",".join(ind + self._reindentar(t, depth + 1) for t in textos) + "\n" + "  " * depth + "]"
+
+    def _reindentar(self, texto: str, depth: int) -> str:
+        if self.compacto or depth == 0 or "\n" not in texto:
+            return texto
+        return texto.replace("\n", "\n" + "  " * depth)
+
+    def clave(self, k) -> str:
+        return json.dumps(k if isinstance(k, str) else str(k), ensure_ascii=False)
+
+    def pares(self, d: dict) -> List[Tuple[str, str]]:
+        """(clave, texto) de cada entrada de un dict de entidad; las secciones de edificio se
+        construyen con los fragmentos de sus elementos."""
+        hit = self._pares.get(id(d))
+        if hit is not None and hit[0] is d:
+            return hit[1]
+        pares = []
+        for k, v in d.items():
+            if k in _SECCIONES_EDIFICIO and isinstance(v, list):
+                texto = self.lista([self.fragmento(e) for e in v])
+            else:
+                texto = self.valor(v)
+            pares.append((self.clave(k), texto))
+        self._pares[id(d)] = (d, pares)
+        return pares
+
+    def fragmento(self, v) -> str:
+        """Texto de una entidad a profundidad 0, calculado una vez."""
+        if not isinstance(v, dict):
+            return self.valor(v)
+        hit = self._textos.get(id(v))
+        if hit is not None and hit[0] is v:
+            return hit[1]
+        texto = self.objeto(self.pares(v))
+        self._textos[id(v)] = (v, texto)
+        return texto
+
+    def contexto_centro(self, c: dict) -> str:
+        """Texto de un contexto de centro ({"centro": ..., "edif": [...]})."""
+        hit = self._textos.get(id(c))
+        if hit is not None and hit[0] is c:
+            return hit[1]
+        pares = []
+        for k, v in c.items():
+            if k == "edif" and isinstance(v, list):
+                texto = self.lista([self.fragmento(e) for e in v])
+            else:
+                texto = self.fragmento(v)
+            pares.append((self.clave(k), texto))
+        texto = self.objeto(pares)
+        self._textos[id(c)] = (c, texto)
+        return texto
+
+    def escribir(self, path: Path, texto: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(texto)
+
+def _generar_jsons_por_tipo(contexto_centro: dict, carpeta_centro: Path,
+                            escritor: Optional[_EscritorJson] = None) -> None:
     """
     Genera JSONs separados por tipo de entidad en una carpeta específica del centro.
     
     Args:
         contexto_centro: Diccionario con toda la info del centro
         carpeta_centro: Path a la carpeta donde crear los JSONs separados
+        escritor: _EscritorJson compartido (reutiliza fragmentos ya serializados); por defecto
+                  uno nuevo con formato indentado
     """
     carpeta_centro.mkdir(parents=True, exist_ok=True)
+    if escritor is None:
+        escritor = _EscritorJson()
     
     # 1. JSON completo (igual que antes)
-    completo_path = carpeta_centro / "completo.json"
-    completo_path.write_text(
-        json.dumps(contexto_centro, ensure_ascii=False, indent=2), 
-        encoding="utf-8"
-    )
+    escritor.escribir(carpeta_centro / "completo.json", escritor.contexto_centro(contexto_centro))
     
     centro_info = contexto_centro.get("centro", {})
     edificios = contexto_centro.get("edif", [])
+    par_centro = (escritor.clave("centro"), escritor.fragmento(centro_info))
     
     # 2. JSON solo del centro (info básica + fotos del centro)
-    centro_json = {
-        "centro": centro_info
-    }
-    centro_path = carpeta_centro / "centro.json"
-    centro_path.write_text(
-        json.dumps(centro_json, ensure_ascii=False, indent=2),
-        encoding="utf-8"
-    )
+    escritor.escribir(carpeta_centro / "centro.json", escritor.objeto([par_centro]))
     
     # 3. JSON de edificios (info básica de edificios sin equipos)
-    edificios_basicos = []
-    for edif in edificios:
-        edificio_basico = {k: v for k, v in edif.items() 
-                          if k not in ['dependencias', 'acom', 'envolventes', 'sistemas_cc', 
-                                     'equipos_clima', 'equipos_horiz', 'elevadores', 
-                                     'otros_equipos', 'iluminacion']}
-        edificios_basicos.append(edificio_basico)
-    
-    edificios_json = {
-        "centro": centro_info,
-        "edificios": edificios_basicos
-    }
-    edificios_path = carpeta_centro / "edificios.json"
-    edificios_path.write_text(
-        json.dumps(edificios_json, ensure_ascii=False, indent=2),
-        encoding="utf-8"
-    )
+    secciones = {escritor.clave(k) for k in _SECCIONES_EDIFICIO}
+    edificios_basicos = [
+        escritor.objeto([par for par in escritor.pares(edif) if par[0] not in secciones])
+        for edif in edificios
+    ]
+    escritor.escribir(carpeta_centro / "edificios.json",
+                      escritor.objeto([par_centro, (escritor.clave("edificios"), escritor.lista(edificios_basicos))]))
     
     # 4-12. JSONs por tipo de equipo/elemento
-    tipos_equipos = {
-        "dependencias": "dependencias.json",
-        "acom": "acom.json", 
-        "envolventes": "envol.json",
-        "sistemas_cc": "cc.json",
-        "equipos_clima": "clima.json",
-        "equipos_horiz": "eqhoriz.json",
-        "elevadores": "eleva.json",
-        "iluminacion": "ilum.json",
-        "otros_equipos": "otroseq.json"
-    }
-    
-    for tipo_key, archivo in tipos_equipos.items():
+    for tipo_key, archivo in _SECCIONES_EDIFICIO.items():
         # Recopilar todos los elementos de este tipo de todos los edificios
         elementos_tipo = []
+        total_fotos = 0
         
         for edif in edificios:
-            elementos = edif.get(tipo_key, [])
-            for elemento in elementos:
-                # Agregar contexto de edificio a cada elemento
-                elemento_con_contexto = elemento.copy()
-                elemento_con_contexto.update({
-                    "edificio_id": edif.get("id"),
-                    "edificio_nombre": edif.get("denominacion", ""),
-                    "centro_id": centro_info.get("id"),
-                    "centro_nombre": centro_info.get("nombre", "")
-                })
-                elementos_tipo.append(elemento_con_contexto)
+            # Contexto de edificio/centro que se añade a cada elemento
+            extra = [(escritor.clave(k), escritor.valor(v)) for k, v in (
+                ("edificio_id", edif.get("id")),
+                ("edificio_nombre", edif.get("denominacion", "")),
+                ("centro_id", centro_info.get("id")),
+                ("centro_nombre", centro_info.get("nombre", "")),
+            )]
+            for elemento in edif.get(tipo_key, []):
+                # Mismo orden que elemento.copy().update(extra): las claves existentes
+                # conservan su posición, las nuevas van al final
+                pares = list(escritor.pares(elemento))
+                posiciones = {k: i for i, (k, _) in enumerate(pares)}
+                for par in extra:
+                    if par[0] in posiciones:
+                        pares[posiciones[par[0]]] = par
+                    else:
+                        pares.append(par)
+                elementos_tipo.append(escritor.objeto(pares))
+                total_fotos += elemento.get('fotos_count', 0)
         
         # Solo crear el archivo si hay elementos de este tipo
         if elementos_tipo:
-            tipo_json = {
-                "centro": centro_info,
-                tipo_key: elementos_tipo,
-                "resumen": {
-                    "total_elementos": len(elementos_tipo),
-                    "tipo": tipo_key,
-                    "total_fotos": sum(elem.get('fotos_count', 0) for elem in elementos_tipo)
-                }
+            resumen = {
+                "total_elementos": len(elementos_tipo),
+                "tipo": tipo_key,
+                "total_fotos": total_fotos
             }
-            
-            tipo_path = carpeta_centro / archivo
-            tipo_path.write_text(
-                json.dumps(tipo_json, ensure_ascii=False, indent=2),
-                encoding="utf-8"
-            )
+            escritor.escribir(carpeta_centro / archivo, escritor.objeto([
+                par_centro,
+                (escritor.clave(tipo_key), escritor.lista(elementos_tipo)),
+                (escritor.clave("resumen"), escritor.valor(resumen)),
+            ]))
     
     print(f"    📁 JSONs separados generados en: {carpeta_centro.name}/")
 
@@ -2406,6 +3051,17 @@ def main():
                     help="Genera JSONs separados por tipo en carpetas individuales por centro")
     ap.add_argument("--tester", action="store_true", help="Escribe TEST_FOTOS_<CENTRO>.txt y faltantes.")
     ap.add_argument("--uris", action="store_true", help="Incluir file_uri en las fotos (para Word)")
+    ap.add_argument("--indice-fotos", dest="indice_fotos", default=None,
+                    help=f"Fichero SQLite del índice persistente de fotos (default: uno por --fotos-root en {PHOTO_INDEX_CACHE_DIR})")
+    ap.add_argument("--sin-indice-fotos", action="store_true",
+                    help="No usar índice persistente: recorre siempre todo el árbol de fotos")
+    ap.add_argument("--workers-fotos", type=int, default=1,
+                    help="Procesos para vincular fotos por centro en paralelo (1 = en serie; mismo JSON)")
+    ap.add_argument("--json-compacto", action="store_true",
+                    help="Escribe los JSON sin indentar (más pequeños y rápidos; usa orjson si está instalado)")
+    ap.add_argument("--constructor-contexto", choices=["agrupado", "clasico"], default="agrupado",
+                    help="Constructor del contexto: 'agrupado' (una pasada por hoja) o 'clasico' "
+                         "(filtrado por centro/edificio). Ambos generan el mismo JSON.")
     ap.add_argument("--interactivo", action="store_true", 
                     help="Modo interactivo: solicita rutas y opciones al usuario")
     ap.add_argument("--no-interactivo", action="store_true", 
@@ -2481,6 +3137,12 @@ def main():
         sys.exit(1)
 
     outdir.mkdir(parents=True, exist_ok=True)
+
+    # Índice persistente de fotos: solo se re-escanean las carpetas modificadas
+    if args.sin_indice_fotos:
+        _set_photo_index_store(None)
+    else:
+        _set_photo_index_store(Path(args.indice_fotos) if args.indice_fotos else default_photo_index_path(fotos_root))
     
     print(f"\n[INFO] Iniciando procesamiento...")
     print(f"[Excel] {xlsx.name}")
@@ -2491,8 +3153,10 @@ def main():
     dfs = _read_all_sheets(xlsx)
 
     # 2) Contexto base
-    print("[INFO] Construyendo contexto de datos...")
-    ctx = build_context(dfs)
+    print(f"[INFO] Construyendo contexto de datos ({args.constructor_contexto})...")
+    t0 = time.time()
+    ctx = build_context_grouped(dfs) if args.constructor_contexto == "agrupado" else build_context(dfs)
+    print(f"[OK] Contexto construido en {time.time() - t0:.2f}s")
 
     # 3) Filtro por centro (opcional)
     if centro_filter:
@@ -2506,11 +3170,14 @@ def main():
     print("[INFO] Procesando fotografias...")
     ctx, falt = add_photos_to_context(ctx, _read_consul(xlsx), fotos_root,
                                       fuzzy_threshold, tester_on, outdir,
-                                      buscar_secuenciales, max_secuenciales, incluir_uris)
+                                      buscar_secuenciales, max_secuenciales, incluir_uris,
+                                      workers=args.workers_fotos)
 
-    # 5) Guardar
+    # 5) Guardar (cada subárbol se serializa una vez y se reutiliza en todos los ficheros)
     print("\n💾 Guardando archivos JSON...")
     all_ctx = []
+    escritor = _EscritorJson(compacto=args.json_compacto)
+    t0 = time.time()
     
     for c in ctx:
         cent = c["centro"]
@@ -2520,30 +3187,28 @@ def main():
         # Generar JSONs separados por tipo si se solicita
         if jsons_separados:
             carpeta_centro = outdir / f"{cid}_{_safe_name(nom)}"
-            _generar_jsons_por_tipo(c, carpeta_centro)
+            _generar_jsons_por_tipo(c, carpeta_centro, escritor)
             print(f"  ✅ {carpeta_centro.name}/ (JSONs separados)")
         else:
             # Método tradicional: un JSON por centro
             outpath = outdir / f"{cid}_{_safe_name(nom)}.json"
-            outpath.write_text(json.dumps(c, ensure_ascii=False, indent=2), encoding="utf-8")
+            escritor.escribir(outpath, escritor.contexto_centro(c))
             print(f"  ✅ {outpath.name}")
         
         all_ctx.append(c)
 
     if not args.no_combinado:
         combinado_path = outdir / "contexto_con_fotos__COMBINADO.json"
-        combinado_path.write_text(
-            json.dumps(all_ctx, ensure_ascii=False, indent=2), encoding="utf-8"
-        )
+        escritor.escribir(combinado_path, escritor.lista([escritor.contexto_centro(c) for c in all_ctx]))
         print(f"  ✅ {combinado_path.name}")
 
     if falt:
         faltantes_path = outdir / "fotos_faltantes_por_id.json"
-        faltantes_path.write_text(
-            json.dumps(falt, ensure_ascii=False, indent=2), encoding="utf-8"
-        )
+        escritor.escribir(faltantes_path, escritor.valor(falt))
         print(f"  ⚠️  {faltantes_path.name} ({len(falt)} entradas)")
 
+    print(f"[OK] JSON {'compacto' if args.json_compacto else 'indentado'} escrito en {time.time() - t0:.2f}s")
+
     print(f"\n🎉 ¡Procesamiento completado exitosamente!")
     print(f"📂 Archivos generados en: {outdir.resolve()}")
     print(f"📊 Centros procesados: {len(all_ctx)}")
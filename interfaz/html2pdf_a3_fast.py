@@ -4,7 +4,7 @@ HTML → PDF A3 (Chromium/Playwright) + merges por sección **POR CENTRO**, con
 
 Salida:
   <data>_pdf/<CENTRO>/<seccion>/*.pdf
-  <data>_pdf/<CENTRO>/_<SECCION>__MERGED.pdf
+  <data>_pdf/<CENTRO>/_<SECCION>__MERGED.pdf   (solo con --section-merges)
   <data>_pdf/<CENTRO>/05_ANEJO 5. REPORTAJE FOTOGRÁFICO.pdf
 """
 
@@ -14,7 +14,10 @@ import os
 import re
 import sys
 import functools
+import hashlib
+import json
 import threading
+import multiprocessing
 from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
 import time
 from pathlib import Path
@@ -40,6 +43,29 @@ SECCIONES = {
     "otros_equipos": "OTROS_EQUIPOS",
 }
 
+ANEJO_FINAL_NOMBRE = "05_ANEJO 5. REPORTAJE FOTOGRÁFICO.pdf"
+
+# Orden del anejo final: (carátula, sección). La portada no lleva sección.
+ORDEN_ANEJO_FINAL = [
+    ("PORTADA.pdf", None),
+    ("CENTRO.pdf", "centro"),
+    ("EDIFICIO.pdf", "edificios"),
+    ("DEPENDENCIAS.pdf", "dependencias"),
+    ("ACOM.pdf", "acometida"),
+    ("ENVOL.pdf", "envolventes"),
+    ("CALEFACCION.pdf", "cc"),
+    ("CLIMA.pdf", "clima"),
+    ("EQHORIZ.pdf", "eqhoriz"),
+    ("ELEVA.pdf", "elevadores"),
+    ("ILUM.pdf", "iluminacion"),
+    ("OTROSEQ.pdf", "otros_equipos"),
+]
+# Secciones que se vuelven a añadir al final, sin carátula
+ORDEN_ANEJO_FINAL_EXTRA = ["dependencias", "edificios", "elevadores", "envolventes", "eqhoriz"]
+
+def merged_name(section: str) -> str:
+    return f"_{SECCIONES.get(section, section).upper()}__MERGED.pdf"
+
 # ──────────────────────────────────────────────────────────────────────────────
 # HTTP local (sirve --data por http://127.0.0.1:<PORT>/…)
 def start_http_server(root: Path, port: int = 8800):
@@ -55,51 +81,134 @@ def to_file_uri(p: Path) -> str:
     s = str(p).replace("\\", "/")
     return "file:///" + quote(s, safe="/:._-()")
 
-def find_htmls(root: Path, fast_mode: bool = False) -> list[Path]:
-    """Encuentra HTML y aplica validaciones básicas (opcional)."""
-    html_files = sorted([p for p in root.rglob("*.html") if p.is_file()])
+# ──────────────────────────────────────────────────────────────────────────────
+# Índice de páginas que escribe render_a3 junto a cada centro (ver render_a3.ManifiestoHtml):
+#   <CENTRO>/.html_manifest.json = {"v": 1, "paginas": {"<seccion>/<archivo>.html":
+#                                   {"size", "mtime_ns", "imgs": [src...], "orden": n}}}
+# Una entrada solo vale si el tamaño y el mtime del HTML coinciden con los del disco.
+HTML_MANIFEST_NAME = ".html_manifest.json"
+HTML_MANIFEST_VERSION = 1
+HTML_PREFIX_BYTES = 64 * 1024  # lectura máxima por página cuando no hay entrada en el manifiesto
+_RE_SRC = re.compile(r'src=["\']([^"\']+)["\']', re.IGNORECASE)
+
+def load_html_manifests(root: Path) -> dict:
+    """{carpeta del centro: {ruta relativa: entrada}} para root y sus subcarpetas directas."""
+    manifests = {}
+    candidatos = [root]
+    with contextlib.suppress(OSError):
+        candidatos += [d for d in root.iterdir() if d.is_dir()]
+    for d in candidatos:
+        try:
+            data = json.loads((d / HTML_MANIFEST_NAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if data.get("v") == HTML_MANIFEST_VERSION:
+            manifests[d] = data.get("paginas", {})
+    return manifests
+
+def save_html_manifest(centro_dir: Path, paginas: dict):
+    path = centro_dir / HTML_MANIFEST_NAME
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"v": HTML_MANIFEST_VERSION, "paginas": paginas}, ensure_ascii=False),
+                   encoding="utf-8")
+    os.replace(tmp, path)
+
+def html_manifest_entry(manifests: dict, html_path: Path, st=None):
+    """Entrada vigente del HTML en el manifiesto (None si no está o el archivo ha cambiado)."""
+    entry = manifests.get(html_path.parent.parent, {}).get(f"{html_path.parent.name}/{html_path.name}")
+    if entry is None:
+        return None
+    st = st or html_path.stat()
+    if entry.get("size") != st.st_size or entry.get("mtime_ns") != st.st_mtime_ns:
+        return None
+    return entry
+
+def scan_html_prefix(html_file: Path, max_srcs: int = 5, limit: int = HTML_PREFIX_BYTES):
+    """
+    Lee el HTML por bloques hasta ver la cabecera y max_srcs referencias src (o hasta 'limit'
+    bytes). Devuelve (parece_html, srcs).
+    """
+    texto = ""
+    leidos = 0
+    with open(html_file, 'r', encoding='utf-8', errors='replace') as f:
+        while leidos < limit:
+            bloque = f.read(min(16 * 1024, limit - leidos))
+            if not bloque:
+                break
+            leidos += len(bloque)
+            texto += bloque
+            es_html = any(tag in texto.lower() for tag in ['<html', '<body', '<!doctype'])
+            srcs = _RE_SRC.findall(texto)
+            if es_html and len(srcs) >= max_srcs:
+                return True, srcs[:max_srcs]
+    return any(tag in texto.lower() for tag in ['<html', '<body', '<!doctype']), _RE_SRC.findall(texto)[:max_srcs]
+
+def _broken_images(html_file: Path, srcs) -> list:
+    broken_images = []
+    for src in srcs:
+        if src.startswith(('http://', 'https://', 'data:')):
+            continue
+        if src.startswith('file:///'):
+            img_path = Path(unquote(src.replace('file:///', '')))
+        elif not os.path.isabs(src):
+            img_path = html_file.parent / src
+        else:
+            img_path = Path(src)
+        if not img_path.exists():
+            broken_images.append(src[:50] + "..." if len(src) > 50 else src)
+    return broken_images
 
-    if fast_mode:
-        return [p for p in html_files if p.stat().st_size > 0]
+def find_htmls(root: Path, fast_mode: bool = False) -> list[Path]:
+    """
+    Encuentra HTML y aplica validaciones básicas (opcional). Las páginas con entrada vigente
+    en el manifiesto de render_a3 se validan sin leerlas y salen en su orden de render; el
+    resto se valida con una lectura acotada del principio del archivo.
+    """
+    html_files = [p for p in root.rglob("*.html") if p.is_file()]
+    manifests = load_html_manifests(root)
 
-    valid_htmls = []
+    valid_htmls = []  # (clave de orden, html)
+    desde_manifiesto = 0
     for html_file in html_files:
         try:
-            if html_file.stat().st_size == 0:
-                print(f"[SKIP] {html_file.name} es vacío, se omite")
+            st = html_file.stat()
+            if st.st_size == 0:
+                if not fast_mode:
+                    print(f"[SKIP] {html_file.name} es vacío, se omite")
+                continue
+            entry = html_manifest_entry(manifests, html_file, st)
+            orden = (html_file.parent.parent, 0 if entry else 1, entry["orden"] if entry else 0, html_file)
+            if fast_mode:
+                valid_htmls.append((orden, html_file))
                 continue
 
-            with open(html_file, 'r', encoding='utf-8', errors='replace') as f:
-                content = f.read()
-                if not any(tag in content.lower() for tag in ['<html', '<body', '<!doctype']):
+            if entry is not None:
+                desde_manifiesto += 1
+                srcs = entry.get("imgs", [])[:5]
+            else:
+                es_html, srcs = scan_html_prefix(html_file)
+                if not es_html:
                     print(f"[SKIP] {html_file.name} no parece contener HTML válido, se omite")
                     continue
 
-                broken_images = []
-                src_patterns = re.findall(r'src=["\']([^"\']+)["\']', content, re.IGNORECASE)
-                for src in src_patterns[:5]:
-                    if src.startswith(('http://', 'https://', 'data:')):
-                        continue
-                    if src.startswith('file:///'):
-                        img_path = Path(unquote(src.replace('file:///', '')))
-                    elif not os.path.isabs(src):
-                        img_path = html_file.parent / src
-                    else:
-                        img_path = Path(src)
-                    if not img_path.exists():
-                        broken_images.append(src[:50] + "..." if len(src) > 50 else src)
-                if broken_images:
-                    print(f"[WARNING] {html_file.name} tiene {len(broken_images)} imágenes no encontradas; ejemplo: {broken_images[:2]}")
-
-            valid_htmls.append(html_file)
+            broken_images = _broken_images(html_file, srcs)
+            if broken_images:
+                print(f"[WARNING] {html_file.name} tiene {len(broken_images)} imágenes no encontradas; ejemplo: {broken_images[:2]}")
+
+            valid_htmls.append((orden, html_file))
         except Exception as e:
             print(f"[SKIP] {html_file.name} no se puede leer ({e}), se omite")
             continue
 
+    if fast_mode:
+        return [h for _, h in sorted(valid_htmls, key=lambda t: t[0])]
+
     if len(valid_htmls) != len(html_files):
         print(f"[INFO] {len(html_files)-len(valid_htmls)} archivos HTML omitidos por ser inválidos o corruptos")
+    if desde_manifiesto:
+        print(f"[INFO] {desde_manifiesto}/{len(html_files)} HTML validados desde el manifiesto de render_a3")
 
-    return valid_htmls
+    return [h for _, h in sorted(valid_htmls, key=lambda t: t[0])]
 
 def out_root_for(in_root: Path) -> Path:
     return in_root.with_name(in_root.name + "_pdf")
@@ -126,8 +235,176 @@ def center_from_path(html_path: Path, data_root: Path) -> str:
         return "ROOT"
 
 # ──────────────────────────────────────────────────────────────────────────────
+# Manifiesto de render: salta HTML sin cambios (HTML + assets + opciones iguales)
+RENDER_MANIFEST_NAME = ".render_manifest.json"
+RENDER_MANIFEST_VERSION = 2  # v2: la huella incluye los url(...) del CSS
+# src/href de etiquetas y url(...) de CSS (p. ej. el fondo SVG de los huecos sin foto)
+_RE_ASSET_REF = re.compile(r'(?:src|href)=["\']([^"\']+)["\']|url\(\s*["\']?([^"\')]+?)["\']?\s*\)', re.IGNORECASE)
+
+def _local_asset_path(ref: str, html_path: Path):
+    """Ruta local de un src/href/url() del HTML (None si es remoto, data: o ancla)."""
+    if ref.startswith(('http://', 'https://', 'data:', '#', 'mailto:', 'javascript:')):
+        return None
+    ref = ref.split('#', 1)[0].split('?', 1)[0]
+    if not ref:
+        return None
+    if ref.lower().startswith('file:///'):
+        return Path(unquote(ref[8:]))
+    if os.path.isabs(ref):
+        return Path(ref)
+    return html_path.parent / unquote(ref)
+
+def html_fingerprint(html_path: Path) -> dict:
+    """Huella del HTML: sha1 de sus bytes + (tamaño, mtime) de cada asset local referenciado."""
+    data = html_path.read_bytes()
+    assets = {}
+    refs = {attr or css for attr, css in _RE_ASSET_REF.findall(data.decode("utf-8", errors="replace"))}
+    for ref in sorted(refs):
+        p = _local_asset_path(ref, html_path)
+        if p is None:
+            continue
+        try:
+            st = p.stat()
+            assets[ref] = [st.st_size, st.st_mtime_ns]
+        except OSError:
+            assets[ref] = None
+    return {"html": hashlib.sha1(data).hexdigest(), "assets": assets}
+
+def render_options_key(args, block_types) -> str:
+    """Opciones que afectan al PDF resultante; si cambian, se re-renderiza todo."""
+    mode = "ultra_fast" if getattr(args, "ultra_fast", False) else ("fast" if getattr(args, "fast", False) else "robusto")
+    return json.dumps({
+        "v": RENDER_MANIFEST_VERSION,
+        "format": "A3",
+        "landscape": True,
+        "scale": args.scale,
+        "prefer_css": not args.ignore_css_page,
+        "wait": args.wait,
+        "block": sorted(block_types),
+        "mode": mode,
+    }, sort_keys=True)
+
+class RenderManifest:
+    """<out_root>/.render_manifest.json  ->  {pdf relativo: {opts, html, assets}}"""
+
+    def __init__(self, out_root: Path):
+        self.path = out_root / RENDER_MANIFEST_NAME
+        self.out_root = out_root
+        self.entries = {}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                if data.get("version") == RENDER_MANIFEST_VERSION:
+                    self.entries = data.get("pdfs", {})
+            except Exception as e:
+                print(f"[WARN] Manifiesto de render ilegible, se ignora: {e}")
+
+    def _key(self, pdf_path: Path) -> str:
+        return pdf_path.relative_to(self.out_root).as_posix()
+
+    def is_fresh(self, pdf_path: Path, fingerprint: dict, opts_key: str) -> bool:
+        entry = self.entries.get(self._key(pdf_path))
+        if not entry or entry.get("opts") != opts_key:
+            return False
+        if entry.get("html") != fingerprint["html"] or entry.get("assets") != fingerprint["assets"]:
+            return False
+        try:
+            return pdf_path.stat().st_size > 0
+        except OSError:
+            return False
+
+    def record(self, pdf_path: Path, fingerprint: dict, opts_key: str, ready_ms: float = None):
+        entry = {"opts": opts_key, **fingerprint}
+        if ready_ms is not None:
+            entry["ready_ms"] = ready_ms
+        self.entries[self._key(pdf_path)] = entry
+
+    def forget(self, pdf_path: Path):
+        self.entries.pop(self._key(pdf_path), None)
+
+    def save(self):
+        self.out_root.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": RENDER_MANIFEST_VERSION, "pdfs": self.entries},
+                                  ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+def pdf_path_for(html: Path, data_root: Path, out_root: Path) -> Path:
+    return out_root / html.relative_to(data_root).parent / html.with_suffix(".pdf").name
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Espera adaptativa: en lugar de networkidle + espera fija, la página está lista cuando
+# todas sus <img> (y fondos CSS url(...)) están decodificadas y document.fonts.ready,
+# con un presupuesto máximo por página. Las imágenes rotas no bloquean (decode() falla).
+READY_MODES = ("adaptativa", "fija")
+READY_TIMEOUT_DEFAULT_MS = 10000
+# Documentos que renderiza una página del pool antes de cerrarla y abrir otra (0 = sin pool)
+PAGE_REUSE_DEFAULT = 50
+# Margen para emulate_media + page.pdf de una página A3 dentro del timeout por página
+PRINT_MARGIN_S = 10.0
+
+_READY_JS = r"""async (budget) => {
+  document.querySelectorAll('meta[http-equiv="refresh"]').forEach(m => m.remove());
+  const pending = [];
+  for (const img of Array.from(document.images)) {
+    if (img.loading === 'lazy') img.loading = 'eager';
+    pending.push(img.decode().catch(() => {}));
+  }
+  const fondos = new Set();
+  for (const el of [document.documentElement, ...document.querySelectorAll('body, body *')]) {
+    const bg = getComputedStyle(el).backgroundImage;
+    if (!bg || bg === 'none') continue;
+    for (const m of bg.matchAll(/url\(["']?([^"')]+)["']?\)/g)) {
+      if (fondos.has(m[1])) continue;
+      fondos.add(m[1]);
+      const im = new Image();
+      im.src = m[1];
+      pending.push(im.decode().catch(() => {}));
+    }
+  }
+  if (document.fonts) pending.push(document.fonts.ready.catch(() => {}));
+  let timer;
+  const ready = await Promise.race([
+    Promise.all(pending).then(() => true),
+    new Promise(r => { timer = setTimeout(() => r(false), budget); }),
+  ]);
+  clearTimeout(timer);
+  return {ready: ready, imgs: document.images.length + fondos.size};
+}"""
+
+def ready_budget_ms(args):
+    """Presupuesto de la espera adaptativa (ms), o None con --espera fija."""
+    if getattr(args, "espera", "adaptativa") == "fija":
+        return None
+    return getattr(args, "ready_timeout", READY_TIMEOUT_DEFAULT_MS)
+
+async def wait_until_ready(page, budget_ms: int) -> dict:
+    """
+    Espera a que la página esté lista (imágenes decodificadas + fuentes) o a que se agote
+    budget_ms. Devuelve {"ready": bool, "imgs": n, "ms": tiempo real de espera}.
+    """
+    t0 = time.perf_counter()
+    try:
+        info = await asyncio.wait_for(page.evaluate(_READY_JS, budget_ms), timeout=budget_ms / 1000 + 5.0)
+    except Exception as e:
+        info = {"ready": False, "imgs": 0, "error": str(e)[:80]}
+    info["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return info
+
+def ready_summary(ready_times: dict) -> str:
+    """Resumen de los tiempos de espera por página: {pdf: {"ready", "ms", ...}}."""
+    if not ready_times:
+        return ""
+    ms = sorted(v["ms"] for v in ready_times.values())
+    p = lambda q: ms[min(len(ms) - 1, int(q * len(ms)))]
+    agotadas = sum(1 for v in ready_times.values() if not v.get("ready"))
+    return (f"[READY] {len(ms)} páginas listas en media {sum(ms) / len(ms):.0f} ms "
+            f"(p50 {p(0.5):.0f} ms, p95 {p(0.95):.0f} ms, máx {ms[-1]:.0f} ms); "
+            f"{agotadas} agotaron el presupuesto")
+
 # Render rápido (sin reintentos)
-async def render_one_fast(page, url: str, pdf_path: Path, scale: float, prefer_css: bool, wait_ms: int):
+async def render_one_fast(page, url: str, pdf_path: Path, scale: float, prefer_css: bool, wait_ms: int,
+                          ready_ms: int = None):
     pdf_opts = {
         "path": str(pdf_path),
         "format": "A3",
@@ -138,6 +415,11 @@ async def render_one_fast(page, url: str, pdf_path: Path, scale: float, prefer_c
         "prefer_css_page_size": prefer_css,
     }
     await asyncio.wait_for(page.goto(url, wait_until="domcontentloaded"), timeout=5.0)
+    if ready_ms is not None:
+        await page.emulate_media(media="print")
+        info = await wait_until_ready(page, ready_ms)
+        await page.pdf(**pdf_opts)
+        return info
     with contextlib.suppress(Exception):
         await page.evaluate("""() => { document.querySelectorAll('meta[http-equiv="refresh"]').forEach(m=>m.remove()); }""")
     with contextlib.suppress(Exception):
@@ -147,7 +429,9 @@ async def render_one_fast(page, url: str, pdf_path: Path, scale: float, prefer_c
     await page.pdf(**pdf_opts)
 
 # Render robusto (con reintentos)
-async def render_one(page, url: str, pdf_path: Path, scale: float, prefer_css: bool, wait_ms: int, retry_mode: bool = False):
+async def render_one(page, url: str, pdf_path: Path, scale: float, prefer_css: bool, wait_ms: int, retry_mode: bool = False,
+                     ready_ms: int = None):
+    """Con ready_ms (espera adaptativa) devuelve la info de wait_until_ready del intento que imprimió el PDF."""
     pdf_opts = {
         "path": str(pdf_path),
         "format": "A3",
@@ -166,6 +450,11 @@ async def render_one(page, url: str, pdf_path: Path, scale: float, prefer_css: b
         # Intento 1 (moderado)
         await asyncio.wait_for(page.goto(url, wait_until="domcontentloaded"),
                                timeout=(10.0 if retry_mode else 15.0))
+        if ready_ms is not None:
+            await page.emulate_media(media="print")
+            info = await wait_until_ready(page, ready_ms)
+            await page.pdf(**pdf_opts)
+            return info
         with contextlib.suppress(Exception):
             await page.evaluate("""() => { document.querySelectorAll('meta[http-equiv="refresh"]').forEach(m=>m.remove()); }""")
         with contextlib.suppress(Exception):
@@ -197,16 +486,22 @@ async def render_one(page, url: str, pdf_path: Path, scale: float, prefer_css: b
                 raise RuntimeError("Page closed before retry")
 
             await asyncio.wait_for(page.goto(url, wait_until="domcontentloaded"), timeout=10.0)
-            with contextlib.suppress(Exception):
-                await page.evaluate("""() => { document.querySelectorAll('meta[http-equiv="refresh"]').forEach(m=>m.remove()); }""")
-            with contextlib.suppress(Exception):
-                await page.wait_for_load_state("networkidle", timeout=3000)
+            info = None
+            if ready_ms is not None:
+                # Segundo intento: el doble de presupuesto
+                await page.emulate_media(media="print")
+                info = await wait_until_ready(page, 2 * ready_ms)
+            else:
+                with contextlib.suppress(Exception):
+                    await page.evaluate("""() => { document.querySelectorAll('meta[http-equiv="refresh"]').forEach(m=>m.remove()); }""")
+                with contextlib.suppress(Exception):
+                    await page.wait_for_load_state("networkidle", timeout=3000)
 
-            await page.wait_for_timeout(max(wait_ms, 1500))
-            await page.emulate_media(media="print")
+                await page.wait_for_timeout(max(wait_ms, 1500))
+                await page.emulate_media(media="print")
             await page.pdf(**pdf_opts)
             print(f"[RECOVER] {name} recuperado en intento 2")
-            return
+            return info
 
         except (asyncio.TimeoutError, Exception) as e2:
             msg2 = str(e2)
@@ -263,8 +558,7 @@ async def merge_pdfs_parallel_by_center(rendered_list, out_root: Path, args):
             merged_count = 0
             for section, paths in center_buckets.items():
                 paths = sorted(paths)
-                name = f"_{SECCIONES.get(section, section).upper()}__MERGED.pdf"
-                out_merge = out_root / centro / name
+                out_merge = out_root / centro / merged_name(section)
                 try:
                     merge_pdfs(paths, out_merge)
                     merged_count += 1
@@ -298,39 +592,196 @@ async def merge_pdfs_parallel_by_center(rendered_list, out_root: Path, args):
     return set(successful_centros)
 
 # ──────────────────────────────────────────────────────────────────────────────
-# Normalización de imágenes: file:///C:/…  → assets/<archivo>
-def fix_html_assets(html_path: Path):
+# Normalización de imágenes: file:///C:/…  → assets/<sha1><ext>
+# Almacén por contenido: una sola copia de cada foto (por sha1) en <root>/_assets/ y, en la
+# carpeta assets/ de cada sección, un enlace a esa copia. Así la misma foto usada en varios
+# centros o secciones se copia una vez, y los nombres nunca colisionan entre fotos distintas.
+ASSET_STORE_DIR = "_assets"
+ASSET_MODES = ("copia", "enlace", "simbolico")
+
+class AssetStore:
+    """
+    modo: 'enlace' (hard link), 'simbolico' (symlink) o 'copia' para dejar cada objeto en
+    assets/; si no se puede enlazar (otro disco, permisos) se copia. El sha1 de cada foto de
+    origen se guarda en _assets/index.json junto a su (tamaño, mtime) para no recalcularlo.
+    """
+
+    def __init__(self, root: Path, modo: str = "enlace"):
+        if modo not in ASSET_MODES:
+            raise ValueError(f"modo debe ser uno de {ASSET_MODES}: {modo!r}")
+        self.dir = Path(root) / ASSET_STORE_DIR
+        self.modo = modo
+        self._index_path = self.dir / "index.json"
+        try:
+            self._digests = json.loads(self._index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self._digests = {}
+        self._dirty = False
+        self.stats = {"refs": 0, "objetos": 0, "bytes_copiados": 0, "enlaces": 0, "copias": 0}
+
+    def digest(self, src: Path, st) -> str:
+        cached = self._digests.get(str(src))
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        h = hashlib.sha1()
+        with open(src, "rb") as f:
+            for bloque in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloque)
+        self._digests[str(src)] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+        self._dirty = True
+        return h.hexdigest()
+
+    def objeto(self, src: Path) -> Path:
+        """Copia única de la foto en el almacén (la crea la primera vez que aparece su contenido)."""
+        st = src.stat()
+        d = self.digest(src, st)
+        obj = self.dir / d[:2] / f"{d}{src.suffix.lower()}"
+        if not obj.exists():
+            obj.parent.mkdir(parents=True, exist_ok=True)
+            tmp = obj.with_name(obj.name + ".tmp")
+            shutil.copy2(src, tmp)
+            os.replace(tmp, obj)
+            self.stats["objetos"] += 1
+            self.stats["bytes_copiados"] += st.st_size
+        return obj
+
+    def colocar(self, src: Path, assets_dir: Path) -> str:
+        """Deja la foto en assets_dir como enlace a su objeto y devuelve el nombre a referenciar."""
+        obj = self.objeto(src)
+        dst = assets_dir / obj.name
+        self.stats["refs"] += 1
+        # Mismo nombre = mismo contenido: lo que ya está en assets/ vale tal cual
+        if not dst.exists():
+            assets_dir.mkdir(exist_ok=True)
+            if dst.is_symlink():
+                dst.unlink()
+            self._enlazar(obj, dst)
+        return obj.name
+
+    def _enlazar(self, obj: Path, dst: Path):
+        if self.modo == "enlace":
+            try:
+                os.link(obj, dst)
+                self.stats["enlaces"] += 1
+                return
+            except OSError:
+                pass
+        elif self.modo == "simbolico":
+            try:
+                os.symlink(obj.resolve(), dst)
+                self.stats["enlaces"] += 1
+                return
+            except OSError:
+                pass
+        shutil.copy2(obj, dst)
+        self.stats["copias"] += 1
+        self.stats["bytes_copiados"] += obj.stat().st_size
+
+    def save_index(self):
+        if not self._dirty:
+            return
+        try:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            tmp = self._index_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._digests, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self._index_path)
+            self._dirty = False
+        except OSError as e:
+            print(f"[WARN] No se pudo guardar {self._index_path}: {e}")
+
+    def summary(self, desde: dict = None) -> str:
+        """Resumen de los contadores (o de lo acumulado desde la instantánea 'desde')."""
+        st = {k: v - (desde or {}).get(k, 0) for k, v in self.stats.items()}
+        return (f"[ASSETS] {st['refs']} imágenes en {st['objetos']} objetos nuevos "
+                f"({st['bytes_copiados'] / 1e6:.1f} MB copiados), {st['enlaces']} enlaces, {st['copias']} copias")
+
+_ASSET_STORES = {}
+
+def asset_store(root: Path, modo: str = "enlace") -> AssetStore:
+    """AssetStore compartido durante la ejecución para cada (root, modo)."""
+    key = (Path(root).resolve(), modo)
+    if key not in _ASSET_STORES:
+        _ASSET_STORES[key] = AssetStore(key[0], modo)
+    return _ASSET_STORES[key]
+
+def fix_html_assets(html_path: Path, manifests: dict = None, store: AssetStore = None) -> bool:
+    """
+    Reescribe las imágenes file:/// del HTML a assets/ en una sola pasada por líneas (solo se
+    escribe si algo cambia). Si el HTML tenía entrada vigente en 'manifests' (ver
+    load_html_manifests) se usa para saltarlo sin leerlo cuando no tiene file:///, y se
+    actualiza tras reescribirlo; en ese caso devuelve True.
+    """
     try:
-        txt = html_path.read_text(encoding="utf-8", errors="ignore")
-    except Exception:
-        return
-    changed = False
+        entry = html_manifest_entry(manifests, html_path) if manifests else None
+    except OSError:
+        return False
+    if entry is not None and not any(src.lower().startswith("file:///") for src in entry.get("imgs", [])):
+        return False
+    store = store or asset_store(html_path.parent)
     assets_dir = html_path.parent / "assets"
 
     def repl_img(m):
-        nonlocal changed
         url = m.group(1)
-        if isinstance(url, str) and url.lower().startswith("file:///"):
+        if url.lower().startswith("file:///"):
             src_path = Path(unquote(url[8:]))
-            if src_path.exists():
-                assets_dir.mkdir(exist_ok=True)
-                dst = assets_dir / src_path.name
-                if not dst.exists():
-                    shutil.copy2(src_path, dst)
-                changed = True
-                return f'src="assets/{dst.name}"'
+            if src_path.is_file():
+                return f'src="assets/{store.colocar(src_path, assets_dir)}"'
         return m.group(0)
 
-    txt2 = re.sub(r'src=["\']([^"\']+)["\']', repl_img, txt, flags=re.IGNORECASE)
-    if txt2 != txt:
-        html_path.write_text(txt2, encoding="utf-8")
-
-def fix_all_htmls(root: Path):
+    tmp = html_path.with_name(html_path.name + ".tmp")
+    previas, fout, srcs = [], None, []
+    try:
+        with open(html_path, "r", encoding="utf-8", errors="ignore", newline="") as fin:
+            for linea in fin:
+                nueva = _RE_SRC.sub(repl_img, linea) if "src=" in linea.lower() else linea
+                srcs.extend(_RE_SRC.findall(nueva))
+                if fout is None and nueva != linea:
+                    # Primer cambio: a partir de aquí se escribe directamente al temporal
+                    fout = open(tmp, "w", encoding="utf-8", newline="")
+                    fout.writelines(previas)
+                    previas = None
+                if fout is None:
+                    previas.append(linea)
+                else:
+                    fout.write(nueva)
+    except Exception:
+        if fout is not None:
+            fout.close()
+            tmp.unlink(missing_ok=True)
+        raise
+    if fout is None:
+        return False
+    fout.close()
+    os.replace(tmp, html_path)
+    if entry is not None:
+        st = html_path.stat()
+        entry.update(size=st.st_size, mtime_ns=st.st_mtime_ns, imgs=srcs)
+        return True
+    return False
+
+def fix_all_htmls(root: Path, store_root: Path = None, modo: str = "enlace"):
+    """
+    Normaliza las imágenes de todos los HTML bajo root. Los objetos del almacén van en
+    store_root (por defecto root), que debe quedar dentro de la carpeta servida por HTTP.
+    """
+    manifests = load_html_manifests(root)
+    store = asset_store(store_root or root, modo)
+    antes = dict(store.stats)
+    actualizados = set()
     for p in root.rglob("*.html"):
         try:
-            fix_html_assets(p)
+            if fix_html_assets(p, manifests, store):
+                actualizados.add(p.parent.parent)
         except Exception as e:
             print(f"[SKIP] {p}: {e}")
+    for centro_dir in actualizados:
+        try:
+            save_html_manifest(centro_dir, manifests[centro_dir])
+        except OSError as e:
+            print(f"[WARN] No se pudo actualizar {centro_dir / HTML_MANIFEST_NAME}: {e}")
+    store.save_index()
+    if store.stats["refs"] > antes["refs"]:
+        print(store.summary(antes))
 # ──────────────────────────────────────────────────────────────────────────────
 
 async def main_async(args):
@@ -358,10 +809,11 @@ async def main_async(args):
     out_root = Path(args.out).resolve() if args.out else out_root_for(data_root)
 
     # Normaliza rutas file:/// de imágenes a assets/
-    fix_all_htmls(data_root)
+    fix_all_htmls(data_root, modo=args.assets)
     out_root.mkdir(parents=True, exist_ok=True)
 
-    print(f"[CONFIG] Concurrencia: {args.concurrency}, Workers merge: {args.merge_workers}, Espera: {args.wait}ms")
+    espera = f"{args.wait}ms" if ready_budget_ms(args) is None else f"adaptativa (máx {args.ready_timeout}ms)"
+    print(f"[CONFIG] Concurrencia: {args.concurrency} x {args.shards} navegador(es), Workers merge: {args.merge_workers}, Espera: {espera}")
     if args.block:
         print(f"[CONFIG] Recursos bloqueados: {args.block}")
 
@@ -369,187 +821,520 @@ async def main_async(args):
     htmls = find_htmls(data_root, fast_mode=fast_mode)
     if not htmls:
         print("[INFO] No se encontraron .html en", data_root)
-        return set()
+        return set(), None
 
     rendered = await render_htmls_to_pdfs(htmls, data_root, out_root, args, base_url=base_url)
 
     if args.no_merge:
         print("[OK] Conversión terminada. Sin merges por sección.")
-        return {c for c, _, _ in rendered}
+        return {c for c, _, _ in rendered}, None
 
-    print(f"[INFO] Iniciando merges paralelos con {args.merge_workers} workers…")
-    centros = await merge_pdfs_parallel_by_center(rendered, out_root, args)
+    if args.section_merges:
+        print(f"[INFO] Iniciando merges paralelos con {args.merge_workers} workers…")
+        centros = await merge_pdfs_parallel_by_center(rendered, out_root, args)
+    else:
+        # El anejo final se compone directamente desde las páginas (sin _X__MERGED.pdf)
+        centros = {c for c, _, _ in rendered}
 
     if httpd:
         httpd.shutdown()
-    return centros
+    return centros, rendered
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Navegador y render de una página (comunes a la ronda en proceso y a los shards)
+async def _launch_browser(pw, args, block_types):
+    """Lanza Chromium con los flags de render y devuelve (browser, context) con el bloqueo de recursos."""
+    chromium_args = [
+        "--no-sandbox",
+        "--disable-setuid-sandbox",
+        "--disable-dev-shm-usage",
+        "--disable-accelerated-2d-canvas",
+        "--no-first-run",
+        "--no-zygote",
+        "--disable-gpu",
+        "--disable-features=CalculateNativeWinOcclusion",
+        "--disable-background-networking",
+        "--disable-background-timer-throttling",
+        "--disable-backgrounding-occluded-windows",
+        "--disable-breakpad",
+        "--disable-client-side-phishing-detection",
+        "--disable-component-update",
+        "--disable-default-apps",
+        "--disable-domain-reliability",
+        "--disable-extensions",
+        "--disable-features=TranslateUI",
+        "--disable-hang-monitor",
+        "--disable-ipc-flooding-protection",
+        "--disable-popup-blocking",
+        "--disable-prompt-on-repost",
+        "--disable-renderer-backgrounding",
+        "--disable-sync",
+        "--disable-translate",
+        "--disable-windows10-custom-titlebar",
+        "--metrics-recording-only",
+        "--no-default-browser-check",
+        "--no-pings",
+        "--password-store=basic",
+        "--use-mock-keychain",
+        "--js-flags=--max-old-space-size=4096",
+    ]
+    chromium_args.extend(args.chromium-args or []) if hasattr(args, 'chromium-arg') else chromium_args.extend(args.chromium_arg or [])
+
+    browser = await pw.chromium.launch(headless=True, args=chromium_args)
+    context = await browser.new_context()
+
+    if block_types:
+        async def route_handler(route):
+            r = route.request
+            urlp = r.url.lower()
+            # No bloquear imágenes de secciones fotográficas
+            if r.resource_type == "image" and any(seg in urlp for seg in ["/clima/", "/cc/", "/acom"]):
+                await route.continue_()
+                return
+            if r.resource_type in block_types:
+                await route.abort()
+            else:
+                await route.continue_()
+        await context.route("**/*", route_handler)
+    return browser, context
+
+def _page_url(html: Path, data_root: Path, base_url) -> str:
+    # URL preferente por HTTP
+    rel_http = html.relative_to(data_root).as_posix()
+    return f"{base_url}/{rel_http}" if base_url else to_file_uri(html)
+
+def _page_timeout(args, retry_attempt: int) -> float:
+    """
+    Timeout total de una página: el fijo de cada modo, ampliado cuando los timeouts internos
+    de render_one_fast / render_one (goto + espera + impresión de cada intento) suman más.
+    Así una página lenta pero dentro de su presupuesto de espera no se corta a medio imprimir.
+    """
+    ready_ms = ready_budget_ms(args)
+    wait_s = (getattr(args, 'wait', 0) or 0) / 1000
+    if getattr(args, 'ultra_fast', False) or getattr(args, 'fast', False):
+        base = 15.0 if getattr(args, 'ultra_fast', False) else 30.0
+        espera = ready_ms / 1000 + 5.0 if ready_ms is not None else 3.0 + wait_s
+        return max(base, 5.0 + espera + PRINT_MARGIN_S)
+    base = 180.0 if retry_attempt > 0 else 120.0
+    if ready_ms is not None:
+        espera1, espera2 = ready_ms / 1000 + 5.0, 2 * ready_ms / 1000 + 5.0
+    else:
+        espera1, espera2 = 6.0 + min(wait_s, 0.8), 3.0 + max(wait_s, 1.5)
+    # tres intentos: goto 15s (10s en reintento) / 10s / 6s, cada uno con su impresión
+    peor = (10.0 if retry_attempt > 0 else 15.0) + espera1 + 10.0 + espera2 + 6.0 + 3 * PRINT_MARGIN_S
+    return max(base, peor)
+
+async def _render_page(page, url: str, pdf_path: Path, args, ready_ms, retry_attempt: int = 0):
+    """Renderiza una página con el modo elegido (ultra-rápido / rápido / robusto) y su timeout."""
+    if getattr(args, 'ultra_fast', False) or getattr(args, 'fast', False):
+        coro = render_one_fast(page, url, pdf_path, scale=args.scale,
+                               prefer_css=not args.ignore_css_page, wait_ms=args.wait,
+                               ready_ms=ready_ms)
+    else:
+        coro = render_one(page, url, pdf_path, scale=args.scale,
+                          prefer_css=not args.ignore_css_page, wait_ms=args.wait,
+                          retry_mode=(retry_attempt > 0), ready_ms=ready_ms)
+    return await asyncio.wait_for(coro, timeout=_page_timeout(args, retry_attempt))
+
+def _failure_detail(html: Path, e: Exception, timeout_duration: float = None) -> dict:
+    if timeout_duration is not None:
+        return {
+            'file': str(html),
+            'error_type': 'TimeoutError',
+            'error_msg': f'Timeout after {timeout_duration}s',
+            'is_corrupted': False,
+            'is_detached': False,
+            'is_timeout': True
+        }
+    return {
+        'file': str(html),
+        'error_type': type(e).__name__,
+        'error_msg': str(e)[:200],
+        'is_corrupted': "net::ERR_ABORTED" in str(e),
+        'is_detached': "frame was detached" in str(e)
+    }
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Pool de páginas reutilizables: en lugar de abrir, preparar y cerrar una página por HTML, cada
+# página libre se navega al siguiente documento. El bloqueo de recursos va en el context, así
+# que las páginas del pool ya nacen con sus rutas instaladas. Tras max_usos documentos (o tras
+# cualquier fallo) la página se cierra y se abre otra, para acotar la memoria del renderer.
+class PoolPaginas:
+    def __init__(self, context, max_usos: int = PAGE_REUSE_DEFAULT):
+        self.context = context
+        self.max_usos = max(0, max_usos or 0)
+        self._libres = []  # [(page, usos)]
+        self.creadas = 0
+        self.reutilizadas = 0
+        self.recicladas = 0
+
+    async def _nueva(self):
+        page = await self.context.new_page()
+        self.creadas += 1
+        return page
+
+    async def precalentar(self, n: int):
+        """Abre de antemano hasta n páginas (sin efecto con el pool desactivado)."""
+        if self.max_usos <= 0:
+            return
+        faltan = max(0, n - len(self._libres))
+        for page in await asyncio.gather(*(self._nueva() for _ in range(faltan))):
+            self._libres.append((page, 0))
+
+    @contextlib.asynccontextmanager
+    async def pagina(self):
+        page, usos = None, 0
+        while self._libres and page is None:
+            page, usos = self._libres.pop()
+            if page.is_closed():
+                page = None
+        if page is None:
+            page, usos = await self._nueva(), 0
+        elif usos:
+            self.reutilizadas += 1
+        ok = False
+        try:
+            yield page
+            ok = True
+        finally:
+            usos += 1
+            if ok and usos < self.max_usos and not page.is_closed():
+                try:
+                    # Quitar la emulación de impresión que dejó el documento anterior
+                    await page.emulate_media(media="null")
+                    self._libres.append((page, usos))
+                    page = None
+                except Exception:
+                    pass
+            if page is not None:
+                if ok and self.max_usos > 0:
+                    self.recicladas += 1
+                with contextlib.suppress(Exception):
+                    await page.close()
+
+    async def cerrar(self):
+        while self._libres:
+            page, _ = self._libres.pop()
+            with contextlib.suppress(Exception):
+                await page.close()
+
+    def stats(self) -> str:
+        if self.max_usos <= 0:
+            return f"[POOL] Desactivado: {self.creadas} páginas abiertas (una por documento)"
+        return (f"[POOL] {self.creadas} páginas abiertas, {self.reutilizadas} reutilizaciones, "
+                f"{self.recicladas} recicladas tras {self.max_usos} usos")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Navegador que sobrevive a varias llamadas a render_htmls_to_pdfs (p. ej. un centro por
+# llamada en el pipeline en proceso). Se abre en la primera llamada y se relanza si Chromium
+# se ha caído; todas las llamadas deben hacerse desde el mismo event loop.
+class NavegadorPersistente:
+    def __init__(self, args):
+        self.args = args
+        self.block_types = set(t.strip().lower() for t in args.block.split(",") if t.strip())
+        self._pw = None
+        self.browser = None
+        self.context = None
+        self.pool = None
+        self.lanzamientos = 0
+
+    async def abrir(self) -> PoolPaginas:
+        if self.pool is not None and self.browser.is_connected():
+            return self.pool
+        if self.pool is not None:
+            print("[WARN] Chromium desconectado, se relanza el navegador")
+            await self.cerrar()
+        self._pw = await async_playwright().start()
+        try:
+            self.browser, self.context = await _launch_browser(self._pw, self.args, self.block_types)
+        except Exception:
+            await self._pw.stop()
+            self._pw = None
+            raise
+        self.pool = PoolPaginas(self.context, getattr(self.args, "page_reuse", PAGE_REUSE_DEFAULT))
+        self.lanzamientos += 1
+        return self.pool
+
+    async def cerrar(self):
+        if self.pool is not None:
+            await self.pool.cerrar()
+        for cierre in (self.context, self.browser):
+            if cierre is not None:
+                with contextlib.suppress(Exception):
+                    await cierre.close()
+        if self._pw is not None:
+            with contextlib.suppress(Exception):
+                await self._pw.stop()
+        self._pw = self.browser = self.context = self.pool = None
+
+@contextlib.asynccontextmanager
+async def _pool_de_render(args, block_types, navegador=None):
+    """Pool de páginas de un navegador propio (cerrado al salir) o del navegador persistente."""
+    if navegador is not None:
+        yield await navegador.abrir()
+        return
+    async with async_playwright() as pw:
+        browser, context = await _launch_browser(pw, args, block_types)
+        pool = PoolPaginas(context, getattr(args, "page_reuse", PAGE_REUSE_DEFAULT))
+        try:
+            yield pool
+        finally:
+            await asyncio.sleep(1.0)
+            await pool.cerrar()
+            await context.close()
+            await browser.close()
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Render repartido en N procesos (un Chromium por proceso). Los HTML se reparten con una
+# cola compartida: cada shard toma el siguiente en cuanto tiene una página libre (work
+# stealing), así un shard con páginas lentas no retrasa al resto. Si un proceso muere, sus
+# páginas sin resultado vuelven a la ronda de reintentos diferidos del proceso principal.
+def _shard_main(shard: int, args, data_root: Path, out_root: Path, base_url, tareas, resultados):
+    asyncio.run(_shard_async(shard, args, data_root, out_root, base_url, tareas, resultados))
+
+async def _shard_async(shard, args, data_root, out_root, base_url, tareas, resultados):
+    block_types = set(t.strip().lower() for t in args.block.split(",") if t.strip())
+    ready_ms = ready_budget_ms(args)
+    loop = asyncio.get_running_loop()
+    async with async_playwright() as pw:
+        browser, context = await _launch_browser(pw, args, block_types)
+        pool = PoolPaginas(context, getattr(args, "page_reuse", PAGE_REUSE_DEFAULT))
+        await pool.precalentar(max(1, args.concurrency))
+
+        async def bucle():
+            while True:
+                item = await loop.run_in_executor(None, tareas.get)
+                if item is None:
+                    return
+                i, total, html = item
+                html = Path(html)
+                pdf_path = pdf_path_for(html, data_root, out_root)
+                pdf_path.parent.mkdir(parents=True, exist_ok=True)
+                # Si el navegador del shard ha muerto, abrir página falla y el shard termina: el
+                # resto de la cola lo toman los demás y lo que tenía en curso vuelve a reintentarse
+                page = None
+                try:
+                    async with pool.pagina() as page:
+                        print(f"[S{shard}] [{i}/{total}] → {pdf_path}")
+                        info = await _render_page(page, _page_url(html, data_root, base_url), pdf_path, args, ready_ms)
+                    resultados.put(("ok", i, str(html), info))
+                except asyncio.TimeoutError as e:
+                    timeout_duration = _page_timeout(args, 0)
+                    print(f"[TIMEOUT] {html.name} se colgó (>{timeout_duration}s)")
+                    resultados.put(("fail", i, str(html), _failure_detail(html, e, timeout_duration)))
+                except Exception as e:
+                    if page is None:
+                        raise
+                    print(f"[WARN] Falló {html}: {e}, se reintentará al final")
+                    resultados.put(("fail", i, str(html), _failure_detail(html, e)))
+                finally:
+                    sys.stdout.flush()
+
+        await asyncio.gather(*(bucle() for _ in range(max(1, args.concurrency))))
+        print(f"[S{shard}] {pool.stats()}")
+        await pool.cerrar()
+        await context.close()
+        await browser.close()
+
+def _render_sharded(htmls, data_root, out_root, args, base_url, shards: int, on_result=None,
+                    shard_target=None):
+    """
+    Primera ronda repartida en 'shards' procesos. Devuelve (ok, fallos):
+      ok     = [(i, html, info)]
+      fallos = [(i, html, detail)]   (incluye las páginas de un shard caído)
+    on_result(kind, i, html, payload) se llama en el proceso principal con cada resultado.
+    """
+    mp = multiprocessing.get_context("spawn")
+    # SimpleQueue escribe en el pipe al hacer put (sin hilo alimentador): si un shard muere,
+    # los resultados que ya envió no se pierden
+    tareas, resultados = mp.Queue(), mp.SimpleQueue()
+    total = len(htmls)
+    for i, html in enumerate(htmls, 1):
+        tareas.put((i, total, str(html)))
+    for _ in range(shards * max(1, args.concurrency)):
+        tareas.put(None)
+
+    procs = [mp.Process(target=shard_target or _shard_main, name=f"html2pdf-shard-{n}",
+                        args=(n, args, data_root, out_root, base_url, tareas, resultados))
+             for n in range(1, shards + 1)]
+    for proc in procs:
+        proc.start()
+
+    por_indice = {i: html for i, html in enumerate(htmls, 1)}
+    ok, fallos = [], []
+    while por_indice:
+        if resultados.empty():
+            if not any(proc.is_alive() for proc in procs) and resultados.empty():
+                break
+            time.sleep(0.05)
+            continue
+        kind, i, _, payload = resultados.get()
+        html = por_indice.pop(i, None)
+        if html is None:
+            continue
+        (ok if kind == "ok" else fallos).append((i, html, payload))
+        if on_result:
+            on_result(kind, i, html, payload)
+
+    for i, html in sorted(por_indice.items()):
+        print(f"[SHARDS] {html.name} sin resultado (proceso de render caído), se reintentará al final")
+        fallos.append((i, html, {
+            'file': str(html),
+            'error_type': 'ShardCrash',
+            'error_msg': 'El proceso de render terminó sin devolver resultado',
+            'is_corrupted': False,
+            'is_detached': False
+        }))
+    for proc in procs:
+        proc.join(timeout=10)
+        if proc.is_alive():
+            proc.terminate()
+    return ok, fallos
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Render concurrente + reintentos diferidos
-async def render_htmls_to_pdfs(htmls, data_root, out_root, args, base_url=None):
+async def render_htmls_to_pdfs(htmls, data_root, out_root, args, base_url=None, navegador=None):
+    """navegador: NavegadorPersistente reutilizado entre llamadas (si no, se lanza y cierra uno aquí)."""
     rendered = []
     failed_htmls = []
     final_failures = []
-    total = len(htmls)
     done_counter = 0
     lock = asyncio.Lock()
     sem = asyncio.Semaphore(args.concurrency)
 
     block_types = set(t.strip().lower() for t in args.block.split(",") if t.strip())
+    ready_ms = ready_budget_ms(args)
+    ready_times = {}  # pdf -> {"ready", "imgs", "ms"} (espera adaptativa)
+
+    # Saltar los HTML cuyo PDF ya está al día según el manifiesto
+    manifest = RenderManifest(out_root)
+    opts_key = render_options_key(args, block_types)
+    fingerprints = {}
+    dirty = []
+    for html in htmls:
+        pdf_path = pdf_path_for(html, data_root, out_root)
+        try:
+            fp = html_fingerprint(html)
+        except OSError:
+            fp = None
+        if fp is not None and not getattr(args, "force_render", False) and manifest.is_fresh(pdf_path, fp, opts_key):
+            rendered.append((center_from_path(html, data_root), section_from_path(html, data_root), pdf_path))
+            continue
+        fingerprints[html] = fp
+        dirty.append(html)
+    if len(dirty) < len(htmls):
+        print(f"[CACHE] {len(htmls) - len(dirty)} PDFs sin cambios (se omiten), {len(dirty)} por renderizar")
+    htmls = dirty
+    total = len(htmls)
+    if not htmls:
+        rendered.sort(key=lambda tup: str(tup[2]))
+        return rendered
+
+    def _record_ok(html, pdf_path, info):
+        if info:
+            ready_times[pdf_path] = info
+        if fingerprints.get(html) is not None:
+            manifest.record(pdf_path, fingerprints[html], opts_key,
+                            ready_ms=info["ms"] if info else None)
+
+    # Primera ronda en N procesos (un navegador por shard); los fallos siguen a la ronda
+    # de reintentos diferidos de abajo, en este proceso
+    shards = max(1, min(getattr(args, "shards", 1) or 1, total))
+    if shards > 1:
+        for html in htmls:
+            manifest.forget(pdf_path_for(html, data_root, out_root))
+        print(f"[INFO] Iniciando conversión de {total} archivos HTML en {shards} navegadores…")
+
+        def on_result(kind, i, html, payload):
+            nonlocal done_counter
+            if kind != "ok":
+                return
+            done_counter += 1
+            pdf_path = pdf_path_for(html, data_root, out_root)
+            _record_ok(html, pdf_path, payload)
+            rendered.append((center_from_path(html, data_root), section_from_path(html, data_root), pdf_path))
+            if (done_counter % args.log_every) == 0 or done_counter == total:
+                print(f"[PROGRESO] {done_counter}/{total} completados")
+
+        ok, fallos = await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(_render_sharded, htmls, data_root, out_root, args, base_url, shards,
+                                    on_result=on_result))
+        failed_htmls.extend(fallos)
+        print(f"[INFO] Primera ronda completada: {len(ok) + len(fallos)}/{total} tareas")
+        if not failed_htmls:
+            print(f"[SUCCESS] Todas las conversiones completadas en primera ronda")
+            if ready_times:
+                print(ready_summary(ready_times))
+            try:
+                manifest.save()
+            except Exception as e:
+                print(f"[WARN] No se pudo guardar el manifiesto de render: {e}")
+            rendered.sort(key=lambda tup: str(tup[2]))
+            return rendered
 
-    async with async_playwright() as pw:
-        chromium_args = [
-            "--no-sandbox",
-            "--disable-setuid-sandbox",
-            "--disable-dev-shm-usage",
-            "--disable-accelerated-2d-canvas",
-            "--no-first-run",
-            "--no-zygote",
-            "--disable-gpu",
-            "--disable-features=CalculateNativeWinOcclusion",
-            "--disable-background-networking",
-            "--disable-background-timer-throttling",
-            "--disable-backgrounding-occluded-windows",
-            "--disable-breakpad",
-            "--disable-client-side-phishing-detection",
-            "--disable-component-update",
-            "--disable-default-apps",
-            "--disable-domain-reliability",
-            "--disable-extensions",
-            "--disable-features=TranslateUI",
-            "--disable-hang-monitor",
-            "--disable-ipc-flooding-protection",
-            "--disable-popup-blocking",
-            "--disable-prompt-on-repost",
-            "--disable-renderer-backgrounding",
-            "--disable-sync",
-            "--disable-translate",
-            "--disable-windows10-custom-titlebar",
-            "--metrics-recording-only",
-            "--no-default-browser-check",
-            "--no-pings",
-            "--password-store=basic",
-            "--use-mock-keychain",
-            "--js-flags=--max-old-space-size=4096",
-        ]
-        chromium_args.extend(args.chromium-args or []) if hasattr(args, 'chromium-arg') else chromium_args.extend(args.chromium_arg or [])
-
-        browser = await pw.chromium.launch(headless=True, args=chromium_args)
-        context = await browser.new_context()
-
-        if block_types:
-            async def route_handler(route):
-                r = route.request
-                urlp = r.url.lower()
-                # No bloquear imágenes de secciones fotográficas
-                if r.resource_type == "image" and any(seg in urlp for seg in ["/clima/", "/cc/", "/acom"]):
-                    await route.continue_()
-                    return
-                if r.resource_type in block_types:
-                    await route.abort()
-                else:
-                    await route.continue_()
-            await context.route("**/*", route_handler)
+    async with _pool_de_render(args, block_types, navegador) as pool:
+        await pool.precalentar(min(args.concurrency, total if shards == 1 else len(failed_htmls)))
 
         async def worker(i, html, retry_attempt=0):
             nonlocal done_counter
-            rel = html.relative_to(data_root)
             section = section_from_path(html, data_root)
             centro = center_from_path(html, data_root)
 
-            dst_dir = out_root / rel.parent
-            dst_dir.mkdir(parents=True, exist_ok=True)
-            pdf_name = html.with_suffix(".pdf").name
-            pdf_path = dst_dir / pdf_name
-
-            # URL preferente por HTTP
-            rel_http = html.relative_to(data_root).as_posix()
-            url = f"{base_url}/{rel_http}" if base_url else to_file_uri(html)
+            pdf_path = pdf_path_for(html, data_root, out_root)
+            pdf_path.parent.mkdir(parents=True, exist_ok=True)
+            manifest.forget(pdf_path)
+            url = _page_url(html, data_root, base_url)
 
             async with sem:
-                page = await context.new_page()
                 try:
                     retry_info = f" [RETRY {retry_attempt}]" if retry_attempt > 0 else ""
                     print(f"[{i}/{total}]{retry_info} → {pdf_path}")
 
-                    if hasattr(args, 'ultra_fast') and args.ultra_fast:
-                        await asyncio.wait_for(
-                            render_one_fast(page, url, pdf_path, scale=args.scale,
-                                            prefer_css=not args.ignore_css_page, wait_ms=args.wait),
-                            timeout=15.0
-                        )
-                    elif hasattr(args, 'fast') and args.fast:
-                        await asyncio.wait_for(
-                            render_one_fast(page, url, pdf_path, scale=args.scale,
-                                            prefer_css=not args.ignore_css_page, wait_ms=args.wait),
-                            timeout=30.0
-                        )
-                    else:
-                        timeout_duration = 180.0 if retry_attempt > 0 else 120.0
-                        await asyncio.wait_for(
-                            render_one(page, url, pdf_path, scale=args.scale,
-                                       prefer_css=not args.ignore_css_page, wait_ms=args.wait,
-                                       retry_mode=(retry_attempt > 0)),
-                            timeout=timeout_duration
-                        )
+                    async with pool.pagina() as page:
+                        info = await _render_page(page, url, pdf_path, args, ready_ms, retry_attempt)
 
                     async with lock:
                         done_counter += 1
+                        _record_ok(html, pdf_path, info)
                         if retry_attempt > 0:
                             print(f"[RECUPERADO] {html.name} exitoso en reintento {retry_attempt}")
                         if (done_counter % args.log_every) == 0 or done_counter == total:
                             print(f"[PROGRESO] {done_counter}/{total} completados")
                     return (centro, section, pdf_path)
 
-                except asyncio.TimeoutError:
+                except asyncio.TimeoutError as e:
                     async with lock:
-                        timeout_duration = 180.0 if retry_attempt > 0 else 120.0
+                        timeout_duration = _page_timeout(args, retry_attempt)
                         print(f"[TIMEOUT] {html.name} se colgó (>{timeout_duration}s)")
-                        failed_htmls.append((i, html, {
-                            'file': str(html),
-                            'error_type': 'TimeoutError',
-                            'error_msg': f'Timeout after {timeout_duration}s',
-                            'is_corrupted': False,
-                            'is_detached': False,
-                            'is_timeout': True
-                        }))
+                        failed_htmls.append((i, html, _failure_detail(html, e, timeout_duration)))
                     return None
 
                 except Exception as e:
                     async with lock:
                         print(f"[WARN] Falló {html}: {e}, se reintentará al final" if retry_attempt == 0 else f"[WARN] {html} CANCELADO definitivamente: {e}")
-                        detail = {
-                            'file': str(html),
-                            'error_type': type(e).__name__,
-                            'error_msg': str(e)[:200],
-                            'is_corrupted': "net::ERR_ABORTED" in str(e),
-                            'is_detached': "frame was detached" in str(e)
-                        }
+                        detail = _failure_detail(html, e)
                         if retry_attempt == 0:
                             failed_htmls.append((i, html, detail))
                         else:
                             final_failures.append(detail)
                     return None
 
-                finally:
-                    with contextlib.suppress(Exception):
-                        await page.close()
-
-        print(f"[INFO] Iniciando conversión de {total} archivos HTML…")
-        tasks = [asyncio.create_task(worker(i, html)) for i, html in enumerate(htmls, 1)]
+        if shards == 1:
+            print(f"[INFO] Iniciando conversión de {total} archivos HTML…")
+            tasks = [asyncio.create_task(worker(i, html)) for i, html in enumerate(htmls, 1)]
 
-        completed_tasks = 0
-        for coro in asyncio.as_completed(tasks):
-            try:
-                res = await coro
-                if res:
-                    rendered.append(res)
-                completed_tasks += 1
-            except Exception as e:
-                print(f"[ERROR] Tarea no controlada falló: {str(e)[:100]}...")
-                completed_tasks += 1
+            completed_tasks = 0
+            for coro in asyncio.as_completed(tasks):
+                try:
+                    res = await coro
+                    if res:
+                        rendered.append(res)
+                    completed_tasks += 1
+                except Exception as e:
+                    print(f"[ERROR] Tarea no controlada falló: {str(e)[:100]}...")
+                    completed_tasks += 1
 
-        print(f"[INFO] Primera ronda completada: {completed_tasks}/{total} tareas")
+            print(f"[INFO] Primera ronda completada: {completed_tasks}/{total} tareas")
 
         if failed_htmls:
             wait_time = min(10.0, max(3.0, len(failed_htmls) * 0.1))
@@ -598,26 +1383,40 @@ async def render_htmls_to_pdfs(htmls, data_root, out_root, args, base_url=None):
         else:
             print(f"[SUCCESS] Todas las conversiones completadas en primera ronda")
 
-        await asyncio.sleep(1.0)
-        await context.close()
-        await browser.close()
+        if ready_times:
+            print(ready_summary(ready_times))
+        print(pool.stats())
+
+    try:
+        manifest.save()
+    except Exception as e:
+        print(f"[WARN] No se pudo guardar el manifiesto de render: {e}")
 
     rendered.sort(key=lambda tup: str(tup[2]))
     return rendered
 
 # ──────────────────────────────────────────────────────────────────────────────
 
-def parse_args():
+def parse_args(argv=None):
     default_concurrency = min(os.cpu_count() or 4, 8)
 
     ap = argparse.ArgumentParser(description="HTML → PDF A3 (Chromium/Playwright) + merges por sección **por centro**")
     ap.add_argument("--data", required=True, help="Carpeta raíz con los .html generados")
     ap.add_argument("--out", default=None, help="Carpeta de salida (default: <data>_pdf)")
     ap.add_argument("--scale", type=float, default=1.0, help="Escala del render (1.0 por defecto)")
-    ap.add_argument("--wait", type=int, default=500, help="Espera (ms) tras cargar cada HTML (500 por defecto)")
+    ap.add_argument("--wait", type=int, default=500, help="Espera fija (ms) tras cargar cada HTML con --espera fija (500 por defecto)")
+    ap.add_argument("--espera", choices=READY_MODES, default="adaptativa",
+                    help="adaptativa: hasta que imágenes y fuentes estén listas; fija: networkidle + --wait")
+    ap.add_argument("--ready-timeout", type=int, default=READY_TIMEOUT_DEFAULT_MS,
+                    help=f"Presupuesto máximo (ms) por página de la espera adaptativa (default {READY_TIMEOUT_DEFAULT_MS})")
     ap.add_argument("--no-merge", action="store_true", help="No crear PDFs combinados por sección")
+    ap.add_argument("--section-merges", action="store_true", help="Escribir también los _<SECCION>__MERGED.pdf intermedios")
     ap.add_argument("--ignore-css-page", action="store_true", help="Ignorar @page del CSS y forzar A3 landscape")
-    ap.add_argument("--concurrency", type=int, default=default_concurrency, help=f"Número de páginas en paralelo (default {default_concurrency})")
+    ap.add_argument("--concurrency", type=int, default=default_concurrency, help=f"Número de páginas en paralelo por navegador (default {default_concurrency})")
+    ap.add_argument("--shards", type=int, default=1,
+                    help="Procesos de render, cada uno con su propio Chromium (1 = un solo navegador)")
+    ap.add_argument("--page-reuse", type=int, default=PAGE_REUSE_DEFAULT,
+                    help=f"Documentos por página del pool antes de reciclarla (default {PAGE_REUSE_DEFAULT}; 0 = una página nueva por HTML)")
     ap.add_argument("--merge-workers", type=int, default=min(os.cpu_count() or 2, 4), help="Workers paralelos para merges por centro")
     ap.add_argument("--fast", action="store_true", help="Modo rápido: alta concurrencia, timeouts reducidos (sin reintentos)")
     ap.add_argument("--ultra-fast", action="store_true", help="Modo ultra-rápido extremo")
@@ -627,79 +1426,85 @@ def parse_args():
     ap.add_argument("--caratulas-dir", default=None, help="Ruta a las carátulas del Anejo (PDFs)")
     ap.add_argument("--port", type=int, default=8800, help="Puerto HTTP local para servir --data")
     ap.add_argument("--use-file-scheme", action="store_true", help="Forzar file:// en lugar de HTTP (menos estable)")
-    return ap.parse_args()
+    ap.add_argument("--assets", choices=ASSET_MODES, default="enlace",
+                    help="Cómo dejar cada foto en assets/: enlace (hard link), simbolico o copia (default: enlace)")
+    ap.add_argument("--force-render", action="store_true", help="Ignorar el manifiesto y re-renderizar todos los HTML")
+    return ap.parse_args(argv)
 
-def crear_anejo_final_por_centro(args, out_root: Path, centros: set[str]):
+def plan_anejo_final(centro: str, sources: dict, caratulas_dir) -> list[Path]:
+    """
+    Lista ordenada de PDFs que forman el anejo final de un centro.
+    'sources' mapea sección -> PDFs de esa sección (páginas sueltas o el _X__MERGED.pdf).
+    La carátula de una sección solo se incluye si la sección tiene contenido.
+    """
+    plan = []
+    for caratula, section in ORDEN_ANEJO_FINAL:
+        p_caratula = caratulas_dir / caratula if caratulas_dir else None
+        pdfs = sources.get(section) if section else None
+
+        if section and pdfs:
+            if p_caratula and p_caratula.exists():
+                plan.append(p_caratula)
+            elif p_caratula:
+                print(f"[INFO] ({centro}) Carátula no encontrada: {p_caratula.name}, se omite")
+            plan.extend(pdfs)
+        elif not section and p_caratula and p_caratula.exists():
+            plan.append(p_caratula)
+        elif section:
+            print(f"[INFO] ({centro}) Sección sin PDFs: {merged_name(section)}, se omite")
+
+    for section in ORDEN_ANEJO_FINAL_EXTRA:
+        pdfs = sources.get(section)
+        if pdfs:
+            plan.extend(pdfs)
+        else:
+            print(f"[INFO] ({centro}) Sección sin PDFs: {merged_name(section)}, se omite")
+    return plan
+
+def crear_anejo_final_por_centro(args, out_root: Path, centros: set[str], rendered=None):
     """
     Genera un 05_ANEJO 5. REPORTAJE FOTOGRÁFICO.pdf por cada centro dentro de <out_root>/<CENTRO>.
     Usa las mismas carátulas para todos (si existen).
+    Con 'rendered' (lista (centro, sección, pdf)) compone el anejo en una pasada desde las
+    páginas; sin él, usa los _<SECCION>__MERGED.pdf ya escritos en disco.
     """
     from concurrent.futures import ThreadPoolExecutor
 
-    orden_secciones = [
-        ("PORTADA.pdf", None),
-        ("CENTRO.pdf", "_CENTRO__MERGED.pdf"),
-        ("EDIFICIO.pdf", "_EDIFICIOS__MERGED.pdf"),
-        ("DEPENDENCIAS.pdf", "_DEPENDENCIAS__MERGED.pdf"),
-        ("ACOM.pdf", "_ACOMETIDA__MERGED.pdf"),
-        ("ENVOL.pdf", "_ENVOLVENTES__MERGED.pdf"),
-        ("CALEFACCION.pdf", "_CC__MERGED.pdf"),
-        ("CLIMA.pdf", "_CLIMA__MERGED.pdf"),
-        ("EQHORIZ.pdf", "_EQ_HORIZONTALES__MERGED.pdf"),
-        ("ELEVA.pdf", "_ELEVADORES__MERGED.pdf"),
-        ("ILUM.pdf", "_ILUMINACION__MERGED.pdf"),
-        ("OTROSEQ.pdf", "_OTROS_EQUIPOS__MERGED.pdf"),
-    ]
-    orden_merged_extra = [
-        "_DEPENDENCIAS__MERGED.pdf",
-        "_EDIFICIOS__MERGED.pdf",
-        "_ELEVADORES__MERGED.pdf",
-        "_ENVOLVENTES__MERGED.pdf",
-        "_EQ_HORIZONTALES__MERGED.pdf",
-    ]
-
     caratulas_dir = Path(args.caratulas_dir) if args.caratulas_dir else None
 
-    def process_centro_final(centro):
-        base = out_root / centro
-        pdfs_final = []
-
-        for caratula, merged in orden_secciones:
-            p_caratula = caratulas_dir / caratula if caratulas_dir else None
-            p_merged = base / merged if merged else None
-
-            if merged and p_merged.exists():
-                if p_caratula and p_caratula.exists():
-                    pdfs_final.append(p_caratula)
-                elif p_caratula:
-                    print(f"[INFO] ({centro}) Carátula no encontrada: {p_caratula.name}, se omite")
-                pdfs_final.append(p_merged)
-            elif not merged and p_caratula and p_caratula.exists():
-                pdfs_final.append(p_caratula)
-            else:
-                if merged:
-                    print(f"[INFO] ({centro}) Merged no encontrado: {p_merged.name}, se omite")
+    pages_by_center = defaultdict(lambda: defaultdict(list))
+    for centro, section, pdf in rendered or []:
+        pages_by_center[centro][section].append(pdf)
 
-        for nombre in orden_merged_extra:
-            p = base / nombre
+    def sources_for(centro):
+        if rendered is not None:
+            return {section: sorted(paths) for section, paths in pages_by_center[centro].items()}
+        base = out_root / centro
+        sources = {}
+        for section in SECCIONES:
+            p = base / merged_name(section)
             if p.exists():
-                pdfs_final.append(p)
-            else:
-                print(f"[INFO] ({centro}) Merged no encontrado: {nombre}, se omite")
+                sources[section] = [p]
+        return sources
+
+    def process_centro_final(centro):
+        base = out_root / centro
+        pdfs_final = plan_anejo_final(centro, sources_for(centro), caratulas_dir)
 
         if not pdfs_final:
-            print(f"[ERROR] ({centro}) No se encontraron PDFs merged válidos en: {base}")
+            print(f"[ERROR] ({centro}) No se encontraron PDFs válidos en: {base}")
             return False
 
-        out_final = base / "05_ANEJO 5. REPORTAJE FOTOGRÁFICO.pdf"
+        out_final = base / ANEJO_FINAL_NOMBRE
         writer = PdfWriter()
         for p in pdfs_final:
             with contextlib.suppress(Exception):
                 writer.append(str(p))
         try:
+            out_final.parent.mkdir(parents=True, exist_ok=True)
             with out_final.open("wb") as f:
                 writer.write(f)
-            print(f"[OK] ({centro}) Anejo final generado: {out_final}")
+            print(f"[OK] ({centro}) Anejo final generado: {out_final} ({len(pdfs_final)} PDFs)")
             return True
         except Exception as e:
             print(f"[ERROR] ({centro}) Error generando anejo final: {e}")
@@ -714,9 +1519,9 @@ def crear_anejo_final_por_centro(args, out_root: Path, centros: set[str]):
 def main():
     args = parse_args()
     try:
-        centros = asyncio.run(main_async(args))
+        centros, rendered = asyncio.run(main_async(args))
         out_root = Path(args.out).resolve() if args.out else out_root_for(Path(args.data).resolve())
-        crear_anejo_final_por_centro(args, out_root, centros)
+        crear_anejo_final_por_centro(args, out_root, centros, rendered)
     except KeyboardInterrupt:
         print("\n[STOP] Cancelado por el usuario")
     except Exception as e:
@@ -20,6 +20,8 @@ Características:
 - Tolerante a JSON/plantillas ausentes (SKIP)
 - Descubrimiento de múltiples centros, o un centro único con JSON sueltos
 - CLI: --data (carpeta datos), --out (salida), --tpl (plantillas), --svg/--svg2 (placeholders)
+- Librería: render_contexto_centro(ctx) renderiza un centro desde su contexto en memoria
+  (sin JSON separados); la CLI y run_for_dir leen los JSON y usan los mismos render_*
 - Logs y métricas por bloque + resumen por centro
 
 Salida:
@@ -125,48 +127,10 @@ def _gather_svg_search_paths() -> list[Path]:
 
 def ensure_placeholders_in_outdir(out_dir: Path) -> dict:
     """
-    Copia 1 o 2 SVG disponibles junto al HTML si existen.
+    Deja 1 o 2 SVG disponibles junto al HTML si existen (ver RecursosRender.placeholders).
     Devuelve rutas RELATIVAS (para usar en <img src="...">): {"main": "...", "alt": "..."}.
     """
-    out_dir.mkdir(parents=True, exist_ok=True)
-    search = [p for p in _gather_svg_search_paths() if p.exists()]
-    result = {"main": "", "alt": ""}
-
-    # Copia el principal (main)
-    main_svg = None
-    for p in search:
-        if Path(p).name.lower() == Path(DEFAULT_SVG_MAIN).name.lower():
-            main_svg = p
-            break
-    if main_svg:
-        target = out_dir / Path(DEFAULT_SVG_MAIN).name
-        if not target.exists():
-            try:
-                copy2(main_svg, target)
-                print(f"[ASSET] Copiado placeholder -> {target}")
-            except Exception as e:
-                print(f"[WARN] No se pudo copiar {main_svg} -> {target}: {e}")
-        if target.exists():
-            result["main"] = Path(DEFAULT_SVG_MAIN).name
-
-    # Copia el alternativo (alt)
-    alt_svg = None
-    for p in search:
-        if Path(p).name.lower() == Path(DEFAULT_SVG_ALT).name.lower():
-            alt_svg = p
-            break
-    if alt_svg:
-        target = out_dir / Path(DEFAULT_SVG_ALT).name
-        if not target.exists():
-            try:
-                copy2(alt_svg, target)
-                print(f"[ASSET] Copiado placeholder alt -> {target}")
-            except Exception as e:
-                print(f"[WARN] No se pudo copiar {alt_svg} -> {target}: {e}")
-        if target.exists():
-            result["alt"] = Path(DEFAULT_SVG_ALT).name
-
-    return result
+    return RECURSOS.placeholders(out_dir)
 
 def build_photos_grid(photos: list, placeholder_href: str = "") -> str:
     """
@@ -225,44 +189,250 @@ def _replace_tokens_simple(html: str, mapping: dict) -> str:
         out = out.replace("{{" + k + "}}", _strip(v))
     return out
 
-def render_template(html_text: str, slot_tokens: tuple[str, ...], fotos_html: str, context_maps: list, title_keys=()):
+# ===================== MOTOR DE PLANTILLAS (compilado) =====================
+# Cada plantilla se trocea UNA vez en segmentos literales, slots de fotos [[FOTOS_*]]
+# y marcadores {{clave}}; renderizar es un único "".join sobre esos segmentos.
+_RE_TEMPLATE_TOKEN = re.compile(r"\{\{([^{}]+?)\}\}|\[\[(FOTOS_[A-Z_]*)\]\]")
+_SEG_LIT, _SEG_KEY, _SEG_SLOT = 0, 1, 2
+
+# Marcadores que no se pudieron resolver, por plantilla (se resumen al final de main)
+UNRESOLVED_PLACEHOLDERS = defaultdict(set)
+
+class CompiledTemplate:
+    """Plantilla HTML precompilada en segmentos (literal / {{clave}} / [[slot]])."""
+
+    __slots__ = ("name", "segments", "slots")
+
+    def __init__(self, html_text: str, name: str = ""):
+        self.name = name
+        segments = []
+        pos = 0
+        for m in _RE_TEMPLATE_TOKEN.finditer(html_text):
+            if m.start() > pos:
+                segments.append((_SEG_LIT, html_text[pos:m.start()]))
+            if m.group(1) is not None:
+                segments.append((_SEG_KEY, m.group(1)))
+            else:
+                segments.append((_SEG_SLOT, m.group(0)))
+            pos = m.end()
+        if pos < len(html_text):
+            segments.append((_SEG_LIT, html_text[pos:]))
+        self.segments = tuple(segments)
+        self.slots = frozenset(v for kind, v in segments if kind == _SEG_SLOT)
+
+    def render(self, slot_tokens: tuple[str, ...], fotos_html: str, context_maps: list) -> str:
+        # 1) Fotos: primer slot presente; si ninguno está, genérico de envolvente
+        active_slot = next((t for t in slot_tokens if t in self.slots), None)
+        if active_slot is None and "[[FOTOS_ENVOL]]" in self.slots:
+            active_slot = "[[FOTOS_ENVOL]]"
+
+        # 2) Campos: el primer diccionario que contiene la clave manda
+        merged = {}
+        for mp in reversed(context_maps):
+            merged.update(mp)
+
+        out = []
+        for kind, value in self.segments:
+            if kind == _SEG_LIT:
+                out.append(value)
+            elif kind == _SEG_KEY:
+                if value in merged:
+                    out.append(_strip(merged[value]))
+                else:
+                    out.append("{{" + value + "}}")
+                    UNRESOLVED_PLACEHOLDERS[self.name].add(value)
+            else:
+                out.append(fotos_html if value == active_slot else value)
+        return "".join(out)
+
+_TEMPLATE_CACHE = {}
+
+def load_template(tpl_path: Path) -> CompiledTemplate:
+    """Lee y compila una plantilla; se reutiliza mientras no cambie su mtime."""
+    mtime = tpl_path.stat().st_mtime_ns
+    cached = _TEMPLATE_CACHE.get(tpl_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    compiled = CompiledTemplate(tpl_path.read_text(encoding="utf-8"), name=tpl_path.name)
+    _TEMPLATE_CACHE[tpl_path] = (mtime, compiled)
+    return compiled
+
+# ===================== RECURSOS PRECARGADOS =====================
+# Cómo se instalan los SVG de placeholder en cada carpeta de salida
+ASSET_MODES = ("copia", "enlace", "simbolico")
+# Margen de mtime para dar por buena una copia (FAT/SMB redondean a 2 s)
+_MTIME_TOLERANCIA_NS = 2_000_000_000
+
+class RecursosRender:
+    """
+    Plantillas y placeholders SVG cargados una vez por configuración (ver configure()).
+    - plantilla(path): CompiledTemplate de TPLS/T_ENVOL precargada (None si falta el fichero).
+    - placeholders(out_dir): instala los SVG solo si faltan o están desactualizados
+      (tamaño distinto o más antiguos que el origen) y recuerda la carpeta para el resto
+      de la ejecución.
+    modo_assets: 'copia' (copy2), 'enlace' (hard link) o 'simbolico' (symlink); si no se
+    puede enlazar (otro disco, permisos) se copia.
+    """
+
+    def __init__(self, modo_assets: str = "copia"):
+        if modo_assets not in ASSET_MODES:
+            raise ValueError(f"modo_assets debe ser uno de {ASSET_MODES}: {modo_assets!r}")
+        self.modo_assets = modo_assets
+        self._plantillas = {}
+        self._svgs = None
+        self._carpetas = {}
+        self.stats = {"plantillas": 0, "instalados": 0, "al_dia": 0}
+
+    def precargar(self):
+        for tpl in list(TPLS.values()) + list(T_ENVOL.values()):
+            self.plantilla(tpl["path"])
+        self._fuentes_svg()
+
+    def plantilla(self, tpl_path: Path):
+        if tpl_path not in self._plantillas:
+            try:
+                compiled = load_template(tpl_path)
+                self.stats["plantillas"] += 1
+            except OSError:
+                compiled = None
+            self._plantillas[tpl_path] = compiled
+        return self._plantillas[tpl_path]
+
+    def _fuentes_svg(self) -> list:
+        """[(clave, nombre destino, origen, stat del origen)] para main y alt."""
+        if self._svgs is None:
+            search = [p for p in _gather_svg_search_paths() if p.exists()]
+            self._svgs = []
+            for clave, nombre in (("main", Path(DEFAULT_SVG_MAIN).name), ("alt", Path(DEFAULT_SVG_ALT).name)):
+                origen = next((p for p in search if Path(p).name.lower() == nombre.lower()), None)
+                if origen:
+                    self._svgs.append((clave, nombre, Path(origen), Path(origen).stat()))
+        return self._svgs
+
+    def placeholders(self, out_dir: Path) -> dict:
+        out_dir = Path(out_dir)
+        result = self._carpetas.get(out_dir)
+        if result is None:
+            out_dir.mkdir(parents=True, exist_ok=True)
+            result = {"main": "", "alt": ""}
+            for clave, nombre, origen, st in self._fuentes_svg():
+                if self._instalar(origen, st, out_dir / nombre, clave):
+                    result[clave] = nombre
+            self._carpetas[out_dir] = result
+        return dict(result)
+
+    def _instalar(self, origen: Path, st, target: Path, clave: str) -> bool:
+        try:
+            actual = target.stat()
+            if actual.st_size == st.st_size and actual.st_mtime_ns + _MTIME_TOLERANCIA_NS >= st.st_mtime_ns:
+                self.stats["al_dia"] += 1
+                return True
+        except OSError:
+            pass
+        etiqueta = "placeholder" if clave == "main" else "placeholder alt"
+        try:
+            # Nunca escribir a través de un enlace previo: modificaría el SVG de origen
+            if target.is_symlink() or target.exists():
+                target.unlink()
+            accion = self._enlazar(origen, target)
+            self.stats["instalados"] += 1
+            print(f"[ASSET] {accion} {etiqueta} -> {target}")
+        except Exception as e:
+            print(f"[WARN] No se pudo copiar {origen} -> {target}: {e}")
+        return target.exists()
+
+    def _enlazar(self, origen: Path, target: Path) -> str:
+        if self.modo_assets == "enlace":
+            try:
+                os.link(origen, target)
+                return "Enlazado"
+            except OSError:
+                pass
+        elif self.modo_assets == "simbolico":
+            try:
+                os.symlink(origen.resolve(), target)
+                return "Enlace simbólico"
+            except OSError:
+                pass
+        copy2(origen, target)
+        return "Copiado"
+
+# Se reconstruye en configure(); por defecto copia y resuelve las rutas al primer uso
+RECURSOS = RecursosRender()
+
+# ===================== MANIFIESTO DE HTML =====================
+# Sidecar por centro (<salida>/<CENTRO>/.html_manifest.json) con cada página escrita: ruta
+# relativa al centro, tamaño, mtime, referencias de imagen y orden de render. html2pdf_a3_fast
+# lo usa en find_htmls para validar las páginas sin volver a leerlas del disco.
+HTML_MANIFEST_NAME = ".html_manifest.json"
+HTML_MANIFEST_VERSION = 1
+_RE_IMG_SRC = re.compile(r'src=["\']([^"\']+)["\']', re.IGNORECASE)
+
+class ManifiestoHtml:
+    def __init__(self):
+        self._centros = defaultdict(dict)  # carpeta del centro -> {ruta relativa: entrada}
+        self._pendientes = set()
+
+    def registrar(self, html_path: Path, html: str):
+        centro_dir = html_path.parent.parent
+        entradas = self._centros[centro_dir]
+        st = html_path.stat()
+        rel = html_path.relative_to(centro_dir).as_posix()
+        entradas[rel] = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "imgs": _RE_IMG_SRC.findall(html),
+            "orden": entradas[rel]["orden"] if rel in entradas else len(entradas),
+        }
+        self._pendientes.add(centro_dir)
+
+    def guardar(self):
+        """
+        Escribe el manifiesto de los centros con páginas nuevas. Solo recoge lo escrito en
+        esta ejecución: un HTML antiguo sin entrada se valida leyéndolo, como antes.
+        """
+        for centro_dir in sorted(self._pendientes):
+            path = centro_dir / HTML_MANIFEST_NAME
+            tmp = path.with_suffix(".tmp")
+            try:
+                tmp.write_text(json.dumps({"v": HTML_MANIFEST_VERSION, "paginas": self._centros[centro_dir]},
+                                          ensure_ascii=False), encoding="utf-8")
+                os.replace(tmp, path)
+            except OSError as e:
+                print(f"[WARN] No se pudo escribir {path}: {e}")
+        self._pendientes.clear()
+
+MANIFIESTO_HTML = ManifiestoHtml()
+
+def escribir_html(html_path: Path, html: str):
+    html_path.write_text(html, encoding="utf-8")
+    MANIFIESTO_HTML.registrar(html_path, html)
+
+def log_unresolved_placeholders():
+    if not UNRESOLVED_PLACEHOLDERS:
+        return
+    print("[AVISO] Marcadores sin valor en plantillas:")
+    for name in sorted(UNRESOLVED_PLACEHOLDERS):
+        keys = ", ".join("{{" + k + "}}" for k in sorted(UNRESOLVED_PLACEHOLDERS[name]))
+        print(f"  - {name or '(texto)'}: {keys}")
+
+def render_template(html_text, slot_tokens: tuple[str, ...], fotos_html: str, context_maps: list, title_keys=()):
     """
     - Reemplaza el primer slot encontrado en 'slot_tokens' por fotos_html.
-    - Reemplaza tokens con varios diccionarios (en orden).
-    - Asegura también title_keys si estuvieran en el HTML (p.ej. <title>).
+    - Reemplaza tokens con varios diccionarios (en orden: el primero que tenga la clave).
+    - 'html_text' puede ser texto o una CompiledTemplate (ver load_template).
+    - title_keys se mantiene por compatibilidad: ya quedan cubiertos por los diccionarios.
     """
-    result = html_text
-
-    # 1) Fotos: usa el primer slot que exista; si ninguno está, intenta genérico de envolvente.
-    slot_applied = False
-    for tok in slot_tokens:
-        if tok in result:
-            result = result.replace(tok, fotos_html)
-            slot_applied = True
-            break
-    if not slot_applied and "[[FOTOS_ENVOL]]" in result:
-        result = result.replace("[[FOTOS_ENVOL]]", fotos_html)
-
-    # 2) Campos
-    for mp in context_maps:
-        result = _replace_tokens_simple(result, mp)
-
-    # 3) title_keys (por si la plantilla los usa en <title>)
-    for k in title_keys:
-        for mp in context_maps:
-            if k in mp:
-                result = result.replace("{{" + k + "}}", _strip(mp[k]))
-                break
-
-    return result
+    tpl = html_text if isinstance(html_text, CompiledTemplate) else CompiledTemplate(html_text)
+    return tpl.render(slot_tokens, fotos_html, context_maps)
 
-def ensure_outdir_for_centro(centro_id: str, tipo_subdir: str) -> Path:
+def outdir_for_centro(centro_id: str) -> Path:
     # Si centro_id ya empieza por C, no añadir otra C (evitar CC0007)
     clean_id = _strip(centro_id)
-    if clean_id.startswith('C'):
-        out_dir = SALIDA_BASE / clean_id / tipo_subdir
-    else:
-        out_dir = SALIDA_BASE / f"C{clean_id}" / tipo_subdir
+    return SALIDA_BASE / (clean_id if clean_id.startswith('C') else f"C{clean_id}")
+
+def ensure_outdir_for_centro(centro_id: str, tipo_subdir: str) -> Path:
+    out_dir = outdir_for_centro(centro_id) / tipo_subdir
     out_dir.mkdir(parents=True, exist_ok=True)
     return out_dir
 
@@ -409,17 +579,21 @@ def log_center_summary(centro_id: str):
 # ===================== RENDERERS =====================
 def process_centro(centro_json: Path):
     if not centro_json or not centro_json.exists():
-        return
+        return None
     data = json.loads(centro_json.read_text(encoding="utf-8"))
+    render_centro(data)
+    return data
+
+def render_centro(data: dict):
     centro = data.get("centro") or {}
     if not centro:
         return
     tpl = TPLS["centro"]
     tpl_path = tpl["path"]
-    if not tpl_path.exists():
+    html = RECURSOS.plantilla(tpl_path)
+    if html is None:
         print(f"[AVISO] Falta plantilla: {tpl_path}")
         return
-    html = tpl_path.read_text(encoding="utf-8")
     fotos = collect_fotos(centro)
 
     centro_id = centro.get("id", "SINID")
@@ -442,14 +616,18 @@ def process_centro(centro_json: Path):
         title_keys=tpl["title_keys"],
     )
     out_name = f"{centro_id}_centro.html"
-    (out_dir / out_name).write_text(out_html, encoding="utf-8")
+    escribir_html(out_dir / out_name, out_html)
     print(f"[OK] CENTRO -> {out_dir / out_name}")
     log_block_summary(centro_id, "centro")
 
 def process_edificios(edificios_json: Path):
     if not edificios_json or not edificios_json.exists():
-        return
+        return None
     data = json.loads(edificios_json.read_text(encoding="utf-8"))
+    render_edificios(data)
+    return data
+
+def render_edificios(data: dict):
     centro = data.get("centro") or {}
     edificios = data.get("edificios") or []
     if not edificios:
@@ -457,10 +635,10 @@ def process_edificios(edificios_json: Path):
 
     tpl = TPLS["edificios"]
     tpl_path = tpl["path"]
-    if not tpl_path.exists():
+    tpl_html = RECURSOS.plantilla(tpl_path)
+    if tpl_html is None:
         print(f"[AVISO] Falta plantilla: {tpl_path}")
         return
-    tpl_html = tpl_path.read_text(encoding="utf-8")
 
     centro_id = centro.get("id") or (edificios[0].get("id_centro") if edificios else "SINID")
     out_dir = ensure_outdir_for_centro(centro_id, tpl["out_subdir"])
@@ -489,7 +667,7 @@ def process_edificios(edificios_json: Path):
             title_keys=tpl["title_keys"],
         )
         out_name = f"{e.get('id','SINID')}_edificio.html"
-        (out_dir / out_name).write_text(html, encoding="utf-8")
+        escribir_html(out_dir / out_name, html)
         add_metrics(centro_id, "edificios", out_inc=1, photos_inc=len(fotos))
         print(f"[OK] EDIFICIO -> {out_dir / out_name}")
 
@@ -497,8 +675,12 @@ def process_edificios(edificios_json: Path):
 
 def process_envolventes(envolventes_json: Path):
     if not envolventes_json or not envolventes_json.exists():
-        return
+        return None
     data = json.loads(envolventes_json.read_text(encoding="utf-8"))
+    render_envolventes(data)
+    return data
+
+def render_envolventes(data: dict):
     centro = data.get("centro") or {}
     envolventes = data.get("envolventes") or []
     if not envolventes:
@@ -513,7 +695,8 @@ def process_envolventes(envolventes_json: Path):
     for env in envolventes:
         clasif = clasificar_envolvente(env)
         tpl_path = clasif["template_path"]
-        if not tpl_path.exists():
+        tpl_html = RECURSOS.plantilla(tpl_path)
+        if tpl_html is None:
             print(f"[AVISO] Falta plantilla: {tpl_path}")
             continue
         
@@ -522,7 +705,6 @@ def process_envolventes(envolventes_json: Path):
             print(f"[SKIP] Envolvente {env.get('id', 'SINID')} omitida (sin fotos)")
             continue
             
-        tpl_html = tpl_path.read_text(encoding="utf-8")
         fotos = collect_fotos(env)
         fotos_html = build_photos_grid(fotos, placeholders.get("main") or placeholders.get("alt"))
 
@@ -538,7 +720,7 @@ def process_envolventes(envolventes_json: Path):
         )
 
         out_name = f"{env.get('id','SINID')}_{clasif['subtipo'].lower()}.html"
-        (out_dir / out_name).write_text(html, encoding="utf-8")
+        escribir_html(out_dir / out_name, html)
         add_metrics(centro_id, "envolventes", out_inc=1, photos_inc=len(fotos))
         print(f"[OK] ENVOLVENTE -> {out_dir / out_name}")
 
@@ -546,18 +728,22 @@ def process_envolventes(envolventes_json: Path):
 
 def process_dependencias(dependencias_json: Path):
     if not dependencias_json or not dependencias_json.exists():
-        return
+        return None
     data = json.loads(dependencias_json.read_text(encoding="utf-8"))
+    render_dependencias(data)
+    return data
+
+def render_dependencias(data: dict):
     centro = data.get("centro") or {}
     dependencias = data.get("dependencias") or []
     if not dependencias:
         return
     tpl = TPLS["dependencias"]
     tpl_path = tpl["path"]
-    if not tpl_path.exists():
+    tpl_html = RECURSOS.plantilla(tpl_path)
+    if tpl_html is None:
         print(f"[AVISO] Falta plantilla: {tpl_path}")
         return
-    tpl_html = tpl_path.read_text(encoding="utf-8")
     centro_id = centro.get("id") or (dependencias[0].get("id_centro") if dependencias else "SINID")
     out_dir = ensure_outdir_for_centro(centro_id, tpl["out_subdir"])
     placeholders = ensure_placeholders_in_outdir(out_dir)
@@ -583,7 +769,7 @@ def process_dependencias(dependencias_json: Path):
             title_keys=tpl["title_keys"],
         )
         out_name = f"{dep.get('id','SINID')}_dependencia.html"
-        (out_dir / out_name).write_text(html, encoding="utf-8")
+        escribir_html(out_dir / out_name, html)
         add_metrics(centro_id, "dependencias", out_inc=1, photos_inc=len(fotos))
         print(f"[OK] DEPENDENCIA -> {out_dir / out_name}")
 
@@ -591,18 +777,22 @@ def process_dependencias(dependencias_json: Path):
 
 def process_acometida(acom_json: Path):
     if not acom_json or not acom_json.exists():
-        return
+        return None
     data = json.loads(acom_json.read_text(encoding="utf-8"))
+    render_acometida(data)
+    return data
+
+def render_acometida(data: dict):
     centro = data.get("centro") or {}
     acoms = data.get("acom") or []
     if not acoms:
         return
     tpl = TPLS["acom"]
     tpl_path = tpl["path"]
-    if not tpl_path.exists():
+    tpl_html = RECURSOS.plantilla(tpl_path)
+    if tpl_html is None:
         print(f"[AVISO] Falta plantilla: {tpl_path}")
         return
-    tpl_html = tpl_path.read_text(encoding="utf-8")
     centro_id = centro.get("id") or (acoms[0].get("id_centro") if acoms else "SINID")
     out_dir = ensure_outdir_for_centro(centro_id, tpl["out_subdir"])
     placeholders = ensure_placeholders_in_outdir(out_dir)
@@ -628,7 +818,7 @@ def process_acometida(acom_json: Path):
             title_keys=tpl["title_keys"],
         )
         out_name = f"{acom.get('id','SINID')}_acom.html"
-        (out_dir / out_name).write_text(html, encoding="utf-8")
+        escribir_html(out_dir / out_name, html)
         add_metrics(centro_id, "acometida", out_inc=1, photos_inc=len(fotos))
         print(f"[OK] ACOMETIDA -> {out_dir / out_name}")
 
@@ -636,18 +826,22 @@ def process_acometida(acom_json: Path):
 
 def process_cc(cc_json: Path):
     if not cc_json or not cc_json.exists():
-        return
+        return None
     data = json.loads(cc_json.read_text(encoding="utf-8"))
+    render_cc(data)
+    return data
+
+def render_cc(data: dict):
     centro = data.get("centro") or {}
     sistemas = data.get("sistemas_cc") or []
     if not sistemas:
         return
     tpl = TPLS["cc"]
     tpl_path = tpl["path"]
-    if not tpl_path.exists():
+    tpl_html = RECURSOS.plantilla(tpl_path)
+    if tpl_html is None:
         print(f"[AVISO] Falta plantilla: {tpl_path}")
         return
-    tpl_html = tpl_path.read_text(encoding="utf-8")
     centro_id = centro.get("id") or (sistemas[0].get("id_centro") if sistemas else "SINID")
     out_dir = ensure_outdir_for_centro(centro_id, tpl["out_subdir"])
     placeholders = ensure_placeholders_in_outdir(out_dir)
@@ -673,7 +867,7 @@ def process_cc(cc_json: Path):
             title_keys=tpl["title_keys"],
         )
         out_name = f"{sis.get('id','SINID')}_cc.html"
-        (out_dir / out_name).write_text(html, encoding="utf-8")
+        escribir_html(out_dir / out_name, html)
         add_metrics(centro_id, "cc", out_inc=1, photos_inc=len(fotos))
         print(f"[OK] CC -> {out_dir / out_name}")
 
@@ -681,18 +875,22 @@ def process_cc(cc_json: Path):
 
 def process_clima(clima_json: Path):
     if not clima_json or not clima_json.exists():
-        return
+        return None
     data = json.loads(clima_json.read_text(encoding="utf-8"))
+    render_clima(data)
+    return data
+
+def render_clima(data: dict):
     centro = data.get("centro") or {}
     equipos = data.get("equipos_clima") or []
     if not equipos:
         return
     tpl = TPLS["clima"]
     tpl_path = tpl["path"]
-    if not tpl_path.exists():
+    tpl_html = RECURSOS.plantilla(tpl_path)
+    if tpl_html is None:
         print(f"[AVISO] Falta plantilla: {tpl_path}")
         return
-    tpl_html = tpl_path.read_text(encoding="utf-8")
     centro_id = centro.get("id") or (equipos[0].get("id_centro") if equipos else "SINID")
     out_dir = ensure_outdir_for_centro(centro_id, tpl["out_subdir"])
     placeholders = ensure_placeholders_in_outdir(out_dir)
@@ -718,7 +916,7 @@ def process_clima(clima_json: Path):
             title_keys=tpl["title_keys"],
         )
         out_name = f"{eq.get('id','SINID')}_clima.html"
-        (out_dir / out_name).write_text(html, encoding="utf-8")
+        escribir_html(out_dir / out_name, html)
         add_metrics(centro_id, "clima", out_inc=1, photos_inc=len(fotos))
         print(f"[OK] CLIMA -> {out_dir / out_name}")
 
@@ -726,18 +924,22 @@ def process_clima(clima_json: Path):
 
 def process_eqhoriz(eqhoriz_json: Path):
     if not eqhoriz_json or not eqhoriz_json.exists():
-        return
+        return None
     data = json.loads(eqhoriz_json.read_text(encoding="utf-8"))
+    render_eqhoriz(data)
+    return data
+
+def render_eqhoriz(data: dict):
     centro = data.get("centro") or {}
     equipos = data.get("equipos_horiz") or []
     if not equipos:
         return
     tpl = TPLS["eqh"]
     tpl_path = tpl["path"]
-    if not tpl_path.exists():
+    tpl_html = RECURSOS.plantilla(tpl_path)
+    if tpl_html is None:
         print(f"[AVISO] Falta plantilla: {tpl_path}")
         return
-    tpl_html = tpl_path.read_text(encoding="utf-8")
     centro_id = centro.get("id") or (equipos[0].get("id_centro") if equipos else "SINID")
     out_dir = ensure_outdir_for_centro(centro_id, tpl["out_subdir"])
     placeholders = ensure_placeholders_in_outdir(out_dir)
@@ -763,7 +965,7 @@ def process_eqhoriz(eqhoriz_json: Path):
             title_keys=tpl["title_keys"],
         )
         out_name = f"{eq.get('id','SINID')}_eqh.html"
-        (out_dir / out_name).write_text(html, encoding="utf-8")
+        escribir_html(out_dir / out_name, html)
         add_metrics(centro_id, "eqhoriz", out_inc=1, photos_inc=len(fotos))
         print(f"[OK] EQH -> {out_dir / out_name}")
 
@@ -771,18 +973,22 @@ def process_eqhoriz(eqhoriz_json: Path):
 
 def process_elevadores(eleva_json: Path):
     if not eleva_json or not eleva_json.exists():
-        return
+        return None
     data = json.loads(eleva_json.read_text(encoding="utf-8"))
+    render_elevadores(data)
+    return data
+
+def render_elevadores(data: dict):
     centro = data.get("centro") or {}
     elevadores = data.get("elevadores") or []
     if not elevadores:
         return
     tpl = TPLS["eleva"]
     tpl_path = tpl["path"]
-    if not tpl_path.exists():
+    tpl_html = RECURSOS.plantilla(tpl_path)
+    if tpl_html is None:
         print(f"[AVISO] Falta plantilla: {tpl_path}")
         return
-    tpl_html = tpl_path.read_text(encoding="utf-8")
     centro_id = centro.get("id") or (elevadores[0].get("id_centro") if elevadores else "SINID")
     out_dir = ensure_outdir_for_centro(centro_id, tpl["out_subdir"])
     placeholders = ensure_placeholders_in_outdir(out_dir)
@@ -808,7 +1014,7 @@ def process_elevadores(eleva_json: Path):
             title_keys=tpl["title_keys"],
         )
         out_name = f"{eq.get('id','SINID')}_eleva.html"
-        (out_dir / out_name).write_text(html, encoding="utf-8")
+        escribir_html(out_dir / out_name, html)
         add_metrics(centro_id, "elevadores", out_inc=1, photos_inc=len(fotos))
         print(f"[OK] ELEVA -> {out_dir / out_name}")
 
@@ -816,18 +1022,22 @@ def process_elevadores(eleva_json: Path):
 
 def process_iluminacion(iluminacion_json: Path):
     if not iluminacion_json or not iluminacion_json.exists():
-        return
+        return None
     data = json.loads(iluminacion_json.read_text(encoding="utf-8"))
+    render_iluminacion(data)
+    return data
+
+def render_iluminacion(data: dict):
     centro = data.get("centro") or {}
     elementos = data.get("iluminacion") or []
     if not elementos:
         return
     tpl = TPLS["iluminacion"]
     tpl_path = tpl["path"]
-    if not tpl_path.exists():
+    tpl_html = RECURSOS.plantilla(tpl_path)
+    if tpl_html is None:
         print(f"[AVISO] Falta plantilla: {tpl_path}")
         return
-    tpl_html = tpl_path.read_text(encoding="utf-8")
     centro_id = centro.get("id") or (elementos[0].get("id_centro") if elementos else "SINID")
     out_dir = ensure_outdir_for_centro(centro_id, tpl["out_subdir"])
     placeholders = ensure_placeholders_in_outdir(out_dir)
@@ -853,7 +1063,7 @@ def process_iluminacion(iluminacion_json: Path):
             title_keys=tpl["title_keys"],
         )
         out_name = f"{eq.get('id','SINID')}_iluminacion.html"
-        (out_dir / out_name).write_text(html, encoding="utf-8")
+        escribir_html(out_dir / out_name, html)
         add_metrics(centro_id, "iluminacion", out_inc=1, photos_inc=len(fotos))
         print(f"[OK] ILUMINACIÓN -> {out_dir / out_name}")
 
@@ -861,18 +1071,22 @@ def process_iluminacion(iluminacion_json: Path):
 
 def process_otrosequipos(otrosequipos_json: Path):
     if not otrosequipos_json or not otrosequipos_json.exists():
-        return
+        return None
     data = json.loads(otrosequipos_json.read_text(encoding="utf-8"))
+    render_otrosequipos(data)
+    return data
+
+def render_otrosequipos(data: dict):
     centro = data.get("centro") or {}
     elementos = data.get("otros_equipos") or []
     if not elementos:
         return
     tpl = TPLS["otros"]
     tpl_path = tpl["path"]
-    if not tpl_path.exists():
+    tpl_html = RECURSOS.plantilla(tpl_path)
+    if tpl_html is None:
         print(f"[AVISO] Falta plantilla: {tpl_path}")
         return
-    tpl_html = tpl_path.read_text(encoding="utf-8")
     centro_id = centro.get("id") or (elementos[0].get("id_centro") if elementos else "SINID")
     out_dir = ensure_outdir_for_centro(centro_id, tpl["out_subdir"])
     placeholders = ensure_placeholders_in_outdir(out_dir)
@@ -898,7 +1112,7 @@ def process_otrosequipos(otrosequipos_json: Path):
             title_keys=tpl["title_keys"],
         )
         out_name = f"{eq.get('id','SINID')}_otros.html"
-        (out_dir / out_name).write_text(html, encoding="utf-8")
+        escribir_html(out_dir / out_name, html)
         add_metrics(centro_id, "otros_equipos", out_inc=1, photos_inc=len(fotos))
         print(f"[OK] OTROS EQUIPOS -> {out_dir / out_name}")
 
@@ -939,61 +1153,122 @@ def run_for_dir(d: Path):
                            BASE_DIR / "iluminacion.json", BASE_DIR / "ilum.json")
     otroj = first_existing(d / "otroseq.json",            BASE_DIR / "otroseq.json")
 
-    if cj:    process_centro(cj)
+    datos = []
+    if cj:    datos.append(process_centro(cj))
     else:     print(f"[SKIP] centro.json no encontrado en {d}")
 
-    if ej:    process_edificios(ej)
+    if ej:    datos.append(process_edificios(ej))
     else:     print(f"[SKIP] edificios.json no encontrado en {d}")
 
-    if envj:  process_envolventes(envj)
+    if envj:  datos.append(process_envolventes(envj))
     else:     print(f"[SKIP] envolventes/envol(.json) no encontrado en {d}")
 
-    if depj:  process_dependencias(depj)
+    if depj:  datos.append(process_dependencias(depj))
     else:     print(f"[SKIP] dependencias.json no encontrado en {d}")
 
-    if acomj: process_acometida(acomj)
+    if acomj: datos.append(process_acometida(acomj))
     else:     print(f"[SKIP] acom.json no encontrado en {d}")
 
-    if ccj:   process_cc(ccj)
+    if ccj:   datos.append(process_cc(ccj))
     else:     print(f"[SKIP] cc.json no encontrado en {d}")
 
-    if climaj:process_clima(climaj)
+    if climaj:datos.append(process_clima(climaj))
     else:     print(f"[SKIP] clima.json no encontrado en {d}")
 
-    if eqhj:  process_eqhoriz(eqhj)
+    if eqhj:  datos.append(process_eqhoriz(eqhj))
     else:     print(f"[SKIP] eqhoriz.json no encontrado en {d}")
 
-    if elevj: process_elevadores(elevj)
+    if elevj: datos.append(process_elevadores(elevj))
     else:     print(f"[SKIP] eleva.json no encontrado en {d}")
 
-    if ilumj: process_iluminacion(ilumj)
+    if ilumj: datos.append(process_iluminacion(ilumj))
     else:     print(f"[SKIP] iluminacion/ilum(.json) no encontrado en {d}")
 
-    if otroj: process_otrosequipos(otroj)
+    if otroj: datos.append(process_otrosequipos(otroj))
     else:     print(f"[SKIP] otroseq.json no encontrado en {d}")
 
-    # Resumen del centro si lo conocemos
-    centro_id = None
-    for candidate in (cj, ej, envj, depj, acomj, ccj, climaj, eqhj, elevj, ilumj, otroj):
-        if candidate and candidate.exists():
-            try:
-                data = json.loads(candidate.read_text(encoding="utf-8"))
-                c = data.get("centro") or {}
-                centro_id = c.get("id")
-                if not centro_id:
-                    for key in ("edificios","envolventes","dependencias","acom","sistemas_cc",
-                                "equipos_clima","equipos_horiz","elevadores","iluminacion","otros_equipos"):
-                        li = data.get(key) or []
-                        if li and isinstance(li, list):
-                            centro_id = li[0].get("id_centro")
-                            if centro_id:
-                                break
-                if centro_id:
-                    break
-            except Exception:
-                pass
+    # Resumen del centro si lo conocemos (con los JSON ya leídos)
+    centro_id = _centro_id_de(datos)
+    if centro_id:
+        log_center_summary(centro_id)
+    MANIFIESTO_HTML.guardar()
+
+def _centro_id_de(datos: list):
+    """Primer id de centro de los datos por tipo: 'centro.id' o, si falta, 'id_centro' del primer elemento."""
+    for data in datos:
+        if not data:
+            continue
+        try:
+            c = data.get("centro") or {}
+            centro_id = c.get("id")
+            if not centro_id:
+                for key in ("edificios","envolventes","dependencias","acom","sistemas_cc",
+                            "equipos_clima","equipos_horiz","elevadores","iluminacion","otros_equipos"):
+                    li = data.get(key) or []
+                    if li and isinstance(li, list):
+                        centro_id = li[0].get("id_centro")
+                        if centro_id:
+                            break
+            if centro_id:
+                return centro_id
+        except Exception:
+            pass
+    return None
+
+# ===================== CONTEXTO EN MEMORIA =====================
+# Bloques por edificio en el orden de run_for_dir: (clave en el edificio, renderizador)
+_BLOQUES_ELEMENTOS = (
+    ("envolventes", render_envolventes),
+    ("dependencias", render_dependencias),
+    ("acom", render_acometida),
+    ("sistemas_cc", render_cc),
+    ("equipos_clima", render_clima),
+    ("equipos_horiz", render_eqhoriz),
+    ("elevadores", render_elevadores),
+    ("iluminacion", render_iluminacion),
+    ("otros_equipos", render_otrosequipos),
+)
+
+def vistas_por_tipo(contexto_centro: dict) -> list:
+    """
+    [(renderizador, datos)] construidos en memoria desde el contexto de un centro
+    ({"centro": ..., "edif": [...]}). Los datos son los mismos que centro.json,
+    edificios.json y los JSON por tipo que escribe extraer_datos_word._generar_jsons_por_tipo.
+    """
+    centro = contexto_centro.get("centro", {})
+    edificios = contexto_centro.get("edif", [])
+    secciones = {k for k, _ in _BLOQUES_ELEMENTOS}
+    vistas = [
+        (render_centro, {"centro": centro}),
+        (render_edificios, {"centro": centro,
+                            "edificios": [{k: v for k, v in e.items() if k not in secciones} for e in edificios]}),
+    ]
+    for clave, renderizador in _BLOQUES_ELEMENTOS:
+        elementos = [
+            {**elemento,
+             "edificio_id": e.get("id"),
+             "edificio_nombre": e.get("denominacion", ""),
+             "centro_id": centro.get("id"),
+             "centro_nombre": centro.get("nombre", "")}
+            for e in edificios for elemento in e.get(clave, [])
+        ]
+        if elementos:
+            vistas.append((renderizador, {"centro": centro, clave: elementos}))
+    return vistas
+
+def render_contexto_centro(contexto_centro: dict):
+    """
+    Renderiza todos los bloques de un centro desde su contexto ya construido, sin pasar
+    por los JSON separados. Devuelve el id del centro (o None si no se conoce).
+    """
+    vistas = vistas_por_tipo(contexto_centro)
+    for renderizador, data in vistas:
+        renderizador(data)
+    centro_id = _centro_id_de([data for _, data in vistas])
     if centro_id:
         log_center_summary(centro_id)
+    MANIFIESTO_HTML.guardar()
+    return centro_id
 
 def build_template_maps():
     """Reconstruye los mapeos de plantillas con la PLANTILLAS_DIR actual."""
@@ -1087,6 +1362,7 @@ def parse_cli_and_set_paths():
     --svg   -> ruta a SVG placeholder principal (opcional)
     --svg2  -> ruta a SVG placeholder alternativo (opcional)
     --include-without-photos -> incluir elementos sin fotos (default: True)
+    --assets -> copia | enlace | simbolico para los SVG de placeholder (default: copia)
     """
     ap = argparse.ArgumentParser()
     ap.add_argument("--data", default=os.getcwd(), help="Carpeta raíz de datos (centros o un centro).")
@@ -1096,38 +1372,51 @@ def parse_cli_and_set_paths():
     ap.add_argument("--svg2", default=None,        help="Ruta a SVG placeholder alternativo (opcional).")
     ap.add_argument("--exclude-without-photos", action="store_true", default=False,
                     help="Excluir elementos sin fotos del Anejo 5.")
+    ap.add_argument("--assets", choices=ASSET_MODES, default="copia",
+                    help="Cómo dejar los SVG de placeholder junto a cada HTML: copia, enlace (hard link) o simbolico.")
     args = ap.parse_args()
 
     data_dir = Path(args.data).resolve()
     out_dir  = Path(args.out).resolve() if args.out else (data_dir / "salida")
     tpl_dir  = Path(args.tpl).resolve() if args.tpl else (data_dir / "plantillas_a3_unificadas")
-
-    global BASE_DIR, SALIDA_BASE, PLANTILLAS_DIR, SVG_CANDIDATES, INCLUDE_WITHOUT_PHOTOS
-    BASE_DIR = data_dir
-    SALIDA_BASE = out_dir
-    PLANTILLAS_DIR = tpl_dir
+    configure(data_dir, out_dir, tpl_dir, svg=args.svg, svg2=args.svg2,
+              exclude_without_photos=args.exclude_without_photos, modo_assets=args.assets)
+
+def configure(data_dir: Path, out_dir: Path, tpl_dir: Path, svg=None, svg2=None,
+              exclude_without_photos: bool = False, modo_assets: str = "copia"):
+    """Fija rutas y opciones globales (CLI o uso como librería desde el orquestador)."""
+    global BASE_DIR, SALIDA_BASE, PLANTILLAS_DIR, SVG_CANDIDATES, INCLUDE_WITHOUT_PHOTOS, RECURSOS, MANIFIESTO_HTML
+    BASE_DIR = Path(data_dir)
+    SALIDA_BASE = Path(out_dir)
+    PLANTILLAS_DIR = Path(tpl_dir)
     
     # Configurar filtrado de elementos sin fotos
     # Por defecto incluir elementos sin fotos (True), solo excluir si se pasa --exclude-without-photos
-    INCLUDE_WITHOUT_PHOTOS = not args.exclude_without_photos
+    INCLUDE_WITHOUT_PHOTOS = not exclude_without_photos
 
     # Placeholders señalados por CLI primero en prioridad
     SVG_CANDIDATES = []
-    if args.svg:
-        SVG_CANDIDATES.append(Path(args.svg))
-    if args.svg2:
-        SVG_CANDIDATES.append(Path(args.svg2))
+    if svg:
+        SVG_CANDIDATES.append(Path(svg))
+    if svg2:
+        SVG_CANDIDATES.append(Path(svg2))
 
     SALIDA_BASE.mkdir(parents=True, exist_ok=True)
 
     # reconstruye mapeos de plantillas con la PLANTILLAS_DIR actual
     build_template_maps()
 
+    # plantillas y SVG de placeholder se leen una sola vez para todos los centros
+    RECURSOS = RecursosRender(modo_assets)
+    MANIFIESTO_HTML = ManifiestoHtml()
+    RECURSOS.precargar()
+
     print(f"[SETUP] DATA: {BASE_DIR}")
     print(f"[SETUP] OUT : {SALIDA_BASE}")
     print(f"[SETUP] TPL : {PLANTILLAS_DIR}")
     if SVG_CANDIDATES:
         print("[SETUP] SVG placeholders:", ", ".join(str(p) for p in SVG_CANDIDATES))
+    print(f"[SETUP] Plantillas precargadas: {RECURSOS.stats['plantillas']}; assets: {modo_assets}")
 
 def main():
     parse_cli_and_set_paths()
@@ -1135,11 +1424,13 @@ def main():
     if not candidates:
         print("[INFO] Modo 'un solo centro' (JSON sueltos en --data).")
         run_for_dir(BASE_DIR)
+        log_unresolved_placeholders()
         return
     print(f"[INFO] Detectados {len(candidates)} centros.")
     for d in candidates:
         print(f"\n>>> Procesando centro en: {d}")
         run_for_dir(d)
+    log_unresolved_placeholders()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,105 @@
+import unittest
+import tempfile
+import shutil
+import hashlib
+import io
+import contextlib
+import os
+import sys
+from pathlib import Path
+from unittest import mock
+
+# Add the interfaz directory to the Python path to import html2pdf_a3_fast
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import html2pdf_a3_fast as h2p
+
+
+class TestAlmacenAssets(unittest.TestCase):
+    """fix_all_htmls keeps one copy per photo content and links it into each assets/ folder."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.fotos = self.temp_dir / "fotos"
+        self.a = self._foto("C0001_X/Referencias/QE001_FQE0001.jpg", b"foto A" * 1000)
+        self.a_copia = self._foto("C0002_Y/Referencias/QE001_FQE0001_bis.JPG", b"foto A" * 1000)
+        self.b = self._foto("C0002_Y/Referencias/QE001_FQE0001.jpg", b"foto B" * 1000)
+        self.root = self.temp_dir / "salida"
+        h2p._ASSET_STORES.clear()
+
+    def tearDown(self):
+        h2p._ASSET_STORES.clear()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _foto(self, rel, data):
+        p = self.fotos / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(data)
+        return p
+
+    def _html(self, rel, *fotos, extra=""):
+        p = self.root / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        imgs = "".join(f'\r\n  <img class="f" src="file:///{f.as_posix()}">' for f in fotos)
+        p.write_bytes(f"<!doctype html><html><body>{imgs}{extra}\r\n</body></html>\r\n".encode("utf-8"))
+        return p
+
+    def _fix(self, **kw):
+        buf = io.StringIO()
+        with contextlib.redirect_stdout(buf):
+            h2p.fix_all_htmls(self.root, **kw)
+        return buf.getvalue()
+
+    def _refs(self, html):
+        return [html.parent / src for src in h2p._RE_SRC.findall(html.read_text(encoding="utf-8"))]
+
+    def test_one_object_per_content_and_no_name_collisions(self):
+        h1 = self._html("C0001/clima/uno.html", self.a, self.b)
+        h2 = self._html("C0002/clima/dos.html", self.b, self.a_copia)
+        h3 = self._html("C0002/centro/tres.html", self.a, extra='\r\n  <img src="file:///no/existe.jpg">')
+        log = self._fix()
+
+        self.assertEqual([r.read_bytes() for r in self._refs(h1)], [self.a.read_bytes(), self.b.read_bytes()])
+        self.assertEqual([r.read_bytes() for r in self._refs(h2)], [self.b.read_bytes(), self.a.read_bytes()])
+        self.assertEqual(h2p._RE_SRC.findall(h3.read_text(encoding="utf-8"))[1], "file:///no/existe.jpg")
+        objetos = sorted(p for p in (self.root / h2p.ASSET_STORE_DIR).rglob("*.jpg"))
+        self.assertEqual([p.stem for p in objetos],
+                         sorted(hashlib.sha1(f.read_bytes()).hexdigest() for f in (self.a, self.b)))
+        # los assets/ son enlaces al objeto, no copias
+        for ref in self._refs(h1) + self._refs(h2):
+            self.assertIn(ref.stat().st_ino, {p.stat().st_ino for p in objetos})
+        self.assertIn("5 imágenes en 2 objetos nuevos", log)
+        self.assertIn("0 copias", log)
+        # el resto del HTML (incluidos los saltos de línea) no cambia
+        self.assertEqual(h1.read_bytes().count(b"\r\n"), 4)
+
+    def test_unchanged_html_is_not_rewritten(self):
+        h = self._html("C0001/clima/uno.html", self.a)
+        self._fix()
+        antes = h.stat().st_mtime_ns, h.read_bytes()
+        with mock.patch.object(h2p.os, "replace", side_effect=AssertionError("reescrito")):
+            self.assertEqual(self._fix(), "")
+        self.assertEqual((h.stat().st_mtime_ns, h.read_bytes()), antes)
+
+    def test_digests_are_reused_across_runs(self):
+        self._html("C0001/clima/uno.html", self.a)
+        self._fix()
+        h2p._ASSET_STORES.clear()
+        h = self._html("C0002/clima/dos.html", self.a)
+        with mock.patch.object(h2p.hashlib, "sha1", side_effect=AssertionError("foto releída")):
+            log = self._fix()
+        self.assertIn("1 imágenes en 0 objetos nuevos", log)
+        self.assertEqual(self._refs(h)[0].read_bytes(), self.a.read_bytes())
+
+    def test_copy_fallback_when_links_fail(self):
+        h = self._html("C0001/clima/uno.html", self.a)
+        with mock.patch.object(h2p.os, "link", side_effect=OSError("cross-device link")):
+            log = self._fix()
+        ref = self._refs(h)[0]
+        self.assertEqual(ref.read_bytes(), self.a.read_bytes())
+        self.assertIn("0 enlaces, 1 copias", log)
+        self.assertEqual(h2p.parse_args(["--data", "x"]).assets, "enlace")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
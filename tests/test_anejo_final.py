@@ -0,0 +1,73 @@
+import unittest
+import asyncio
+import tempfile
+import shutil
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+from pypdf import PdfReader, PdfWriter
+
+# Add the interfaz directory to the Python path to import html2pdf_a3_fast
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import html2pdf_a3_fast as h2p
+
+
+def _pdf(path: Path, width: int):
+    """One blank page whose width identifies it in the merged output."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    writer = PdfWriter()
+    writer.add_blank_page(width=width, height=100)
+    with path.open("wb") as f:
+        writer.write(f)
+
+
+def _widths(path: Path):
+    return [int(p.mediabox.width) for p in PdfReader(str(path)).pages]
+
+
+class TestAnejoFinal(unittest.TestCase):
+    """The single-pass final merge must match the old two-pass (section merges) output."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.out = self.temp_dir / "pdf"
+        self.caratulas = self.temp_dir / "caratulas"
+        _pdf(self.caratulas / "PORTADA.pdf", 10)
+        _pdf(self.caratulas / "EDIFICIO.pdf", 11)
+        _pdf(self.caratulas / "CLIMA.pdf", 12)
+        self.rendered = []
+        width = 100
+        for section, n in [("clima", 2), ("edificios", 2), ("centro", 1), ("otros", 1)]:
+            for k in range(n):
+                pdf = self.out / "C0001" / section / f"C0001_{section}_{k}.pdf"
+                _pdf(pdf, width)
+                width += 1
+                self.rendered.append(("C0001", section, pdf))
+        self.args = SimpleNamespace(caratulas_dir=str(self.caratulas), merge_workers=2)
+        self.final = self.out / "C0001" / h2p.ANEJO_FINAL_NOMBRE
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_single_pass_matches_section_merges(self):
+        """Same pages in the same order with or without intermediate _X__MERGED.pdf files."""
+        h2p.crear_anejo_final_por_centro(self.args, self.out, {"C0001"}, self.rendered)
+        directo = _widths(self.final)
+        self.assertFalse((self.out / "C0001" / "_CLIMA__MERGED.pdf").exists())
+
+        asyncio.run(h2p.merge_pdfs_parallel_by_center(self.rendered, self.out, self.args))
+        h2p.crear_anejo_final_por_centro(self.args, self.out, {"C0001"})
+        self.assertEqual(directo, _widths(self.final))
+
+    def test_final_order(self):
+        """Cover pages precede their sections; the extra block repeats edificios at the end."""
+        h2p.crear_anejo_final_por_centro(self.args, self.out, {"C0001"}, self.rendered)
+        # portada, centro (sin carátula), carátula edificios + 2, carátula clima + 2, edificios extra
+        self.assertEqual(_widths(self.final), [10, 104, 11, 102, 103, 12, 100, 101, 102, 103])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
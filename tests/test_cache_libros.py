@@ -0,0 +1,86 @@
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+# Add the interfaz directory to the Python path to import anexos_creator
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import anexos_creator as ac
+
+
+def _escribir_libro(path: Path, sin=(), valor="1.234"):
+    hojas = {nombre: pd.DataFrame({"ID EDIFICIO": ["C0001E001", "C0001E002"],
+                                   "DENOMINACION": [f"{nombre} A", f"{nombre} B"],
+                                   "POTENCIA": [valor, "2"]})
+             for nombre in ac.DefaultExcelRepository.SHEETS_MAP if nombre not in sin}
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        for nombre, df in hojas.items():
+            df.to_excel(writer, sheet_name=nombre, index=False)
+
+
+class TestWorkbookCache(unittest.TestCase):
+    """DefaultExcelRepository reads each workbook once and reuses the parsed sheets."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.excel = self.temp_dir / "inventario.xlsx"
+        _escribir_libro(self.excel)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _repo(self, snapshot_dir=None):
+        return ac.DefaultExcelRepository(ac.WorkbookCache(snapshot_dir))
+
+    def _cargar_todo(self, repo):
+        return (repo.load_sheets_for_anexo2(self.excel), repo.load_sheets_for_anexo3(self.excel),
+                repo.load_sheets_for_anexo4(self.excel))
+
+    def test_workbook_opened_once_for_anexos_2_3_4(self):
+        repo = self._repo()
+        with mock.patch.object(ac.pd, "ExcelFile", wraps=pd.ExcelFile) as abrir:
+            a2, a3, a4 = self._cargar_todo(repo)
+            self._cargar_todo(repo)
+        self.assertEqual(abrir.call_count, 1)
+        self.assertEqual(list(a2), ["Conta"])
+        self.assertEqual(list(a3), ["Clima", "SistCC", "Eleva", "EqHoriz", "Ilum", "OtrosEq"])
+        self.assertEqual(a4["Envol"]["POTENCIA"].tolist(), [1.23, 2])
+
+    def test_modified_workbook_is_read_again(self):
+        repo = self._repo()
+        repo.load_sheets_for_anexo2(self.excel)
+        _escribir_libro(self.excel, valor="9.999")
+        st = self.excel.stat()
+        os.utime(self.excel, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        with mock.patch.object(ac.pd, "ExcelFile", wraps=pd.ExcelFile) as abrir:
+            conta = repo.load_sheets_for_anexo2(self.excel)["Conta"]
+        self.assertEqual(abrir.call_count, 1)
+        self.assertEqual(conta["POTENCIA"].tolist(), [10.0, 2])
+
+    def test_parquet_snapshot_round_trip(self):
+        snap = self.temp_dir / "cache_excel"
+        originales = self._cargar_todo(self._repo(snap))
+        with mock.patch.object(ac.pd, "ExcelFile", side_effect=AssertionError("Excel reabierto")):
+            desde_snapshot = self._cargar_todo(self._repo(snap))
+        for original, copia in zip(originales, desde_snapshot):
+            self.assertEqual(list(original), list(copia))
+            for hoja in original:
+                with self.subTest(hoja=hoja):
+                    pd.testing.assert_frame_equal(original[hoja], copia[hoja])
+
+    def test_missing_sheet_raises_value_error(self):
+        _escribir_libro(self.excel, sin=("Envol",))
+        repo = self._repo()
+        repo.load_sheets_for_anexo2(self.excel)
+        with self.assertRaisesRegex(ValueError, "Envol"):
+            repo.load_sheets_for_anexo4(self.excel)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,69 @@
+import unittest
+import tempfile
+import shutil
+import copy
+import io
+import contextlib
+import os
+import sys
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+# Add the interfaz directory to the Python path to import extraer_datos_word
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import extraer_datos_word as edw
+
+
+class TestCacheResolucion(unittest.TestCase):
+    """Declared photo names are resolved once per run; hits and misses are both memoized."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.ref = self.temp_dir / "C0001_CENTRO" / "Referencias"
+        self.ref.mkdir(parents=True)
+        for stem in ["C0001_FC0001", "E001_FE0001", "QE001_FQE0001", "QE001_FQE0002"]:
+            (self.ref / f"{stem}.jpg").write_bytes(b"jpg")
+        edw._file_index_cache.clear()
+        self.exact, self.normalized, _ = edw._build_optimized_photo_index(self.ref)
+
+    def tearDown(self):
+        edw._file_index_cache.clear()
+        edw._tree_listing_cache.clear()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_same_result_as_direct_resolution(self):
+        cache = edw._CacheResolucion()
+        nombres = ["E001_FE0001.jpg", "qe001_fqe0002", "QE001-FQE0003.jpg", "NADA_QUE_VER", "", "C0001_E001_FE0001"]
+        for umbral in (0.85, 0.5, 1.0):
+            for nombre in nombres * 2:
+                self.assertEqual(cache.resolve(nombre, self.exact, self.normalized, umbral),
+                                 edw._resolve_name_to_path_optimized(nombre, self.exact, self.normalized, umbral))
+        self.assertEqual(cache.consultas, 36)
+        self.assertEqual(cache.aciertos, 18)
+
+    def test_fuzzy_runs_once_per_slug(self):
+        cache = edw._CacheResolucion()
+        with mock.patch.object(edw, "_fuzzy_best_path", wraps=edw._fuzzy_best_path) as fuzzy:
+            for nombre in ["QE001 FQE0009", "QE001-FQE0009", "QE001_FQE0009.png", "QE001 FQE0009"]:
+                cache.resolve(nombre, self.exact, self.normalized, 0.85)
+        self.assertEqual(fuzzy.call_count, 1)
+        self.assertEqual(cache.contadores(), (4, 1, 1))
+
+    def test_hit_rate_in_statistics_output(self):
+        """PASO 1 and PASO 3 share the cache, so each declared name is resolved once."""
+        consul = pd.DataFrame([["", "C0001E001D0001QE001", "QE001_FQE0001.jpg; FALTA.jpg"]],
+                              columns=["EQ CLIMA EXT", "ID_EQCLIMAEXT2", "FOTO_EQ"])
+        ctx = [{"centro": {"id": "C0001"}, "edif": [{"id": "C0001E001",
+                                                     "equipos_clima": [{"id": "C0001E001D0001QE001"}]}]}]
+        buf = io.StringIO()
+        with contextlib.redirect_stdout(buf):
+            edw.add_photos_to_context(copy.deepcopy(ctx), consul, self.temp_dir, 0.85, False,
+                                      self.temp_dir, incluir_uris=False)
+        self.assertIn("Caché de resolución de fotos declaradas: 2/4 aciertos de caché (50.0%)", buf.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
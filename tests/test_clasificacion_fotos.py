@@ -0,0 +1,92 @@
+import unittest
+import tempfile
+import shutil
+import itertools
+import re
+import os
+import sys
+from pathlib import Path
+
+# Add the interfaz directory to the Python path to import extraer_datos_word
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import extraer_datos_word as edw
+
+
+def _filtro_clasico(foto_name, tipo, ident):
+    """Reference implementation: the per-photo regex filter PASO 3 used to run inline."""
+    foto_clean = foto_name.upper()
+    for prefix in ["FOTO_", "IMG_", "IMAGE_"]:
+        if foto_clean.startswith(prefix):
+            foto_clean = foto_clean[len(prefix):]
+            break
+    foto_id_part = foto_clean.split('_')[0]
+    incluir = foto_id_part in ident.upper()
+    if not incluir and tipo in edw.PATRON_MAPEO_TIPOS:
+        incluir = any(foto_clean.startswith(p) or p in foto_clean for p in edw.PATRON_MAPEO_TIPOS[tipo])
+    if not incluir:
+        if re.match(r'^[A-Z]{1,2}\d+', foto_id_part):
+            m = re.match(r'^([A-Z]{1,2})', foto_id_part)
+            if m and m.group(1) in ident.upper():
+                incluir = True
+        if (foto_id_part.startswith('B00') or foto_id_part.startswith('BOMB')) and tipo in ["EQHORIZ", "SISTCC", "ACOM"]:
+            incluir = True
+    if tipo == "CENTRO" and re.match(r'^C0*\d+$', foto_id_part):
+        incluir = True
+    if not incluir and tipo in ["DEPENDENCIA", "EDIFICIO"]:
+        numeros_entidad = re.findall(r'\d+', ident)
+        incluir = any(n in numeros_entidad for n in re.findall(r'\d+', foto_id_part))
+    if not incluir and tipo in ["EQHORIZ", "SISTCC", "CLIMA"]:
+        incluir = any(g in foto_clean for g in ["BOMBA", "BOMB", "EQUIP", "MAQUIN", "MOTOR", "PANEL"])
+    if not incluir and tipo == "ACOM":
+        incluir = any(c in foto_clean for c in ["CDRO", "CUADRO", "ELECT", "PANEL", "ARMARIO"])
+    return incluir
+
+
+class TestClasificacionFotos(unittest.TestCase):
+    """Photos are classified once at index time; the PASO 3 filter uses that classification."""
+
+    FOTOS = ["C0007_FC0001", "QE001_FQE0001", "C0007E001D0001QH002_FQH0003", "E001_FE0001",
+             "D0002_FD0001", "FOTO_B001_F001", "IMG_cuadro_ppal", "bomba_sala", "CR003_FCR0001",
+             "I0004_FI0002", "QV001_F002", "otros_motor", "_raro", "ACOMETIDA_1", "aula 5"]
+    ENTIDADES = [("CENTRO", "C0007"), ("EDIFICIO", "C0007E001"), ("DEPENDENCIA", "C0007E001D0002"),
+                 ("CLIMA", "C0007E001D0001QE001"), ("EQHORIZ", "C0007E001D0001QH002"),
+                 ("SISTCC", "C0007E001QG001"), ("ACOM", "C0007E001"), ("ILUM", "C0007E001I0004"),
+                 ("ENVOL", "C0007E001CR003"), ("ELEVA", "C0007E001QV001"), ("OTROSEQ", "C0008E002")]
+
+    def test_filter_matches_inline_regexes(self):
+        for foto, (tipo, ident) in itertools.product(self.FOTOS, self.ENTIDADES):
+            clase = edw._clasificar_foto(foto)
+            with self.subTest(foto=foto, tipo=tipo):
+                self.assertEqual(
+                    edw._incluir_foto_adicional(clase, tipo, ident.upper(), re.findall(r'\d+', ident)),
+                    _filtro_clasico(foto, tipo, ident),
+                )
+
+    def test_center_type_id_sequence(self):
+        clase = edw._clasificar_foto("C0007E001D0001QH002_FQH0003")
+        self.assertEqual((clase.centro, clase.tipo, clase.id, clase.secuencia),
+                         ("C0007", "EQHORIZ", "C0007E001D0001QH002", 3))
+        clase = edw._clasificar_foto("QE001_FQE0001", r"X:\FOTOS\C0012_COLEGIO\REFERENCIAS\QE001_FQE0001.JPG")
+        self.assertEqual((clase.centro, clase.tipo, clase.secuencia), ("C0012", "CLIMA", 1))
+        self.assertEqual(edw._clasificar_foto("CR003_FCR0001").tipo, "ENVOL")
+        # solo una carpeta C+dígitos cuenta como centro, no un "C0" dentro de otro nombre
+        clase = edw._clasificar_foto("E001_FE0001", "/TMP/TMPXC0Q1Z/C0003_CENTRO/REFERENCIAS/E001_FE0001.JPG")
+        self.assertEqual(clase.centro, "C0003")
+        self.assertEqual(edw._clasificar_foto("IMG_cuadro_ppal").tipo, "")
+
+    def test_index_entries_carry_classification(self):
+        temp_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+        foto = temp_dir / "C0003_CENTRO" / "Referencias" / "E001_FE0002.jpg"
+        foto.parent.mkdir(parents=True)
+        foto.write_bytes(b"jpg")
+        edw._file_index_cache.clear()
+        self.addCleanup(edw._file_index_cache.clear)
+        _, _, path_to_info = edw._build_optimized_photo_index(temp_dir)
+        clase = path_to_info[foto]["clase"]
+        self.assertEqual((clase.centro, clase.tipo, clase.id, clase.secuencia), ("C0003", "EDIFICIO", "E001", 2))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
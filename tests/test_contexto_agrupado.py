@@ -0,0 +1,74 @@
+import unittest
+import json
+import os
+import sys
+
+import pandas as pd
+
+# Add the interfaz directory to the Python path to import extraer_datos_word
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import extraer_datos_word as edw
+
+
+def _df(rows):
+    return pd.DataFrame(rows).astype(str)
+
+
+class TestContextoAgrupado(unittest.TestCase):
+    """build_context_grouped must produce exactly the same JSON as build_context."""
+
+    def setUp(self):
+        """Create a minimal inventory with every sheet shape we rely on."""
+        self.dfs = {k: None for k in edw.SHEETS}
+        self.dfs["CENT"] = _df([
+            {"ID CENTRO": "C0001", "CENTRO": "Colegio"},
+            {"ID CENTRO": "C0002", "CENTRO": "Polideportivo"},
+            {"ID CENTRO": "C0003", "CENTRO": "Sin edificios"},
+        ])
+        self.dfs["EDIF"] = _df([
+            {"ID CENTRO": "C0001", "ID EDIFICIO": "C0001E001", "EDIFICIO": "Principal"},
+            {"ID CENTRO": "C0001", "ID EDIFICIO": "C0001E002", "EDIFICIO": "Gimnasio"},
+            {"ID CENTRO": "C0002", "ID EDIFICIO": "C0002E001", "EDIFICIO": "Pabellón"},
+        ])
+        self.dfs["DEPEN"] = _df([
+            {"ID CENTRO": "C0001", "ID EDIFICIO": "C0001E002", "ID DEPENDENCIA": "C0001E002D0001"},
+            {"ID CENTRO": "C0001", "ID EDIFICIO": "C0001E001", "ID DEPENDENCIA": "C0001E001D0001"},
+            {"ID CENTRO": "C0001", "ID EDIFICIO": "C0001E001", "ID DEPENDENCIA": "C0001E001D0002"},
+        ])
+        self.dfs["ACOM"] = _df([
+            {"ID CENTRO": "C0001", "ID EDIFICIO": "C0001E001", "CT": "SI"},
+            {"ID CENTRO": "C0001", "ID EDIFICIO": "C0001E001", "CT": "NO"},
+            {"ID CENTRO": "C0002", "ID EDIFICIO": "C0002E001", "CT": "–"},
+        ])
+        # Sheet without ID EDIFICIO: every building of the center gets all of its rows
+        self.dfs["ILUM"] = _df([
+            {"ID CENTRO": "C0001", "ID": "C0001I001"},
+            {"ID CENTRO": "C0002", "ID": "C0002I001"},
+        ])
+        # Sheet without ID CENTRO: never contributes rows
+        self.dfs["CLIMA"] = _df([{"ID": "Q001"}])
+        self.dfs["ENVOL"] = pd.DataFrame()
+
+    def test_same_json_as_classic_builder(self):
+        """Both builders serialize to identical JSON."""
+        clasico = json.dumps(edw.build_context(self.dfs), ensure_ascii=False, indent=2)
+        agrupado = json.dumps(edw.build_context_grouped(self.dfs), ensure_ascii=False, indent=2)
+        self.assertEqual(agrupado, clasico)
+
+    def test_acom_ids_are_numbered(self):
+        """ACOM entries get the building id and a unique id, as in the classic builder."""
+        ctx = edw.build_context_grouped(self.dfs)
+        acom = ctx[0]["edif"][0]["acom"]
+        self.assertEqual([a["id"] for a in acom], ["C0001E001_ACOM_01", "C0001E001_ACOM_02"])
+        self.assertEqual(ctx[1]["edif"][0]["acom"][0]["id"], "C0002E001_ACOM")
+
+    def test_missing_center_sheet_raises(self):
+        """An empty CENT sheet is an error for both builders."""
+        self.dfs["CENT"] = pd.DataFrame()
+        with self.assertRaises(RuntimeError):
+            edw.build_context_grouped(self.dfs)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
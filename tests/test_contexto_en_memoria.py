@@ -0,0 +1,88 @@
+import unittest
+import tempfile
+import shutil
+import io
+import contextlib
+import os
+import sys
+from pathlib import Path
+from unittest import mock
+
+# Add the interfaz directory to the Python path to import render_a3 and extraer_datos_word
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import render_a3
+import extraer_datos_word as edw
+
+PLANTILLAS = Path(__file__).resolve().parent.parent / "word" / "anexos" / "plantillas_a3_unificadas"
+
+
+class TestContextoEnMemoria(unittest.TestCase):
+    """render_contexto_centro renders the same HTML as the JSON files + run_for_dir path."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        foto = self.temp_dir / "E001_FE0001.jpg"
+        foto.write_bytes(b"jpg")
+        f = {"path": str(foto), "name": "E001_FE0001"}
+        self.ctx = {
+            "centro": {"id": "C0001", "nombre": "Colegio Ñandú", "fotos": [f], "fotos_count": 1},
+            "edif": [
+                {"id": "C0001E001", "denominacion": "Aulario", "fotos": [f], "fotos_count": 1,
+                 "envolventes": [{"id": "C0001E001CR001", "denominacion": "Fachada norte"},
+                                 {"id": "C0001E001CR002", "denominacion": "Ventanas aula"}],
+                 "dependencias": [{"id": "C0001E001D0001", "denominacion": "Aula 1", "fotos": [f]}],
+                 "acom": [{"id": "C0001E001", "tipo": "Eléctrica"}],
+                 "equipos_clima": [{"id": "C0001E001D0001QE001", "centro_id": "PREVIO"}],
+                 "iluminacion": [{"id": "C0001E001D0001I0001"}]},
+                {"id": "C0001E002", "denominacion": "Gimnasio",
+                 "otros_equipos": [{"id": "C0001E002QO001"}], "elevadores": []},
+            ],
+        }
+
+    def tearDown(self):
+        render_a3.metrics.clear()
+        render_a3.UNRESOLVED_PLACEHOLDERS.clear()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _html(self, out):
+        return {str(p.relative_to(out)): p.read_bytes() for p in sorted(out.rglob("*.html"))}
+
+    def test_same_html_as_json_files(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            render_a3.configure(self.temp_dir / "json", self.temp_dir / "ficheros", PLANTILLAS)
+            carpeta = self.temp_dir / "json" / "C0001_COLEGIO"
+            edw._generar_jsons_por_tipo(self.ctx, carpeta)
+            render_a3.run_for_dir(carpeta)
+            render_a3.configure(self.temp_dir / "json", self.temp_dir / "memoria", PLANTILLAS)
+            with mock.patch.object(render_a3.json, "loads") as loads:
+                centro_id = render_a3.render_contexto_centro(self.ctx)
+        self.assertEqual(loads.call_count, 0)
+        self.assertEqual(centro_id, "C0001")
+        ficheros = self._html(self.temp_dir / "ficheros")
+        self.assertEqual(len(ficheros), 10)
+        self.assertEqual(self._html(self.temp_dir / "memoria"), ficheros)
+
+    def test_views_match_per_type_json(self):
+        """The in-memory views carry the same data as the files written by _generar_jsons_por_tipo."""
+        carpeta = self.temp_dir / "json"
+        with contextlib.redirect_stdout(io.StringIO()):
+            edw._generar_jsons_por_tipo(self.ctx, carpeta)
+        vistas = render_a3.vistas_por_tipo(self.ctx)
+        self.assertEqual([fn for fn, _ in vistas][:3],
+                         [render_a3.render_centro, render_a3.render_edificios, render_a3.render_envolventes])
+        for fn, data in vistas:
+            with self.subTest(render=fn.__name__):
+                # la misma función por fichero que run_for_dir
+                procesado = render_a3.json.loads((carpeta / {
+                    render_a3.render_centro: "centro.json", render_a3.render_edificios: "edificios.json",
+                    render_a3.render_envolventes: "envol.json", render_a3.render_dependencias: "dependencias.json",
+                    render_a3.render_acometida: "acom.json", render_a3.render_clima: "clima.json",
+                    render_a3.render_iluminacion: "ilum.json", render_a3.render_otrosequipos: "otroseq.json",
+                }[fn]).read_text(encoding="utf-8"))
+                procesado.pop("resumen", None)
+                self.assertEqual(data, procesado)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,173 @@
+import unittest
+import tempfile
+import shutil
+import threading
+import gzip
+import os
+import sys
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from unittest import mock
+
+# Add the aplicacion_carga_datos directory to the Python path to import obtener_fotos_optimizado
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "aplicacion_carga_datos"))
+
+import obtener_fotos_optimizado as ofo
+
+
+class _FotoHandler(BaseHTTPRequestHandler):
+    """Minimal photo server with ETag, If-None-Match and Range/If-Range support."""
+
+    body = b""
+    etag = '"v1"'
+    log = []
+    gzip_siempre = False  # comprime aunque el cliente pida identity
+
+    def do_GET(self):
+        cls = type(self)
+        cls.log.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == cls.etag:
+            self.send_response(304)
+            self.send_header("ETag", cls.etag)
+            self.end_headers()
+            return
+        data, status = cls.body, 200
+        rng = self.headers.get("Range")
+        if rng and self.headers.get("If-Range", cls.etag) == cls.etag:
+            start = int(rng.split("=")[1].rstrip("-"))
+            data, status = cls.body[start:], 206
+        self.send_response(status)
+        self.send_header("ETag", cls.etag)
+        self.send_header("Last-Modified", "Wed, 01 Oct 2025 10:00:00 GMT")
+        if cls.gzip_siempre:
+            data = gzip.compress(data)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestDescargaIncremental(unittest.TestCase):
+    """Tests for the conditional / resumable download path of FotoExtractorExcel."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _FotoHandler)
+        threading.Thread(target=cls.httpd.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.httpd.server_address[1]}/foto.jpg"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.httpd.shutdown()
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        _FotoHandler.body = bytes(range(256)) * 1024
+        _FotoHandler.etag = '"v1"'
+        _FotoHandler.log = []
+        _FotoHandler.gzip_siempre = False
+        self.target = self.temp_dir / "C001" / "Referencias" / "CENTRO" / "C001_F001.jpg"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _extractor(self, **kw):
+        ext = ofo.FotoExtractorExcel(Path("no_usado.xlsx"), photos_dir=self.temp_dir, **kw)
+        self.addCleanup(ext.session.close)
+        return ext
+
+    def test_second_run_is_conditional(self):
+        """A re-run sends If-None-Match and gets a 304 without re-downloading."""
+        ext = self._extractor()
+        self.assertEqual(ext._fetch_to_file(self.url, self.target), "descargada")
+        ext.save_manifest()
+        self.assertEqual(self.target.read_bytes(), _FotoHandler.body)
+
+        ext2 = self._extractor()
+        self.assertEqual(ext2._fetch_to_file(self.url, self.target), "sin_cambios")
+        self.assertEqual(_FotoHandler.log[-1].get("If-None-Match"), '"v1"')
+
+    def test_changed_resource_is_downloaded_again(self):
+        ext = self._extractor()
+        ext._fetch_to_file(self.url, self.target)
+        _FotoHandler.body, _FotoHandler.etag = b"nueva foto", '"v2"'
+        self.assertEqual(ext._fetch_to_file(self.url, self.target), "descargada")
+        self.assertEqual(self.target.read_bytes(), b"nueva foto")
+
+    def test_partial_file_is_resumed_with_range(self):
+        """An interrupted download continues from the .part file using Range + If-Range."""
+        ext = self._extractor()
+        ext._manifest[self.url] = {"path": self.target.name, "etag": '"v1"', "last_modified": None, "size": None}
+        part = self.target.with_name(self.target.name + ".part")
+        part.parent.mkdir(parents=True)
+        part.write_bytes(_FotoHandler.body[:1000])
+        self.assertEqual(ext._fetch_to_file(self.url, self.target), "reanudada")
+        self.assertEqual(_FotoHandler.log[-1].get("Range"), "bytes=1000-")
+        self.assertEqual(self.target.read_bytes(), _FotoHandler.body)
+        self.assertFalse(part.exists())
+
+    def test_valid_file_skipped_without_network(self):
+        ext = self._extractor()
+        ext._fetch_to_file(self.url, self.target)
+        ext.revalidar = False
+        peticiones = len(_FotoHandler.log)
+        self.assertEqual(ext._fetch_to_file(self.url, self.target), "sin_cambios")
+        self.assertEqual(len(_FotoHandler.log), peticiones)
+
+    def test_gzip_encoded_response_is_not_reported_incomplete(self):
+        """Content-Length counts gzip bytes; the decoded photo must still be accepted."""
+        _FotoHandler.gzip_siempre = True
+        ext = self._extractor()
+        self.assertEqual(ext._fetch_to_file(self.url, self.target), "descargada")
+        self.assertEqual(self.target.read_bytes(), _FotoHandler.body)
+        self.assertEqual(_FotoHandler.log[-1].get("Accept-Encoding"), "identity")
+
+    def test_gzip_encoded_partial_response_restarts_download(self):
+        """A 206 with Content-Encoding cannot be appended at a decoded offset: start over."""
+        _FotoHandler.gzip_siempre = True
+        ext = self._extractor()
+        ext._manifest[self.url] = {"path": self.target.name, "etag": '"v1"', "last_modified": None, "size": None}
+        part = self.target.with_name(self.target.name + ".part")
+        part.parent.mkdir(parents=True)
+        part.write_bytes(_FotoHandler.body[:1000])
+        self.assertEqual(ext._fetch_to_file(self.url, self.target), "descargada")
+        self.assertEqual([h.get("Range") for h in _FotoHandler.log], ["bytes=1000-", None])
+        self.assertEqual(self.target.read_bytes(), _FotoHandler.body)
+        self.assertFalse(part.exists())
+
+    def test_concurrent_manifest_saves_do_not_collide(self):
+        ext = self._extractor()
+        for n in range(200):
+            ext._manifest[f"{self.url}?n={n}"] = {"path": f"F{n}.jpg", "etag": None, "last_modified": None, "size": n}
+        errores = []
+        salida = threading.Barrier(10)
+
+        def guardar():
+            salida.wait()
+            try:
+                for _ in range(20):
+                    ext.save_manifest()
+            except Exception as e:
+                errores.append(e)
+
+        hilos = [threading.Thread(target=guardar) for _ in range(10)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        self.assertEqual(errores, [])
+        self.assertEqual(len(ext._load_manifest(self.temp_dir / ofo.DOWNLOAD_MANIFEST_NAME)), 200)
+
+    def test_manifest_write_error_does_not_fail_download(self):
+        ext = self._extractor()
+        with mock.patch.object(ofo, "MANIFEST_SAVE_EVERY", 1), \
+                mock.patch.object(ext, "save_manifest", side_effect=OSError("disco lleno")):
+            self.assertEqual(ext._fetch_to_file(self.url, self.target), "descargada")
+        self.assertEqual(self.target.read_bytes(), _FotoHandler.body)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,119 @@
+import unittest
+import asyncio
+import tempfile
+import shutil
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add the interfaz directory to the Python path to import html2pdf_a3_fast
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import html2pdf_a3_fast as h2p
+
+
+class PaginaFalsa:
+    """Minimal stand-in for a Playwright page that records the calls made on it."""
+
+    def __init__(self, listo=True, retardo=0.0, falla=False):
+        self.llamadas = []
+        self.listo, self.retardo, self.falla = listo, retardo, falla
+
+    async def goto(self, url, wait_until=None):
+        self.llamadas.append(("goto", wait_until))
+
+    async def evaluate(self, script, arg=None, timeout=None):
+        self.llamadas.append(("evaluate", arg))
+        if self.falla:
+            raise RuntimeError("Execution context was destroyed")
+        await asyncio.sleep(self.retardo)
+        return {"ready": self.listo, "imgs": 3}
+
+    async def wait_for_load_state(self, state, timeout=None):
+        self.llamadas.append(("wait_for_load_state", state))
+
+    async def wait_for_timeout(self, ms):
+        self.llamadas.append(("wait_for_timeout", ms))
+
+    async def emulate_media(self, media=None):
+        self.llamadas.append(("emulate_media", media))
+
+    async def pdf(self, **opts):
+        self.llamadas.append(("pdf", opts["path"]))
+        Path(opts["path"]).write_bytes(b"%PDF-1.4")
+
+    def is_closed(self):
+        return False
+
+
+class TestEsperaAdaptativa(unittest.TestCase):
+    """Pages are printed once images and fonts are ready, never after a fixed delay."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.pdf = self.temp_dir / "C0001_centro.pdf"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_adaptive_render_skips_fixed_waits(self):
+        for render in (h2p.render_one_fast, h2p.render_one):
+            with self.subTest(render=render.__name__):
+                page = PaginaFalsa(retardo=0.02)
+                info = asyncio.run(render(page, "http://x/a.html", self.pdf, 1.0, True, 900, ready_ms=4000))
+                nombres = [c[0] for c in page.llamadas]
+                self.assertEqual(nombres, ["goto", "emulate_media", "evaluate", "pdf"])
+                self.assertEqual(page.llamadas[2], ("evaluate", 4000))
+                self.assertTrue(info["ready"])
+                self.assertGreaterEqual(info["ms"], 20)
+
+    def test_fixed_mode_keeps_previous_waits(self):
+        page = PaginaFalsa()
+        self.assertIsNone(asyncio.run(h2p.render_one_fast(page, "http://x/a.html", self.pdf, 1.0, True, 900)))
+        self.assertIn(("wait_for_timeout", 900), page.llamadas)
+        self.assertIn(("wait_for_load_state", "networkidle"), page.llamadas)
+
+    def test_readiness_errors_do_not_block_the_pdf(self):
+        page = PaginaFalsa(falla=True)
+        info = asyncio.run(h2p.render_one_fast(page, "http://x/a.html", self.pdf, 1.0, True, 900, ready_ms=100))
+        self.assertFalse(info["ready"])
+        self.assertEqual(page.llamadas[-1], ("pdf", str(self.pdf)))
+
+    def test_budget_from_args(self):
+        self.assertEqual(h2p.ready_budget_ms(h2p.parse_args(["--data", "x"])), h2p.READY_TIMEOUT_DEFAULT_MS)
+        self.assertEqual(h2p.ready_budget_ms(h2p.parse_args(["--data", "x", "--ready-timeout", "2500"])), 2500)
+        self.assertIsNone(h2p.ready_budget_ms(h2p.parse_args(["--data", "x", "--espera", "fija"])))
+        self.assertEqual(h2p.ready_budget_ms(SimpleNamespace(wait=500)), h2p.READY_TIMEOUT_DEFAULT_MS)
+
+    def test_page_timeout_covers_ready_budget(self):
+        ultra = h2p.parse_args(["--data", "x", "--ultra-fast"])
+        # goto (5 s) + espera adaptativa (presupuesto + 5 s) + margen de impresión
+        minimo = 5.0 + h2p.READY_TIMEOUT_DEFAULT_MS / 1000 + 5.0 + h2p.PRINT_MARGIN_S
+        self.assertGreaterEqual(h2p._page_timeout(ultra, 0), minimo)
+        corto = h2p.parse_args(["--data", "x", "--ultra-fast", "--ready-timeout", "1000"])
+        self.assertEqual(h2p._page_timeout(corto, 0), 5.0 + 1.0 + 5.0 + h2p.PRINT_MARGIN_S)
+        fija = h2p.parse_args(["--data", "x", "--fast", "--espera", "fija", "--wait", "200"])
+        self.assertEqual(h2p._page_timeout(fija, 0), 30.0)
+
+        robusto = h2p.parse_args(["--data", "x"])
+        self.assertEqual((h2p._page_timeout(robusto, 0), h2p._page_timeout(robusto, 1)), (120.0, 180.0))
+        largo = h2p.parse_args(["--data", "x", "--ready-timeout", "60000"])
+        # dos intentos con espera adaptativa (presupuesto y doble presupuesto) + último intento
+        self.assertGreater(h2p._page_timeout(largo, 0), 15.0 + 65.0 + 10.0 + 125.0 + 6.0)
+
+    def test_ready_times_are_recorded(self):
+        tiempos = {Path(f"p{i}.pdf"): {"ready": i != 3, "ms": float(10 * i)} for i in range(1, 11)}
+        resumen = h2p.ready_summary(tiempos)
+        self.assertIn("10 páginas listas en media 55 ms", resumen)
+        self.assertIn("máx 100 ms", resumen)
+        self.assertIn("1 agotaron el presupuesto", resumen)
+
+        out = self.temp_dir / "pdf"
+        manifest = h2p.RenderManifest(out)
+        manifest.record(out / "C0001" / "a.pdf", {"html": "h", "assets": {}}, "opts", ready_ms=123.4)
+        self.assertEqual(manifest.entries["C0001/a.pdf"]["ready_ms"], 123.4)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
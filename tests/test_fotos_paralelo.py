@@ -0,0 +1,76 @@
+import unittest
+import tempfile
+import shutil
+import copy
+import json
+import io
+import re
+import contextlib
+import os
+import sys
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+# Add the interfaz directory to the Python path to import extraer_datos_word
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import extraer_datos_word as edw
+
+
+class TestInyeccionParalela(unittest.TestCase):
+    """add_photos_to_context with workers > 1 must give exactly the sequential output."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.fotos = self.temp_dir / "fotos"
+        self.ctx = []
+        consul = []
+        for n in range(1, 4):
+            cid = f"C000{n}"
+            ref = self.fotos / f"{cid}_CENTRO" / "Referencias"
+            ref.mkdir(parents=True)
+            for stem in [f"{cid}_FC0001", "E001_FE0001", "E001_FE0002", "D0001_FD0001",
+                         "QE001_FQE0001", "IMG_cuadro_ppal", "bomba_sala"]:
+                (ref / f"{stem}.jpg").write_bytes(b"jpg")
+            edif = {"id": f"{cid}E001", "dependencias": [{"id": f"{cid}E001D0001"}],
+                    "equipos_clima": [{"id": f"{cid}E001D0001QE001"}], "acom": [{"id": f"{cid}E001"}]}
+            self.ctx.append({"centro": {"id": cid}, "edif": [edif]})
+            consul.append(["", f"{cid}E001D0001QE001", f"QE001_FQE0001.jpg; NO_EXISTE_{n}.jpg"])
+        self.consul = pd.DataFrame(consul, columns=["EQ CLIMA EXT", "ID_EQCLIMAEXT2", "FOTO_EQ"])
+
+    def tearDown(self):
+        edw._file_index_cache.clear()
+        edw._tree_listing_cache.clear()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _run(self, workers, outdir):
+        outdir.mkdir()
+        edw._file_index_cache.clear()
+        edw._tree_listing_cache.clear()
+        vistos = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            ctx, falt = edw.add_photos_to_context(copy.deepcopy(self.ctx), self.consul, self.fotos,
+                                                  edw.FUZZY_THRESHOLD_DEFAULT, True, outdir,
+                                                  incluir_uris=False, workers=workers,
+                                                  on_center=lambda c: vistos.append(c["centro"]["id"]))
+        # La marca "Generado: <fecha>" depende del segundo en que se escribe cada fichero
+        testers = {p.name: re.sub(r"(?m)^Generado: .*$", "Generado: <fecha>", p.read_text(encoding="utf-8"))
+                   for p in sorted(outdir.iterdir())}
+        return json.dumps([ctx, falt], ensure_ascii=False), testers, vistos
+
+    def test_parallel_output_is_identical(self):
+        serie = self._run(1, self.temp_dir / "serie")
+        with mock.patch.object(edw, "ProcessPoolExecutor", wraps=edw.ProcessPoolExecutor) as pool:
+            paralelo = self._run(2, self.temp_dir / "paralelo")
+        # los workers arrancan con spawn (sin heredar hilos ni locks del proceso principal)
+        self.assertEqual(pool.call_args.kwargs["mp_context"].get_start_method(), "spawn")
+        self.assertEqual(serie[0], paralelo[0])
+        self.assertEqual(serie[1], paralelo[1])
+        self.assertEqual(paralelo[2], ["C0001", "C0002", "C0003"])
+        self.assertIn("NO_EXISTE_2", serie[0])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
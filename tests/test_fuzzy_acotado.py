@@ -0,0 +1,75 @@
+import unittest
+import random
+import string
+import os
+import sys
+from pathlib import Path
+
+# Add the interfaz directory to the Python path to import extraer_datos_word
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import extraer_datos_word as edw
+
+
+class TestFuzzyAcotado(unittest.TestCase):
+    """The pruned fuzzy matcher must pick the same photo as the full SequenceMatcher scan."""
+
+    def setUp(self):
+        self.rng = random.Random(17)
+        self.index = {}
+        for i in range(400):
+            clave = self._nombre()
+            self.index.setdefault(clave, []).append(Path(f"/fotos/{clave}_{i}.jpg"))
+        edw._fuzzy_index_cache.clear()
+
+    def tearDown(self):
+        edw._fuzzy_index_cache.clear()
+
+    def _nombre(self):
+        rng = self.rng
+        partes = [f"C{rng.randint(1, 6):04d}"] if rng.random() < 0.5 else []
+        partes.append(rng.choice(["E", "D", "QE", "QH", "CR", "I", "B"]) + f"{rng.randint(1, 20):03d}")
+        partes.append("F" + rng.choice(["E", "D", "QE", "C"]) + f"{rng.randint(1, 9):04d}")
+        if rng.random() < 0.2:
+            partes.append(rng.choice(["BOMBA", "CUADROPPAL", "ACOMETIDA"]))
+        return "".join(partes)
+
+    def _errata(self, s):
+        rng = self.rng
+        s = list(s)
+        for _ in range(rng.randint(0, 3)):
+            pos = rng.randrange(len(s))
+            op = rng.random()
+            if op < 0.33:
+                s.pop(pos)
+            elif op < 0.66:
+                s.insert(pos, rng.choice(string.ascii_uppercase + string.digits))
+            else:
+                s[pos] = rng.choice(string.ascii_uppercase + string.digits)
+        return "".join(s)
+
+    def test_same_result_as_full_scan(self):
+        objetivos = [self._errata(self._nombre()) for _ in range(60)] + ["A", "QE", "X" * 40]
+        objetivos += self.rng.sample(list(self.index), 5)
+        for umbral in (0.95, 0.85, 0.6, 0.3, 0.0):
+            for objetivo in objetivos:
+                with self.subTest(umbral=umbral, objetivo=objetivo):
+                    self.assertEqual(edw._fuzzy_best_path(objetivo, self.index, umbral),
+                                     edw._fuzzy_best_path_scan(objetivo, self.index, umbral))
+
+    def test_ties_keep_first_key(self):
+        index = {"QE001FQE0001": [Path("a.jpg")], "QE001FQE0003": [Path("b.jpg")]}
+        self.assertEqual(edw._fuzzy_best_path("QE001FQE0002", index, 0.8), Path("a.jpg"))
+
+    def test_full_ratio_only_on_few_candidates(self):
+        motor = edw._get_fuzzy_index(self.index)
+        objetivos = [self._errata(self._nombre()) for _ in range(30)]
+        for objetivo in objetivos:
+            edw._fuzzy_best_path(objetivo, self.index, edw.FUZZY_THRESHOLD_DEFAULT)
+        self.assertIs(edw._get_fuzzy_index(self.index), motor)
+        self.assertEqual(motor.stats["consultas"], 30)
+        self.assertLess(motor.stats["ratios"], len(objetivos) * len(self.index) // 10)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
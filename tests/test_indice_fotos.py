@@ -0,0 +1,162 @@
+import unittest
+import tempfile
+import shutil
+import sqlite3
+import io
+import contextlib
+import os
+import sys
+from pathlib import Path
+from unittest import mock
+
+# Add the interfaz directory to the Python path to import extraer_datos_word
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import extraer_datos_word as edw
+
+
+class TestIndicePersistenteFotos(unittest.TestCase):
+    """Tests for the persistent photo index used by _build_optimized_photo_index."""
+
+    def setUp(self):
+        """Create a small photo tree with a couple of centers."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.root = self.temp_dir / "fotos"
+        ref = self.root / "C0007_CENTRO" / "Referencias"
+        (ref / "sub").mkdir(parents=True)
+        (self.root / "C0016_COLEGIO").mkdir(parents=True)
+        for p in [
+            ref / "E001_FE0001.jpg",
+            ref / "sub" / "QI007_FQI0001.JPG",
+            self.root / "C0016_COLEGIO" / "D0001_FD0001.png",
+            self.root / "notas.txt",
+        ]:
+            p.write_bytes(b"x")
+        self.db = self.temp_dir / "indice.sqlite"
+
+    def tearDown(self):
+        """Reset module caches and remove temporary files."""
+        edw._set_photo_index_store(None)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _build(self):
+        edw._set_photo_index_store(self.db)
+        return edw._build_optimized_photo_index(self.root)
+
+    def test_same_triple_as_full_walk(self):
+        """The persistent index returns the same triple as a plain rglob walk."""
+        edw._set_photo_index_store(None)
+        expected = edw._build_optimized_photo_index(self.root)
+        first = self._build()
+        second = self._build()
+        self.assertEqual(first, expected)
+        self.assertEqual(second, expected)
+
+    def test_listing_order_matches_rglob(self):
+        """Files are listed in the same order as root.rglob('*')."""
+        edw._set_photo_index_store(self.db)
+        listed = [p for p, _ in edw._list_tree_files(self.root)]
+        expected = [p for p in self.root.rglob("*") if p.is_file()]
+        self.assertEqual(listed, expected)
+
+    def test_new_photo_is_picked_up(self):
+        """A photo added after the first run appears once its folder mtime changes."""
+        self._build()
+        nueva = self.root / "C0016_COLEGIO" / "D0002_FD0001.jpg"
+        nueva.write_bytes(b"x")
+        os.utime(nueva.parent, ns=(0, nueva.parent.stat().st_mtime_ns + 10**9))
+        exact_index, _, path_to_info = self._build()
+        self.assertIn("D0002_FD0001", exact_index)
+        self.assertIn(nueva, path_to_info)
+
+    def test_removed_folder_is_forgotten(self):
+        """Removing a whole subfolder drops its photos from the index."""
+        self._build()
+        shutil.rmtree(self.root / "C0007_CENTRO" / "Referencias" / "sub")
+        os.utime(self.root / "C0007_CENTRO" / "Referencias",
+                 ns=(0, (self.root / "C0007_CENTRO" / "Referencias").stat().st_mtime_ns + 10**9))
+        exact_index, _, _ = self._build()
+        self.assertNotIn("QI007_FQI0001", exact_index)
+        self.assertIn("E001_FE0001", exact_index)
+
+
+    def test_read_only_store_does_not_abort_the_walk(self):
+        """A store that cannot be written (read-only or locked) is dropped with a single warning."""
+        edw._set_photo_index_store(None)
+        expected = edw._build_optimized_photo_index(self.root)
+        buf = io.StringIO()
+        with mock.patch.object(edw._PhotoIndexStore, "put",
+                               side_effect=sqlite3.OperationalError("attempt to write a readonly database")) as put, \
+                contextlib.redirect_stdout(buf):
+            resultado = self._build()
+        self.assertEqual(resultado, expected)
+        self.assertEqual(put.call_count, 1)
+        self.assertEqual(buf.getvalue().count("no escribible"), 1)
+
+    def test_default_store_lives_outside_the_photo_tree(self):
+        """The default DB goes to the user cache, so reruns do not touch the root's mtime."""
+        cache = self.temp_dir / "cache"
+        with mock.patch.object(edw, "PHOTO_INDEX_CACHE_DIR", cache):
+            db = edw.default_photo_index_path(self.root)
+            self.assertEqual(db, edw.default_photo_index_path(self.root / "."))
+            self.assertNotEqual(db, edw.default_photo_index_path(self.temp_dir / "otras"))
+        self.assertEqual(db.parent, cache)
+        mtime = self.root.stat().st_mtime_ns
+        logs = []
+        for _ in range(3):
+            edw._set_photo_index_store(db)
+            buf = io.StringIO()
+            with contextlib.redirect_stdout(buf):
+                edw._build_optimized_photo_index(self.root)
+            logs.append(buf.getvalue())
+        self.assertTrue(db.exists())
+        self.assertEqual(self.root.stat().st_mtime_ns, mtime)
+        self.assertEqual(sorted(p.name for p in self.root.iterdir()), ["C0007_CENTRO", "C0016_COLEGIO", "notas.txt"])
+        self.assertIn("5 carpetas sin cambios, 0 re-escaneadas", logs[-1])
+
+class TestMotorBusquedaFotos(unittest.TestCase):
+    """Tests for the prefix / n-gram lookup behind _fallback_candidates_optimized."""
+
+    def setUp(self):
+        """Build a photo index spread over several centers."""
+        self.path_to_info = {}
+        self.normalized_index = {}
+        for centro in ["C0007_TEST", "C0049_COLEGIO", "C0016_COLEGIO"]:
+            for stem in ["QI007_FQI0001", "E001_FE0001", "D0001_FD0001", "C001_FC0001", "CDRO_PPAL_01"]:
+                p = Path(f"C:/SONINGEO/{centro}/Referencias/{stem}.jpg")
+                self.path_to_info[p] = {"stem": stem, "realpath": str(p)}
+                self.normalized_index.setdefault(edw._norm_slug_cached(stem), []).append(p)
+
+    def _fallback(self, ident, tipo, max_photos=6):
+        return edw._fallback_candidates_optimized(
+            ident, {}, self.normalized_index, self.path_to_info, max_photos=max_photos, tipo=tipo
+        )
+
+    def test_equipment_only_from_own_center(self):
+        """Equipment photos are restricted to the entity's own center folder."""
+        result = self._fallback("C0007E001D0007QI007", "CLIMA")
+        self.assertEqual([p.stem for p in result], ["QI007_FQI0001"])
+        self.assertIn("C0007", str(result[0]).upper())
+
+    def test_building_and_center_types(self):
+        """Building and center lookups return the expected photo of the center."""
+        self.assertEqual([p.stem for p in self._fallback("C0016E001", "EDIFICIO")], ["E001_FE0001"])
+        self.assertEqual([p.stem for p in self._fallback("C0049", "CENTRO")], ["C001_FC0001"])
+        self.assertEqual([p.stem for p in self._fallback("C0049E001_ACOM", "ACOM")], ["CDRO_PPAL_01"])
+
+    def test_lookup_cache_released_with_index_store(self):
+        """Changing the index store drops the lookup engines that keep old indexes alive."""
+        self._fallback("C0049", "CENTRO")
+        self.assertIn(id(self.normalized_index), edw._photo_lookup_cache)
+        edw._set_photo_index_store(None)
+        self.assertEqual(edw._photo_lookup_cache, {})
+
+    def test_search_by_id_uses_normalized_keys(self):
+        """_buscar_fotos_por_id_optimized finds every photo whose key contains the leaf ID."""
+        result = edw._buscar_fotos_por_id_optimized("C0007E001D0001", self.normalized_index, self.path_to_info)
+        self.assertEqual(len(result), 3)
+        self.assertTrue(all(p.stem == "D0001_FD0001" for p in result))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
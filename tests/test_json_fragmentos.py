@@ -0,0 +1,107 @@
+import unittest
+import tempfile
+import shutil
+import json
+import io
+import contextlib
+import os
+import sys
+from pathlib import Path
+from unittest import mock
+
+# Add the interfaz directory to the Python path to import extraer_datos_word
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import extraer_datos_word as edw
+
+
+def _jsons_clasicos(contexto_centro, carpeta):
+    """Reference implementation: one json.dumps(indent=2) per file, as _generar_jsons_por_tipo used to do."""
+    carpeta.mkdir(parents=True, exist_ok=True)
+    escribir = lambda nombre, obj: (carpeta / nombre).write_text(
+        json.dumps(obj, ensure_ascii=False, indent=2), encoding="utf-8")
+    escribir("completo.json", contexto_centro)
+    centro_info = contexto_centro.get("centro", {})
+    edificios = contexto_centro.get("edif", [])
+    escribir("centro.json", {"centro": centro_info})
+    escribir("edificios.json", {"centro": centro_info, "edificios": [
+        {k: v for k, v in e.items() if k not in edw._SECCIONES_EDIFICIO} for e in edificios]})
+    for tipo_key, archivo in edw._SECCIONES_EDIFICIO.items():
+        elementos = []
+        for edif in edificios:
+            for elemento in edif.get(tipo_key, []):
+                e = elemento.copy()
+                e.update({"edificio_id": edif.get("id"), "edificio_nombre": edif.get("denominacion", ""),
+                          "centro_id": centro_info.get("id"), "centro_nombre": centro_info.get("nombre", "")})
+                elementos.append(e)
+        if elementos:
+            escribir(archivo, {"centro": centro_info, tipo_key: elementos, "resumen": {
+                "total_elementos": len(elementos), "tipo": tipo_key,
+                "total_fotos": sum(e.get("fotos_count", 0) for e in elementos)}})
+
+
+class TestEscritorJson(unittest.TestCase):
+    """Entity subtrees are serialized once and reused; the indented output is byte-identical."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        foto = {"nombre": "E001_FE0001.jpg", "ruta": "C:\\fotos\\E001_FE0001.jpg", "ancho": 1.5}
+        self.ctx = {
+            "centro": {"id": "C0001", "nombre": "Colegio Ñandú \"Sur\"", "fotos": [foto], "fotos_count": 1,
+                       "vacio": {}, "lista_vacia": []},
+            "edif": [
+                {"id": "C0001E001", "denominacion": "Aulario", "fotos": [foto], "fotos_count": 1,
+                 "dependencias": [{"id": "C0001E001D0001", "fotos": [], "fotos_count": 0}],
+                 "equipos_clima": [{"id": "C0001E001D0001QE001", "centro_id": "PREVIO", "fotos_count": 2,
+                                    "fotos": [foto, foto]}, {}],
+                 "acom": []},
+                {"id": "C0001E002", "dependencias": [{"id": "C0001E002D0001", "n": None, "ok": True}]},
+            ],
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _leer(self, carpeta):
+        return {p.name: p.read_bytes() for p in sorted(carpeta.iterdir())}
+
+    def test_indented_files_are_byte_identical(self):
+        _jsons_clasicos(self.ctx, self.temp_dir / "clasico")
+        with contextlib.redirect_stdout(io.StringIO()):
+            edw._generar_jsons_por_tipo(self.ctx, self.temp_dir / "nuevo")
+        self.assertEqual(self._leer(self.temp_dir / "nuevo"), self._leer(self.temp_dir / "clasico"))
+
+    def test_combined_reuses_center_fragments(self):
+        escritor = edw._EscritorJson()
+        otro = json.loads(json.dumps(self.ctx))
+        otro["centro"]["id"] = "C0002"
+        todos = [self.ctx, otro]
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i, c in enumerate(todos):
+                edw._generar_jsons_por_tipo(c, self.temp_dir / str(i), escritor)
+        with mock.patch.object(escritor, "valor", wraps=escritor.valor) as valor:
+            combinado = escritor.lista([escritor.contexto_centro(c) for c in todos])
+        self.assertEqual(valor.call_count, 0)
+        self.assertEqual(combinado, json.dumps(todos, ensure_ascii=False, indent=2))
+
+    def test_compact_format_same_data(self):
+        _jsons_clasicos(self.ctx, self.temp_dir / "clasico")
+        with contextlib.redirect_stdout(io.StringIO()):
+            edw._generar_jsons_por_tipo(self.ctx, self.temp_dir / "compacto", edw._EscritorJson(compacto=True))
+        clasico = self._leer(self.temp_dir / "clasico")
+        compacto = self._leer(self.temp_dir / "compacto")
+        self.assertEqual(compacto.keys(), clasico.keys())
+        for nombre in clasico:
+            with self.subTest(nombre=nombre):
+                self.assertNotIn(b"\n", compacto[nombre])
+                self.assertEqual(json.loads(compacto[nombre]), json.loads(clasico[nombre]))
+                self.assertLess(len(compacto[nombre]), len(clasico[nombre]))
+
+    def test_compact_without_orjson(self):
+        with mock.patch.object(edw, "orjson", None):
+            texto = edw._EscritorJson(compacto=True).contexto_centro(self.ctx)
+        self.assertEqual(texto, json.dumps(self.ctx, ensure_ascii=False, separators=(",", ":")))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,69 @@
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+# Add the interfaz directory to the Python path to import extraer_datos_word
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import extraer_datos_word as edw
+
+
+class TestLecturaUnicaExcel(unittest.TestCase):
+    """_read_all_sheets and _read_consul share a single open of the workbook."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.xlsx = self.temp_dir / "inventario.xlsx"
+        centro = pd.DataFrame({"ID_CENTRO": ["C0001", "C0002"], "NOMBRE": ["Colegio A", " Colegio B "]})
+        consul = pd.DataFrame(
+            [["x", "", "C0001", "C0001_F1.jpg; C0001_F2.jpg", "", "", "E001", "E001_FE1.jpg", "nota"],
+             ["y", "", "C0002", "C0002_F1.jpg", "", "", "", "", ""]],
+            columns=["OTRA", "CENTRO", "ID_CENTRO", "FOTO_CENTRO", "COMENTARIO",
+                     "EDIFICIO", "ID_EDIFICIO2", "FOTO_EDIFICIO", "OBS"],
+        )
+        with pd.ExcelWriter(self.xlsx) as writer:
+            centro.to_excel(writer, sheet_name="CENTRO", index=False)
+            consul.to_excel(writer, sheet_name="Consul", index=False)
+        edw._WORKBOOK_CACHE.clear()
+
+    def tearDown(self):
+        edw._WORKBOOK_CACHE.clear()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_workbook_is_opened_once(self):
+        with mock.patch.object(edw.pd, "ExcelFile", wraps=pd.ExcelFile) as excel_file:
+            dfs = edw._read_all_sheets(self.xlsx)
+            consul = edw._read_consul(self.xlsx)
+        self.assertEqual(excel_file.call_count, 1)
+        self.assertEqual(list(dfs["CENT"]["NOMBRE"]), ["Colegio A", "Colegio B"])
+        self.assertIsNotNone(consul)
+        self.assertIn("CENTRO", edw.SHEET_PARSE_TIMES)
+
+    def test_consul_index_matches_full_sheet(self):
+        """Only the Consul columns used by the index are read, with the same result."""
+        completo = pd.read_excel(self.xlsx, sheet_name="Consul", dtype=str).fillna("")
+        completo.columns = completo.columns.str.strip()
+        completo = edw._clean_frame(completo)
+
+        consul = edw._read_consul(self.xlsx)
+        self.assertNotIn("OBS", consul.columns)
+        self.assertNotIn("OTRA", consul.columns)
+        self.assertEqual(edw._consul_index_from_sections(consul), edw._consul_index_from_sections(completo))
+        self.assertEqual(edw._consul_index_from_sections(consul)["CENT"]["C0001"], ["C0001_F1", "C0001_F2"])
+
+    def test_modified_file_is_read_again(self):
+        edw._read_all_sheets(self.xlsx)
+        pd.DataFrame({"ID_CENTRO": ["C0009"]}).to_excel(self.xlsx, sheet_name="CENTRO", index=False)
+        os.utime(self.xlsx, ns=(0, self.xlsx.stat().st_mtime_ns + 10**9))
+        self.assertEqual(list(edw._read_all_sheets(self.xlsx)["CENT"]["ID_CENTRO"]), ["C0009"])
+        self.assertIsNone(edw._read_consul(self.xlsx))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
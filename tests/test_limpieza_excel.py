@@ -0,0 +1,70 @@
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+# Add the interfaz directory to the Python path to import extraer_datos_word
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import extraer_datos_word as edw
+
+
+def _clean_por_celda(df: pd.DataFrame) -> pd.DataFrame:
+    """Reference implementation: _clean applied cell by cell, as _read_sheet used to do."""
+    df = df.copy()
+    for c in df.columns:
+        df[c] = df[c].apply(edw._clean)
+    return df
+
+
+class TestLimpiezaVectorizada(unittest.TestCase):
+    """_clean_frame must give exactly the same cells as _clean."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.texto = pd.DataFrame({
+            "ID": [" C0001 ", "C0002\n", "\x1cC0003　", "", "   "],
+            "NOMBRE": ["nan", " NaN ", "None", "Colegio Ñandú", "\xa0x\xa0"],
+            "VACIA": [np.nan, None, "", "\t", "0"],
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_text_cells_match_clean(self):
+        self.assertTrue(edw._clean_frame(self.texto.copy()).equals(_clean_por_celda(self.texto)))
+
+    def test_typed_cells_match_clean(self):
+        """Numbers, dates and missing values are rendered with str() like _clean."""
+        df = pd.DataFrame({
+            "N": [1.0, 2.5, np.nan, 1e16, -0.0],
+            "I": [1, 2, 3, 4, 5],
+            "F": pd.to_datetime(["2025-01-02", None, "2025-03-04 10:30", "2024-12-31", "2025-01-01"], format="mixed"),
+            "M": ["a", 3, None, pd.Timestamp("2025-05-06"), " b "],
+        })
+        self.assertTrue(edw._clean_frame(df.copy()).equals(_clean_por_celda(df)))
+
+    def test_fallback_without_pyarrow(self):
+        with mock.patch.dict(sys.modules, {"pyarrow": None, "pyarrow.compute": None}):
+            self.assertTrue(edw._clean_frame(self.texto.copy()).equals(_clean_por_celda(self.texto)))
+
+    def test_read_sheet_from_xlsx(self):
+        """End to end through _read_sheet: sheet name matching and cleaned cells."""
+        xlsx = self.temp_dir / "inventario.xlsx"
+        # los caracteres de control (\x1c) no se pueden escribir en xlsx
+        self.texto.replace("\x1c", "", regex=True).to_excel(xlsx, sheet_name=" Centro ", index=False)
+        df = edw._read_sheet(pd.ExcelFile(xlsx, engine="openpyxl"), ["CENTRO"])
+        esperado = pd.ExcelFile(xlsx, engine="openpyxl").parse(" Centro ", dtype=str).fillna("")
+        self.assertTrue(df.equals(_clean_por_celda(esperado)))
+        self.assertEqual(df.loc[0, "ID"], "C0001")
+        self.assertEqual(df.loc[0, "NOMBRE"], edw.NORMALIZE_EMPTY_TO)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,129 @@
+import unittest
+import tempfile
+import shutil
+import json
+import io
+import contextlib
+import os
+import sys
+from pathlib import Path
+from unittest import mock
+
+# Add the interfaz directory to the Python path to import render_a3 and html2pdf_a3_fast
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import render_a3
+import html2pdf_a3_fast as h2p
+
+PLANTILLAS = Path(__file__).resolve().parent.parent / "word" / "anexos" / "plantillas_a3_unificadas"
+
+
+class TestManifiestoHtml(unittest.TestCase):
+    """render_a3 leaves a page index per centre and find_htmls validates pages from it."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.foto = self.temp_dir / "E001_FE0001.jpg"
+        self.foto.write_bytes(b"jpg")
+        f = {"path": str(self.foto), "name": "E001_FE0001"}
+        self.ctx = {
+            "centro": {"id": "C0001", "nombre": "Colegio", "fotos": [f]},
+            "edif": [{"id": "C0001E001", "denominacion": "Aulario", "fotos": [f],
+                      "dependencias": [{"id": "C0001E001D0001", "denominacion": "Aula 1"}],
+                      "equipos_clima": [{"id": "C0001E001D0001QE001"}]}],
+        }
+        self.out = self.temp_dir / "salida"
+        with contextlib.redirect_stdout(io.StringIO()):
+            render_a3.configure(self.temp_dir, self.out, PLANTILLAS)
+            render_a3.render_contexto_centro(self.ctx)
+        self.centro_dir = self.out / "C0001"
+
+    def tearDown(self):
+        render_a3.metrics.clear()
+        render_a3.UNRESOLVED_PLACEHOLDERS.clear()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _find(self, fast_mode=False):
+        buf = io.StringIO()
+        with contextlib.redirect_stdout(buf):
+            htmls = h2p.find_htmls(self.out, fast_mode=fast_mode)
+        return htmls, buf.getvalue()
+
+    def test_render_writes_manifest(self):
+        data = json.loads((self.centro_dir / render_a3.HTML_MANIFEST_NAME).read_text(encoding="utf-8"))
+        paginas = data["paginas"]
+        self.assertEqual(data["v"], render_a3.HTML_MANIFEST_VERSION)
+        self.assertEqual(sorted(paginas), sorted(p.relative_to(self.centro_dir).as_posix()
+                                                 for p in self.centro_dir.rglob("*.html")))
+        centro = paginas["centro/C0001_centro.html"]
+        self.assertEqual(centro["orden"], 0)
+        self.assertEqual(centro["size"], (self.centro_dir / "centro" / "C0001_centro.html").stat().st_size)
+        self.assertIn(render_a3.to_file_uri(str(self.foto)), centro["imgs"])
+
+    def test_find_htmls_uses_manifest_without_reading_pages(self):
+        with mock.patch.object(h2p, "scan_html_prefix", side_effect=AssertionError("página leída")):
+            htmls, log = self._find()
+        self.assertEqual(len(htmls), 4)
+        self.assertIn("4/4 HTML validados desde el manifiesto", log)
+        # orden de render: centro, edificios, dependencias, clima
+        self.assertEqual([h.parent.name for h in htmls], ["centro", "edificios", "dependencias", "clima"])
+
+    def test_changed_or_unknown_page_falls_back_to_scan(self):
+        editada = self.centro_dir / "clima" / "C0001E001D0001QE001_clima.html"
+        with open(editada, "a", encoding="utf-8") as f:
+            f.write("<!-- editado -->")
+        suelta = self.out / "C0002" / "centro" / "C0002_centro.html"
+        suelta.parent.mkdir(parents=True)
+        suelta.write_text('<html><img src="falta.jpg"></html>', encoding="utf-8")
+        (self.out / "C0002" / "centro" / "vacio.html").write_text("", encoding="utf-8")
+        with mock.patch.object(h2p, "scan_html_prefix", wraps=h2p.scan_html_prefix) as scan:
+            htmls, log = self._find()
+        self.assertEqual(sorted(c.args[0].name for c in scan.call_args_list), [editada.name, suelta.name])
+        self.assertEqual(htmls[-2:], [editada, suelta])
+        self.assertIn("falta.jpg", log)
+        self.assertIn("vacio.html es vacío", log)
+        self.assertIn("3/6 HTML validados desde el manifiesto", log)
+
+    def test_fix_all_htmls_refreshes_manifest(self):
+        h2p.fix_all_htmls(self.out)
+        with mock.patch.object(h2p, "scan_html_prefix", side_effect=AssertionError("página leída")):
+            htmls, _ = self._find()
+        self.assertEqual(len(htmls), 4)
+        paginas = h2p.load_html_manifests(self.out)[self.centro_dir]
+        self.assertTrue(any(src.startswith("assets/") and src.endswith(".jpg")
+                            for src in paginas["centro/C0001_centro.html"]["imgs"]))
+        self.assertNotIn(render_a3.to_file_uri(str(self.foto)), paginas["centro/C0001_centro.html"]["imgs"])
+
+    def test_prefix_scan_is_bounded(self):
+        grande = self.temp_dir / "grande.html"
+        srcs = "".join(f'<img src="f{n}.jpg">' for n in range(8))
+        grande.write_text("<!doctype html>" + srcs + "x" * 500_000 + '<img src="tarde.jpg">', encoding="utf-8")
+        leidos = []
+
+        class Lector:
+            def __init__(self, f):
+                self.f = f
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                self.f.close()
+
+            def read(self, n=-1):
+                datos = self.f.read(n)
+                leidos.append(len(datos))
+                return datos
+
+        with mock.patch.object(h2p, "open", create=True, side_effect=lambda *a, **k: Lector(open(*a, **k))):
+            es_html, encontrados = h2p.scan_html_prefix(grande)
+        self.assertTrue(es_html)
+        self.assertEqual(encontrados, [f"f{n}.jpg" for n in range(5)])
+        self.assertLessEqual(sum(leidos), 16 * 1024)
+        texto = self.temp_dir / "texto.html"
+        texto.write_text("solo texto " * 20_000, encoding="utf-8")
+        self.assertEqual(h2p.scan_html_prefix(texto), (False, []))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
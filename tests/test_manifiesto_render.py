@@ -0,0 +1,88 @@
+import unittest
+import asyncio
+import tempfile
+import shutil
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add the interfaz directory to the Python path to import html2pdf_a3_fast
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import html2pdf_a3_fast as h2p
+
+
+class TestManifiestoRender(unittest.TestCase):
+    """Tests for the content-hash skip manifest used by render_htmls_to_pdfs."""
+
+    def setUp(self):
+        """Create a rendered center: one HTML with a local asset and its PDF."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.data = self.temp_dir / "html"
+        self.out = self.temp_dir / "html_pdf"
+        sec = self.data / "C0001" / "edificios"
+        (sec / "assets").mkdir(parents=True)
+        self.asset = sec / "assets" / "E001_FE0001.jpg"
+        self.asset.write_bytes(b"jpg")
+        self.html = sec / "C0001E001_edificio.html"
+        self.html.write_text('<html><body><img src="assets/E001_FE0001.jpg"></body></html>', encoding="utf-8")
+        self.args = SimpleNamespace(scale=1.0, ignore_css_page=False, wait=500, block="",
+                                    fast=False, ultra_fast=False, concurrency=2, force_render=False)
+        self.pdf = h2p.pdf_path_for(self.html, self.data, self.out)
+        self.pdf.parent.mkdir(parents=True)
+        self.pdf.write_bytes(b"%PDF-1.4")
+        self.opts = h2p.render_options_key(self.args, set())
+        manifest = h2p.RenderManifest(self.out)
+        manifest.record(self.pdf, h2p.html_fingerprint(self.html), self.opts)
+        manifest.save()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _fresh(self, opts=None):
+        manifest = h2p.RenderManifest(self.out)
+        return manifest.is_fresh(self.pdf, h2p.html_fingerprint(self.html), opts or self.opts)
+
+    def test_unchanged_pages_skip_the_browser(self):
+        """When every PDF is up to date no browser is launched and all are returned."""
+        rendered = asyncio.run(h2p.render_htmls_to_pdfs([self.html], self.data, self.out, self.args))
+        self.assertEqual(rendered, [("C0001", "edificios", self.pdf)])
+
+    def test_html_change_makes_page_dirty(self):
+        self.assertTrue(self._fresh())
+        self.html.write_text('<html><body><p>nuevo</p></body></html>', encoding="utf-8")
+        self.assertFalse(self._fresh())
+
+    def test_asset_change_makes_page_dirty(self):
+        self.asset.write_bytes(b"otra foto")
+        self.assertFalse(self._fresh())
+
+    def test_css_url_assets_are_fingerprinted(self):
+        svg = self.html.parent / "A3_FOTOS_AUDITORIA_SIN_ICONO.svg"
+        svg.write_text("<svg/>", encoding="utf-8")
+        self.html.write_text('<html><head><style>.ph { background: url("./A3_FOTOS_AUDITORIA_SIN_ICONO.svg") no-repeat; }'
+                             '.x { background: url(data:image/png;base64,AAAA); } .y { fill: url(#grad); }</style></head>'
+                             "<body><div style=\"background-image: url('assets/E001_FE0001.jpg')\"></div></body></html>",
+                             encoding="utf-8")
+        fp = h2p.html_fingerprint(self.html)
+        self.assertEqual(sorted(fp["assets"]), ["./A3_FOTOS_AUDITORIA_SIN_ICONO.svg", "assets/E001_FE0001.jpg"])
+        manifest = h2p.RenderManifest(self.out)
+        manifest.record(self.pdf, fp, self.opts)
+        manifest.save()
+        self.assertTrue(self._fresh())
+        svg.write_text('<svg viewBox="0 0 1 1"/>', encoding="utf-8")
+        self.assertFalse(self._fresh())
+
+    def test_render_options_are_part_of_the_key(self):
+        self.args.wait = 100
+        self.assertFalse(self._fresh(h2p.render_options_key(self.args, set())))
+        self.assertFalse(self._fresh(h2p.render_options_key(SimpleNamespace(**{**vars(self.args), "wait": 500}), {"font"})))
+
+    def test_missing_pdf_is_not_fresh(self):
+        self.pdf.unlink()
+        self.assertFalse(self._fresh())
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
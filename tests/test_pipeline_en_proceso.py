@@ -0,0 +1,197 @@
+import unittest
+import tempfile
+import shutil
+import asyncio
+import io
+import contextlib
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+# Add the interfaz directory to the Python path to import anejo5_orchestrator
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import anejo5_orchestrator as orq
+import extraer_datos_word as edw
+import render_a3
+import html2pdf_a3_fast as h2p
+
+
+class NavegadorFalso:
+    """Stand-in for NavegadorPersistente: counts instances and closes."""
+
+    instancias = []
+
+    def __init__(self, args):
+        self.cerrado = 0
+        NavegadorFalso.instancias.append(self)
+
+    async def cerrar(self):
+        self.cerrado += 1
+
+
+class TestPipelineEnProceso(unittest.TestCase):
+    """run_pipeline_in_process hands every centre to one PDF loop and counts its failures."""
+
+    CENTROS = ["C0001", "C0002", "C0003", "C0004"]
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.excel_dir = self.temp_dir / "excel"
+        self.excel_dir.mkdir()
+        for nombre in ("a.xlsx", "b.xlsx"):
+            (self.excel_dir / nombre).write_bytes(b"")
+        self.dirs = {k: str(self.temp_dir / k) for k in ("json", "html", "pdf")}
+        for d in self.dirs.values():
+            os.makedirs(d)
+        self.args = SimpleNamespace(excel_dir=str(self.excel_dir), photos_dir=str(self.temp_dir / "fotos"),
+                                    html_templates_dir=str(self.temp_dir), caratulas_dir=str(self.temp_dir),
+                                    exclude_without_photos=False, center=None, shards_pdf=1, workers_fotos=1,
+                                    sin_indice_fotos=False)
+        NavegadorFalso.instancias = []
+        self.renderizados = []
+        self.finales = []
+        self.loops = set()
+        self.shards = set()
+        self.indices = []
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    # Etapas simuladas -----------------------------------------------------------
+
+    def _contexto(self, dfs):
+        # dos centros por Excel
+        return [{"centro": {"id": cid}} for cid in (self.CENTROS[:2] if dfs == "a.xlsx" else self.CENTROS[2:])]
+
+    def _add_photos(self, ctx, *a, on_center=None, **k):
+        for c in ctx:
+            on_center(c)
+
+    def _render_centro(self, c):
+        cid = c["centro"]["id"]
+        if cid == "C0002":
+            return  # centro sin páginas
+        pagina = self.temp_dir / "html" / cid / "centro" / f"{cid}_centro.html"
+        pagina.parent.mkdir(parents=True, exist_ok=True)
+        pagina.write_text("<html></html>", encoding="utf-8")
+
+    async def _render_pdfs(self, htmls, data_root, out_root, args, base_url=None, navegador=None):
+        self.loops.add(asyncio.get_running_loop())
+        self.assertIs(navegador, NavegadorFalso.instancias[0])
+        cid = htmls[0].parent.parent.name
+        self.renderizados.append(cid)
+        self.shards.add(args.shards)
+        if cid == "C0003":
+            raise RuntimeError("Chromium caído")
+        return [(cid, "centro", Path(out_root) / cid / "centro" / f"{cid}_centro.pdf")]
+
+    def _ejecutar(self):
+        parches = [
+            mock.patch.object(edw, "_set_photo_index_store", side_effect=self.indices.append),
+            mock.patch.object(edw, "_read_all_sheets", side_effect=lambda f: f.name),
+            mock.patch.object(edw, "build_context_grouped", side_effect=self._contexto),
+            mock.patch.object(edw, "_read_consul"),
+            mock.patch.object(edw, "add_photos_to_context", side_effect=self._add_photos),
+            mock.patch.object(render_a3, "configure"),
+            mock.patch.object(render_a3, "render_contexto_centro", side_effect=self._render_centro),
+            mock.patch.object(render_a3, "outdir_for_centro", side_effect=lambda cid: self.temp_dir / "html" / cid),
+            mock.patch.object(render_a3, "log_unresolved_placeholders"),
+            mock.patch.object(h2p, "start_http_server"),
+            mock.patch.object(h2p, "fix_all_htmls"),
+            mock.patch.object(h2p, "find_htmls", side_effect=lambda d: sorted(Path(d).rglob("*.html"))),
+            mock.patch.object(h2p, "NavegadorPersistente", NavegadorFalso),
+            mock.patch.object(h2p, "render_htmls_to_pdfs", side_effect=self._render_pdfs),
+            mock.patch.object(h2p, "crear_anejo_final_por_centro",
+                              side_effect=lambda args, out, centros, rendered: self.finales.extend(sorted(centros))),
+        ]
+        buf = io.StringIO()
+        with contextlib.ExitStack() as stack, contextlib.redirect_stdout(buf):
+            for p in parches:
+                stack.enter_context(p)
+            rc = orq.run_pipeline_in_process(self.args, self.dirs)
+        return rc, buf.getvalue()
+
+    def test_every_centre_reaches_one_pdf_loop(self):
+        rc, log = self._ejecutar()
+        self.assertEqual(self.renderizados, ["C0001", "C0003", "C0004"])
+        self.assertEqual(self.finales, ["C0001", "C0004"])
+        self.assertIn("(C0002) Sin HTML que convertir", log)
+        # un único event loop y un único navegador, cerrado una vez al terminar
+        self.assertEqual(len(self.loops), 1)
+        self.assertEqual(len(NavegadorFalso.instancias), 1)
+        self.assertEqual(NavegadorFalso.instancias[0].cerrado, 1)
+
+    def test_failed_centres_are_counted(self):
+        rc, log = self._ejecutar()
+        self.assertEqual(rc, 3)
+        self.assertIn("[ERROR] (C0003) Fallo en la etapa PDF: Chromium caído", log)
+        self.assertIn("2 centros con PDF, 1 con errores", log)
+
+    def test_shards_pdf_is_ignored_in_process(self):
+        self.args.shards_pdf = 4
+        rc, log = self._ejecutar()
+        self.assertEqual(self.shards, {1})
+        self.assertIn("--shards-pdf 4 se ignora en modo en-proceso", log)
+
+    def test_photo_index_default_and_opt_out(self):
+        self._ejecutar()
+        self.assertEqual(self.indices, [edw.default_photo_index_path(Path(self.args.photos_dir))])
+        self.assertNotEqual(self.indices[0].parent, Path(self.args.photos_dir))
+        self.args.sin_indice_fotos = True
+        self.indices.clear()
+        self._ejecutar()
+        self.assertEqual(self.indices, [None])
+
+
+class TestNavegadorPersistente(unittest.TestCase):
+    """The persistent browser is launched once and relaunched only after a disconnect."""
+
+    def test_reused_until_disconnected(self):
+        navegadores = []
+
+        class Cierre:
+            def __init__(self):
+                self.cerrado = False
+                self.conectado = True
+
+            async def close(self):
+                self.cerrado = True
+
+            def is_connected(self):
+                return self.conectado
+
+        class Playwright:
+            async def start(self):
+                return self
+
+            async def stop(self):
+                pass
+
+        async def lanzar(pw, args, block_types):
+            navegadores.append(Cierre())
+            return navegadores[-1], Cierre()
+
+        async def run():
+            nav = h2p.NavegadorPersistente(h2p.parse_args(["--data", "x"]))
+            primero = await nav.abrir()
+            self.assertIs(await nav.abrir(), primero)
+            navegadores[0].conectado = False
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertIsNot(await nav.abrir(), primero)
+            self.assertTrue(navegadores[0].cerrado)
+            await nav.cerrar()
+            return nav
+
+        with mock.patch.object(h2p, "async_playwright", Playwright), \
+                mock.patch.object(h2p, "_launch_browser", side_effect=lanzar):
+            nav = asyncio.run(run())
+        self.assertEqual(nav.lanzamientos, 2)
+        self.assertTrue(navegadores[1].cerrado)
+        self.assertIsNone(nav.pool)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,68 @@
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+from pathlib import Path
+
+# Add the interfaz directory to the Python path to import render_a3
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import render_a3
+
+
+def _render_clasico(html, slot_tokens, fotos_html, context_maps):
+    """Reference implementation: sequential str.replace, as render_template used to do."""
+    for tok in slot_tokens:
+        if tok in html:
+            html = html.replace(tok, fotos_html)
+            break
+    else:
+        html = html.replace("[[FOTOS_ENVOL]]", fotos_html)
+    for mp in context_maps:
+        html = render_a3._replace_tokens_simple(html, mp)
+    return html
+
+
+class TestPlantillasCompiladas(unittest.TestCase):
+    """Tests for the precompiled template engine behind render_template."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        render_a3.UNRESOLVED_PLACEHOLDERS.clear()
+
+    def tearDown(self):
+        render_a3.UNRESOLVED_PLACEHOLDERS.clear()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_same_output_as_sequential_replace(self):
+        """Compiled rendering matches the old replace chain, first map wins."""
+        html = "<title>{{bloque}} {{id}}</title><p>{{e.nombre}} / {{{x}}}</p>[[FOTOS_EDIFICIOS]][[FOTOS_ENVOL]]"
+        maps = [{"id": " E001 ", "x": None}, {"id": "otro", "e.nombre": 7.5}, {"bloque": "EDIF"}]
+        for slots in [("[[FOTOS_EDIFICIOS]]",), ("[[FOTOS_NADA]]",)]:
+            self.assertEqual(
+                render_a3.render_template(html, slots, "<img>", maps, ("bloque", "id")),
+                _render_clasico(html, slots, "<img>", maps),
+            )
+
+    def test_unresolved_placeholders_are_reported(self):
+        """Missing keys stay in the HTML and are recorded per template."""
+        tpl_path = self.temp_dir / "centro.html"
+        tpl_path.write_text("<p>{{id}} {{falta}}</p>", encoding="utf-8")
+        out = render_a3.render_template(render_a3.load_template(tpl_path), (), "", [{"id": "C0001"}])
+        self.assertEqual(out, "<p>C0001 {{falta}}</p>")
+        self.assertEqual(render_a3.UNRESOLVED_PLACEHOLDERS["centro.html"], {"falta"})
+
+    def test_template_is_compiled_once(self):
+        """load_template reuses the compiled object until the file changes."""
+        tpl_path = self.temp_dir / "cc.html"
+        tpl_path.write_text("<p>{{id}}</p>", encoding="utf-8")
+        first = render_a3.load_template(tpl_path)
+        self.assertIs(render_a3.load_template(tpl_path), first)
+        tpl_path.write_text("<h1>{{id}}</h1>", encoding="utf-8")
+        os.utime(tpl_path, ns=(0, tpl_path.stat().st_mtime_ns + 10**9))
+        self.assertEqual(render_a3.load_template(tpl_path).render((), "", [{"id": "1"}]), "<h1>1</h1>")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,115 @@
+import unittest
+import asyncio
+import os
+import sys
+
+# Add the interfaz directory to the Python path to import html2pdf_a3_fast
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import html2pdf_a3_fast as h2p
+
+
+class PaginaFalsa:
+    """Stand-in for a Playwright page: records the documents it rendered and its media resets."""
+
+    def __init__(self, n):
+        self.n = n
+        self.documentos = []
+        self.medias = []
+        self.cerrada = False
+
+    async def emulate_media(self, media=None):
+        self.medias.append(media)
+
+    async def close(self):
+        self.cerrada = True
+
+    def is_closed(self):
+        return self.cerrada
+
+
+class ContextoFalso:
+    def __init__(self):
+        self.paginas = []
+
+    async def new_page(self):
+        self.paginas.append(PaginaFalsa(len(self.paginas) + 1))
+        return self.paginas[-1]
+
+
+async def _renderizar(pool, doc, falla=False):
+    async with pool.pagina() as page:
+        page.documentos.append(doc)
+        await asyncio.sleep(0)
+        if falla:
+            raise RuntimeError("frame was detached")
+    return page
+
+
+class TestPoolPaginas(unittest.TestCase):
+    """Pages are reused across documents and recycled after N uses or after a failure."""
+
+    def test_pages_are_reused_then_recycled(self):
+        contexto = ContextoFalso()
+        pool = h2p.PoolPaginas(contexto, max_usos=2)
+
+        async def run():
+            for doc in range(1, 6):
+                await _renderizar(pool, doc)
+
+        asyncio.run(run())
+        self.assertEqual([p.documentos for p in contexto.paginas], [[1, 2], [3, 4], [5]])
+        self.assertEqual([p.cerrada for p in contexto.paginas], [True, True, False])
+        self.assertEqual((pool.creadas, pool.reutilizadas, pool.recicladas), (3, 2, 2))
+        # La emulación de impresión se quita antes de devolver la página al pool
+        self.assertEqual(contexto.paginas[0].medias, ["null"])
+        asyncio.run(pool.cerrar())
+        self.assertTrue(contexto.paginas[2].cerrada)
+
+    def test_failed_page_is_discarded(self):
+        contexto = ContextoFalso()
+        pool = h2p.PoolPaginas(contexto, max_usos=10)
+
+        async def run():
+            await _renderizar(pool, 1)
+            with self.assertRaises(RuntimeError):
+                await _renderizar(pool, 2, falla=True)
+            await _renderizar(pool, 3)
+
+        asyncio.run(run())
+        self.assertEqual([p.documentos for p in contexto.paginas], [[1, 2], [3]])
+        self.assertTrue(contexto.paginas[0].cerrada)
+        self.assertEqual(pool.recicladas, 0)
+
+    def test_concurrent_pages_are_warmed_once(self):
+        contexto = ContextoFalso()
+        pool = h2p.PoolPaginas(contexto, max_usos=50)
+
+        async def run():
+            await pool.precalentar(3)
+            for ronda in range(4):
+                await asyncio.gather(*(_renderizar(pool, 10 * ronda + k) for k in range(3)))
+
+        asyncio.run(run())
+        self.assertEqual(len(contexto.paginas), 3)
+        self.assertEqual(sorted(len(p.documentos) for p in contexto.paginas), [4, 4, 4])
+        self.assertEqual(pool.reutilizadas, 9)
+
+    def test_zero_reuse_opens_one_page_per_document(self):
+        contexto = ContextoFalso()
+        pool = h2p.PoolPaginas(contexto, max_usos=0)
+
+        async def run():
+            await pool.precalentar(4)
+            for doc in range(3):
+                await _renderizar(pool, doc)
+
+        asyncio.run(run())
+        self.assertEqual(len(contexto.paginas), 3)
+        self.assertTrue(all(p.cerrada and p.medias == [] for p in contexto.paginas))
+        self.assertIn("Desactivado", pool.stats())
+        self.assertEqual(h2p.parse_args(["--data", "x"]).page_reuse, h2p.PAGE_REUSE_DEFAULT)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
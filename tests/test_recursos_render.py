@@ -0,0 +1,107 @@
+import unittest
+import tempfile
+import shutil
+import io
+import contextlib
+import os
+import sys
+from pathlib import Path
+from unittest import mock
+
+# Add the interfaz directory to the Python path to import render_a3
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import render_a3
+
+PLANTILLAS = Path(__file__).resolve().parent.parent / "word" / "anexos" / "plantillas_a3_unificadas"
+
+
+class TestRecursosRender(unittest.TestCase):
+    """Templates and placeholder SVGs are loaded once per configure() and only reinstalled when stale."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.svg = self.temp_dir / "origen" / render_a3.DEFAULT_SVG_MAIN
+        self.svg.parent.mkdir()
+        self.svg.write_text("<svg/>", encoding="utf-8")
+        self.out = self.temp_dir / "salida"
+        self._configure()
+
+    def tearDown(self):
+        render_a3.metrics.clear()
+        render_a3.RECURSOS = render_a3.RecursosRender()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _configure(self, modo="copia"):
+        with contextlib.redirect_stdout(io.StringIO()):
+            render_a3.configure(self.temp_dir, self.out, PLANTILLAS, svg=self.svg, modo_assets=modo)
+
+    def _placeholders(self, carpeta):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return render_a3.ensure_placeholders_in_outdir(carpeta)
+
+    def test_templates_are_read_once(self):
+        self.assertEqual(render_a3.RECURSOS.stats["plantillas"], len(render_a3.TPLS) + len(render_a3.T_ENVOL))
+        ctx = {"centro": {"id": "C0001"},
+               "edif": [{"id": "C0001E001", "dependencias": [{"id": "C0001E001D0001"}, {"id": "C0001E001D0002"}],
+                         "envolventes": [{"id": "C0001E001CR001", "denominacion": "Cubierta"}]}]}
+        with mock.patch.object(Path, "read_text", autospec=True) as read_text, \
+                contextlib.redirect_stdout(io.StringIO()):
+            render_a3.render_contexto_centro(ctx)
+        self.assertEqual(read_text.call_count, 0)
+        self.assertEqual(len(list(self.out.rglob("*.html"))), 5)
+
+    def test_missing_template_is_reported(self):
+        recursos = render_a3.RecursosRender()
+        self.assertIsNone(recursos.plantilla(self.temp_dir / "no_existe.html"))
+        self.assertEqual(recursos.stats["plantillas"], 0)
+
+    def test_placeholder_installed_once_and_refreshed_when_stale(self):
+        carpeta = self.out / "C0001" / "centro"
+        self.assertEqual(self._placeholders(carpeta)["main"], render_a3.DEFAULT_SVG_MAIN)
+        destino = carpeta / render_a3.DEFAULT_SVG_MAIN
+        self.assertEqual(destino.read_text(encoding="utf-8"), "<svg/>")
+        with mock.patch.object(render_a3, "copy2") as copia:
+            self._placeholders(carpeta)
+        self.assertEqual(copia.call_count, 0)
+
+        # Otro lote con el SVG de origen cambiado: la copia antigua se sustituye
+        self.svg.write_text("<svg>v2</svg>", encoding="utf-8")
+        self._configure()
+        self._placeholders(carpeta)
+        self.assertEqual(destino.read_text(encoding="utf-8"), "<svg>v2</svg>")
+        # y una copia al día no se vuelve a escribir
+        self._configure()
+        self._placeholders(carpeta)
+        self.assertEqual(render_a3.RECURSOS.stats["instalados"], 0)
+        self.assertGreaterEqual(render_a3.RECURSOS.stats["al_dia"], 1)
+
+    def test_hard_link_and_symlink_modes(self):
+        self._configure("enlace")
+        destino = self.out / "a" / render_a3.DEFAULT_SVG_MAIN
+        self._placeholders(destino.parent)
+        self.assertTrue(os.path.samefile(destino, self.svg))
+        self.assertFalse(destino.is_symlink())
+
+        self._configure("simbolico")
+        destino = self.out / "b" / render_a3.DEFAULT_SVG_MAIN
+        self._placeholders(destino.parent)
+        self.assertTrue(destino.is_symlink())
+        self.assertEqual(destino.read_text(encoding="utf-8"), "<svg/>")
+
+    def test_replacing_a_link_never_writes_the_source(self):
+        self._configure("enlace")
+        destino = self.out / "a" / render_a3.DEFAULT_SVG_MAIN
+        self._placeholders(destino.parent)
+        # Otro SVG de origen: el enlace al anterior se sustituye sin escribir a través de él
+        self.svg = self.temp_dir / "otro" / render_a3.DEFAULT_SVG_MAIN
+        self.svg.parent.mkdir()
+        self.svg.write_text("<svg>otro origen</svg>", encoding="utf-8")
+        self._configure("copia")
+        self._placeholders(destino.parent)
+        self.assertEqual(destino.read_text(encoding="utf-8"), "<svg>otro origen</svg>")
+        self.assertEqual((self.temp_dir / "origen" / render_a3.DEFAULT_SVG_MAIN).read_text(encoding="utf-8"), "<svg/>")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
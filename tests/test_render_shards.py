@@ -0,0 +1,100 @@
+import unittest
+import asyncio
+import tempfile
+import shutil
+import io
+import contextlib
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+# Add the interfaz directory to the Python path to import html2pdf_a3_fast
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import html2pdf_a3_fast as h2p
+
+
+def _shard_falso(shard, args, data_root, out_root, base_url, tareas, resultados):
+    """Shard process without a browser: same queue protocol as h2p._shard_main."""
+    while True:
+        item = tareas.get()
+        if item is None:
+            return
+        i, total, html = item
+        html = Path(html)
+        if "crash" in html.name:
+            os._exit(1)
+        if "falla" in html.name:
+            resultados.put(("fail", i, str(html), {"file": str(html), "error_type": "RuntimeError"}))
+            continue
+        pdf = h2p.pdf_path_for(html, data_root, out_root)
+        pdf.parent.mkdir(parents=True, exist_ok=True)
+        pdf.write_bytes(b"%PDF-1.4")
+        resultados.put(("ok", i, str(html), {"ready": True, "ms": 1.0, "shard": shard}))
+
+
+class TestRenderShards(unittest.TestCase):
+    """The sharded first round hands out pages through a shared queue and merges the results."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.data = self.temp_dir / "html"
+        self.out = self.temp_dir / "pdf"
+        self.htmls = []
+        for n in range(24):
+            nombre = {5: "crash", 9: "falla"}.get(n, "ok")
+            html = self.data / "C0001" / "dependencias" / f"D{n:04d}_{nombre}.html"
+            html.parent.mkdir(parents=True, exist_ok=True)
+            html.write_text(f"<p>{n}</p>", encoding="utf-8")
+            self.htmls.append(html)
+        self.args = h2p.parse_args(["--data", str(self.data), "--concurrency", "1", "--shards", "3"])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_results_are_merged_and_crashed_pages_retried(self):
+        vistos = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            ok, fallos = h2p._render_sharded(self.htmls, self.data, self.out, self.args, None, 3,
+                                             on_result=lambda *r: vistos.append(r[:2]),
+                                             shard_target=_shard_falso)
+        self.assertEqual(sorted(i for i, _, _ in ok + fallos), list(range(1, 25)))
+        self.assertEqual({html.name: d["error_type"] for _, html, d in fallos},
+                         {"D0005_crash.html": "ShardCrash", "D0009_falla.html": "RuntimeError"})
+        self.assertEqual(len(ok), 22)
+        self.assertGreater(len({info["shard"] for _, _, info in ok}), 1)
+        self.assertEqual(len(vistos), 23)
+        for _, html, _ in ok:
+            self.assertTrue(h2p.pdf_path_for(html, self.data, self.out).exists())
+
+    def test_sharded_round_without_failures_skips_local_browser(self):
+        htmls = [h for h in self.htmls if h.stem.endswith("_ok")]
+
+        def sharded(htmls, data_root, out_root, args, base_url, shards, on_result=None):
+            self.assertEqual(shards, 3)
+            ok = []
+            for i, html in enumerate(htmls, 1):
+                h2p.pdf_path_for(html, data_root, out_root).parent.mkdir(parents=True, exist_ok=True)
+                h2p.pdf_path_for(html, data_root, out_root).write_bytes(b"%PDF-1.4")
+                on_result("ok", i, html, {"ready": True, "ms": 2.0})
+                ok.append((i, html, {}))
+            return ok, []
+
+        with mock.patch.object(h2p, "_render_sharded", sharded), \
+                mock.patch.object(h2p, "async_playwright", side_effect=AssertionError("sin navegador local")), \
+                contextlib.redirect_stdout(io.StringIO()):
+            rendered = asyncio.run(h2p.render_htmls_to_pdfs(htmls, self.data, self.out, self.args))
+        self.assertEqual(len(rendered), len(htmls))
+        self.assertEqual(rendered[0][:2], ("C0001", "dependencias"))
+        manifest = h2p.RenderManifest(self.out)
+        self.assertEqual(len(manifest.entries), len(htmls))
+        self.assertTrue(all(e["ready_ms"] == 2.0 for e in manifest.entries.values()))
+
+    def test_single_shard_by_default(self):
+        self.assertEqual(h2p.parse_args(["--data", "x"]).shards, 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
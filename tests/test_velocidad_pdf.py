@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la etapa PDF del Anejo 5 (html2pdf_a3_fast.py).
+
+Genera un dataset sintético reproducible (páginas HTML A3 con fotos y PDFs de página)
+y mide, para varias concurrencias:
+  - render_htmls_to_pdfs            (requiere Chromium de Playwright; si no, se omite)
+  - merge_pdfs
+  - merge_pdfs_parallel_by_center
+  - crear_anejo_final_por_centro
+
+Escribe un informe JSON con páginas/s y pico de memoria (RSS del proceso y sus hijos,
+muestreado durante cada paso) y, si se indica,
+lo compara con un informe base guardado.
+
+Uso:
+  python tests/test_velocidad_pdf.py --centros 4 --paginas 50 --fotos 6 \
+      --concurrencias 2,4,8 --informe bench_pdf.json --base bench_pdf_base.json
+
+Como test (unittest/pytest) ejecuta una versión mínima del benchmark.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import struct
+import sys
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+import zlib
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+from pypdf import PdfWriter
+
+# Add the interfaz directory to the Python path to import html2pdf_a3_fast
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "interfaz"))
+
+import html2pdf_a3_fast as h2p
+
+SECCIONES_BENCH = ["edificios", "dependencias", "clima", "iluminacion"]
+UMBRAL_REGRESION = 0.15  # 15 % menos de páginas/s que la base = regresión
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Dataset sintético
+
+def _png(path: Path, lado: int, rng: random.Random):
+    """PNG RGB de lado x lado con ruido (poco comprimible, tamaño ~ lado²·3 bytes)."""
+    filas = b"".join(b"\x00" + rng.randbytes(lado * 3) for _ in range(lado))
+    def chunk(tipo, datos):
+        return struct.pack(">I", len(datos)) + tipo + datos + struct.pack(">I", zlib.crc32(tipo + datos) & 0xFFFFFFFF)
+    ihdr = struct.pack(">IIBBBBB", lado, lado, 8, 2, 0, 0, 0)
+    path.write_bytes(b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IDAT", zlib.compress(filas, 1)) + chunk(b"IEND", b""))
+
+HTML_A3 = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{titulo}</title>
+<style>
+@page {{ size: A3 landscape; margin: 0; }}
+body {{ margin: 0; font-family: Arial, sans-serif; }}
+.ph-grid {{ display: grid; grid-template-columns: repeat(3, 1fr); gap: 6mm; padding: 10mm; }}
+.ph-grid img {{ width: 100%; height: 90mm; object-fit: cover; }}
+</style></head>
+<body><h1>{titulo}</h1><div class="ph-grid">{imgs}</div></body></html>
+"""
+
+def generar_html(root: Path, centros: int, paginas: int, fotos: int, lado_foto: int, semilla: int = 1) -> list[Path]:
+    """<root>/C000N/<seccion>/<pagina>.html con 'fotos' imágenes en <seccion>/assets/."""
+    rng = random.Random(semilla)
+    htmls = []
+    for c in range(1, centros + 1):
+        centro = f"C{c:04d}"
+        for p in range(paginas):
+            seccion = SECCIONES_BENCH[p % len(SECCIONES_BENCH)]
+            sdir = root / centro / seccion
+            (sdir / "assets").mkdir(parents=True, exist_ok=True)
+            imgs = []
+            for k in range(fotos):
+                nombre = f"{centro}_{p:04d}_F{k:02d}.png"
+                _png(sdir / "assets" / nombre, lado_foto, rng)
+                imgs.append(f'<img src="assets/{nombre}">')
+            html = sdir / f"{centro}_{seccion}_{p:04d}.html"
+            html.write_text(HTML_A3.format(titulo=f"{centro} {seccion} {p}", imgs="".join(imgs)), encoding="utf-8")
+            htmls.append(html)
+    return htmls
+
+def generar_pdfs(root: Path, centros: int, paginas: int) -> list[tuple[str, str, Path]]:
+    """PDFs de una página A3 (sin Chromium) con la misma estructura que la salida del render."""
+    rendered = []
+    for c in range(1, centros + 1):
+        centro = f"C{c:04d}"
+        for p in range(paginas):
+            seccion = SECCIONES_BENCH[p % len(SECCIONES_BENCH)]
+            pdf = root / centro / seccion / f"{centro}_{seccion}_{p:04d}.pdf"
+            pdf.parent.mkdir(parents=True, exist_ok=True)
+            w = PdfWriter()
+            w.add_blank_page(width=1190.55, height=841.89)  # A3 apaisado en puntos
+            with pdf.open("wb") as f:
+                w.write(f)
+            rendered.append((centro, seccion, pdf))
+    return rendered
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Medición
+
+INTERVALO_RSS = 0.02  # segundos entre muestras de memoria
+
+def _rss_arbol_psutil(proc) -> int:
+    """RSS en bytes de un proceso psutil y todos sus descendientes."""
+    import psutil
+    total = 0
+    for p in [proc, *proc.children(recursive=True)]:
+        try:
+            total += p.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return total
+
+def _rss_arbol_proc(pid: int) -> int:
+    """Igual que _rss_arbol_psutil leyendo /proc directamente (Linux sin psutil)."""
+    hijos = {}
+    for d in os.scandir("/proc"):
+        if not d.name.isdigit():
+            continue
+        try:
+            stat = Path(d.path, "stat").read_text()
+        except OSError:
+            continue
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        hijos.setdefault(ppid, []).append(int(d.name))
+    pagina = os.sysconf("SC_PAGE_SIZE")
+    total, pendientes = 0, [pid]
+    while pendientes:
+        actual = pendientes.pop()
+        try:
+            total += int(Path(f"/proc/{actual}/statm").read_text().split()[1]) * pagina
+        except (OSError, IndexError, ValueError):
+            continue
+        pendientes.extend(hijos.get(actual, []))
+    return total
+
+def _medidor_rss():
+    """Función sin argumentos que devuelve el RSS del proceso + hijos (None si no se puede medir)."""
+    try:
+        import psutil
+        proc = psutil.Process()
+        return lambda: _rss_arbol_psutil(proc)
+    except ImportError:
+        pass
+    if Path(f"/proc/{os.getpid()}/statm").exists():
+        pid = os.getpid()
+        return lambda: _rss_arbol_proc(pid)
+    return None
+
+class PicoRSS:
+    """Muestrea en un hilo el RSS del proceso y sus hijos mientras dura el bloque 'with'.
+
+    A diferencia de ru_maxrss (máximo de toda la vida del proceso y sin hijos), el pico
+    es el de ese paso concreto e incluye Chromium y los workers de merge.
+    """
+
+    def __init__(self, intervalo: float = INTERVALO_RSS):
+        self.intervalo = intervalo
+        self.medidor = _medidor_rss()
+        self.pico = 0
+        self._fin = threading.Event()
+        self._hilo = None
+
+    def _muestrear(self):
+        self.pico = max(self.pico, self.medidor())
+
+    def _bucle(self):
+        while not self._fin.wait(self.intervalo):
+            self._muestrear()
+
+    def __enter__(self):
+        if self.medidor:
+            self._muestrear()
+            self._hilo = threading.Thread(target=self._bucle, daemon=True)
+            self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._hilo:
+            self._fin.set()
+            self._hilo.join()
+            self._muestrear()
+
+    @property
+    def mb(self):
+        return round(self.pico / (1024 * 1024), 1) if self.medidor else None
+
+def medir(fn, paginas: int) -> dict:
+    with PicoRSS() as rss:
+        t0 = time.perf_counter()
+        fn()
+        seg = time.perf_counter() - t0
+    return {
+        "segundos": round(seg, 3),
+        "paginas": paginas,
+        "paginas_por_s": round(paginas / seg, 2) if seg > 0 else None,
+        "pico_rss_mb": rss.mb,
+    }
+
+def ejecutar_benchmark(trabajo: Path, centros: int, paginas: int, fotos: int, lado_foto: int,
+                       concurrencias: list[int], con_render: bool = True) -> dict:
+    resultados = {}
+    total = centros * paginas
+    out_root = trabajo / "pdf"
+
+    # 1) render_htmls_to_pdfs
+    if con_render:
+        html_root = trabajo / "html"
+        htmls = generar_html(html_root, centros, paginas, fotos, lado_foto)
+        for conc in concurrencias:
+            args = h2p.parse_args(["--data", str(html_root), "--out", str(trabajo / f"render_c{conc}"),
+                                   "--concurrency", str(conc), "--wait", "0", "--force-render"])
+            try:
+                resultados[f"render_htmls_to_pdfs[c={conc}]"] = medir(
+                    lambda: asyncio.run(h2p.render_htmls_to_pdfs(htmls, html_root, Path(args.out), args)), total)
+            except Exception as e:
+                resultados[f"render_htmls_to_pdfs[c={conc}]"] = {"omitido": str(e).splitlines()[0][:160]}
+                break
+
+    # 2) merges (PDFs sintéticos, independientes de Chromium)
+    rendered = generar_pdfs(out_root, centros, paginas)
+    todos = [p for _, _, p in rendered]
+    resultados["merge_pdfs"] = medir(lambda: h2p.merge_pdfs(todos, trabajo / "merge_todo.pdf"), total)
+
+    for workers in concurrencias:
+        args = SimpleNamespace(merge_workers=workers, caratulas_dir=None)
+        resultados[f"merge_pdfs_parallel_by_center[w={workers}]"] = medir(
+            lambda: asyncio.run(h2p.merge_pdfs_parallel_by_center(rendered, out_root, args)), total)
+        resultados[f"crear_anejo_final_por_centro[w={workers}]"] = medir(
+            lambda: h2p.crear_anejo_final_por_centro(args, out_root, {c for c, _, _ in rendered}, rendered), total)
+    return resultados
+
+def comparar_con_base(resultados: dict, base: dict, umbral: float = UMBRAL_REGRESION) -> dict:
+    """{benchmark: {"actual", "base", "ratio", "regresion"}} para los que existen en ambos."""
+    comparacion = {}
+    for nombre, r in resultados.items():
+        b = base.get("resultados", {}).get(nombre, {})
+        if not r.get("paginas_por_s") or not b.get("paginas_por_s"):
+            continue
+        ratio = r["paginas_por_s"] / b["paginas_por_s"]
+        comparacion[nombre] = {
+            "actual": r["paginas_por_s"],
+            "base": b["paginas_por_s"],
+            "ratio": round(ratio, 3),
+            "regresion": ratio < 1.0 - umbral,
+        }
+    return comparacion
+
+def informe(parametros: dict, resultados: dict, base_path=None) -> dict:
+    data = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parametros": parametros,
+        "resultados": resultados,
+    }
+    if base_path and Path(base_path).exists():
+        base = json.loads(Path(base_path).read_text(encoding="utf-8"))
+        data["comparacion"] = comparar_con_base(resultados, base)
+    return data
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Tests (versión mínima del benchmark)
+
+class TestBenchmarkPdf(unittest.TestCase):
+    """Smoke tests for the PDF benchmark helpers (tiny dataset, merges only)."""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_synthetic_html_is_reproducible(self):
+        a = generar_html(self.temp_dir / "a", 1, 2, 2, 8)
+        b = generar_html(self.temp_dir / "b", 1, 2, 2, 8)
+        self.assertEqual(len(a), 2)
+        for pa, pb in zip(a, b):
+            self.assertEqual(pa.read_bytes(), pb.read_bytes())
+        foto = next((self.temp_dir / "a").rglob("*.png"))
+        self.assertTrue(foto.read_bytes().startswith(b"\x89PNG"))
+
+    def test_merge_benchmarks_report_pages_per_second(self):
+        res = ejecutar_benchmark(self.temp_dir, centros=2, paginas=4, fotos=1, lado_foto=8,
+                                 concurrencias=[1, 2], con_render=False)
+        self.assertEqual(res["merge_pdfs"]["paginas"], 8)
+        for nombre in ["merge_pdfs_parallel_by_center[w=2]", "crear_anejo_final_por_centro[w=1]"]:
+            self.assertGreater(res[nombre]["paginas_por_s"], 0)
+        self.assertTrue((self.temp_dir / "pdf" / "C0001" / h2p.ANEJO_FINAL_NOMBRE).exists())
+
+    @unittest.skipIf(_medidor_rss() is None, "sin psutil ni /proc")
+    def test_peak_rss_is_per_step_and_includes_children(self):
+        mb = 32  # pequeño para CI con poca memoria; los umbrales son proporcionales
+        reposo = medir(lambda: None, 1)["pico_rss_mb"]
+        hijo = [sys.executable, "-c", f"import time; b = bytearray({mb} * 1024 * 1024); time.sleep(0.3)"]
+        con_hijo = medir(lambda: subprocess.run(hijo, check=True), 1)["pico_rss_mb"]
+        self.assertGreater(con_hijo - reposo, 0.75 * mb)
+
+        def pesado():
+            b = bytearray(mb * 1024 * 1024)
+            time.sleep(0.1)
+            del b
+        self.assertGreater(medir(pesado, 1)["pico_rss_mb"] - reposo, 0.75 * mb)
+        # el paso siguiente no hereda el pico del anterior
+        self.assertLess(medir(lambda: time.sleep(0.1), 1)["pico_rss_mb"] - reposo, 0.5 * mb)
+
+    def test_baseline_comparison_flags_regressions(self):
+        base = {"resultados": {"merge_pdfs": {"paginas_por_s": 100.0}, "x": {"paginas_por_s": 10.0}}}
+        comp = comparar_con_base({"merge_pdfs": {"paginas_por_s": 80.0}, "x": {"paginas_por_s": 9.5}}, base)
+        self.assertTrue(comp["merge_pdfs"]["regresion"])
+        self.assertFalse(comp["x"]["regresion"])
+
+# ──────────────────────────────────────────────────────────────────────────────
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de la etapa PDF del Anejo 5")
+    ap.add_argument("--centros", type=int, default=4)
+    ap.add_argument("--paginas", type=int, default=50, help="Páginas por centro")
+    ap.add_argument("--fotos", type=int, default=6, help="Fotos por página HTML")
+    ap.add_argument("--lado-foto", type=int, default=400, help="Lado en píxeles de cada foto sintética")
+    ap.add_argument("--concurrencias", default="2,4,8", help="Lista de concurrencias / workers a probar")
+    ap.add_argument("--sin-render", action="store_true", help="No medir render_htmls_to_pdfs (sin Chromium)")
+    ap.add_argument("--informe", default="bench_pdf.json", help="Ruta del informe JSON")
+    ap.add_argument("--base", default=None, help="Informe base con el que comparar")
+    ap.add_argument("--fallar-si-regresion", action="store_true", help="Código de salida 1 si hay regresión")
+    ap.add_argument("--conservar", action="store_true", help="No borrar la carpeta de trabajo")
+    args = ap.parse_args()
+
+    concurrencias = [int(x) for x in args.concurrencias.split(",") if x.strip()]
+    trabajo = Path(tempfile.mkdtemp(prefix="bench_pdf_"))
+    print(f"[BENCH] Carpeta de trabajo: {trabajo}")
+    try:
+        resultados = ejecutar_benchmark(trabajo, args.centros, args.paginas, args.fotos, args.lado_foto,
+                                        concurrencias, con_render=not args.sin_render)
+    finally:
+        if not args.conservar:
+            shutil.rmtree(trabajo, ignore_errors=True)
+
+    parametros = {k: getattr(args, k) for k in ("centros", "paginas", "fotos", "lado_foto", "concurrencias")}
+    data = informe(parametros, resultados, args.base)
+    Path(args.informe).write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    for nombre, r in resultados.items():
+        if "omitido" in r:
+            print(f"  {nombre:45s} OMITIDO ({r['omitido']})")
+        else:
+            print(f"  {nombre:45s} {r['paginas_por_s']:>9} pág/s  {r['segundos']:>8}s  RSS {r['pico_rss_mb']} MB")
+    regresiones = [n for n, c in data.get("comparacion", {}).items() if c["regresion"]]
+    for n in regresiones:
+        c = data["comparacion"][n]
+        print(f"[REGRESION] {n}: {c['actual']} pág/s frente a {c['base']} (x{c['ratio']})")
+    print(f"[OK] Informe: {args.informe}")
+    return 1 if (regresiones and args.fallar_si_regresion) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())